@@ -0,0 +1,137 @@
+"""Cold-start benchmark for the obfuscator entry points.
+
+Every case runs in a fresh interpreter, as a Lambda cold start or a CLI call
+would, and reports:
+
+- ``import_seconds``: time to import ``obfuscator.process_file``.
+- ``sdk_import_seconds``: time to import boto3, which every S3 job needs.
+- ``first_byte_seconds``: time from starting the job to its first output
+  chunk, including any heavy modules the job imports on first use.
+- ``modules_at_import`` / ``modules_at_first_byte``: which heavy modules were
+  loaded at each point.
+
+S3 is mocked with moto, whose set-up time is excluded. Results are printed
+as one JSON object per line.
+
+Usage:
+    python benchmarks/cold_start.py [--repeat N]
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+import pandas as pd
+
+HEAVY_MODULES = ["boto3", "numpy", "pandas", "pyarrow", "pyarrow.parquet"]
+
+CASES = {
+    "csv": {"extension": "csv", "options": {}},
+    "csv-raw": {"extension": "csv", "options": {"engine": "raw"}},
+    "json": {"extension": "json", "options": {}},
+    "parquet": {"extension": "parquet", "options": {}},
+}
+
+CHILD = """
+import json, sys, time
+
+HEAVY_MODULES = {heavy_modules!r}
+loaded = lambda: [name for name in HEAVY_MODULES if name in sys.modules]
+
+start = time.perf_counter()
+from obfuscator.process_file import stream_s3_file
+import_seconds = time.perf_counter() - start
+modules_at_import = loaded()
+
+start = time.perf_counter()
+import boto3
+sdk_import_seconds = time.perf_counter() - start
+
+from moto import mock_aws
+
+with mock_aws():
+    s3 = boto3.client("s3", region_name="us-east-1")
+    s3.create_bucket(Bucket="benchmark-bucket")
+    with open({path!r}, "rb") as f:
+        s3.put_object(Bucket="benchmark-bucket", Key={key!r}, Body=f.read())
+
+    start = time.perf_counter()
+    next(iter(stream_s3_file({job!r})))
+    first_byte_seconds = time.perf_counter() - start
+
+print(json.dumps({{
+    "import_seconds": import_seconds,
+    "sdk_import_seconds": sdk_import_seconds,
+    "first_byte_seconds": first_byte_seconds,
+    "modules_at_import": modules_at_import,
+    "modules_at_first_byte": loaded(),
+}}))
+"""
+
+
+def write_sample(path: str, extension: str, rows: int = 1000):
+    """Write a small sample file with PII columns."""
+    df = pd.DataFrame(
+        {
+            "id": range(rows),
+            "name": ["John Doe"] * rows,
+            "email": ["john.doe@example.com"] * rows,
+            "course": ["Software Engineering"] * rows,
+        }
+    )
+    if extension == "csv":
+        df.to_csv(path, index=False)
+    elif extension == "json":
+        df.to_json(path, orient="records", lines=True)
+    elif extension == "parquet":
+        df.to_parquet(path, index=False)
+
+
+def run_case(name: str, case: dict, directory: str) -> dict:
+    """Run one cold start in a child interpreter and return its timings."""
+    key = f"sample.{case['extension']}"
+    path = os.path.join(directory, key)
+    if not os.path.exists(path):
+        write_sample(path, case["extension"])
+
+    job = json.dumps(
+        {
+            "file_to_obfuscate": f"s3://benchmark-bucket/{key}",
+            "pii_fields": ["name", "email"],
+            "mode": "stream",
+            **case["options"],
+        }
+    )
+    code = CHILD.format(heavy_modules=HEAVY_MODULES, path=path, key=key, job=job)
+    result = subprocess.run(
+        [sys.executable, "-c", code], capture_output=True, text=True, check=True
+    )
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--repeat", type=int, default=3, help="runs per case")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        for name, case in CASES.items():
+            runs = [run_case(name, case, directory) for _ in range(args.repeat)]
+            report = {"case": name, "runs": args.repeat}
+            for metric in (
+                "import_seconds",
+                "sdk_import_seconds",
+                "first_byte_seconds",
+            ):
+                report[metric] = statistics.median(run[metric] for run in runs)
+            report["modules_at_import"] = runs[-1]["modules_at_import"]
+            report["modules_at_first_byte"] = runs[-1]["modules_at_first_byte"]
+            print(json.dumps(report))
+
+
+if __name__ == "__main__":
+    main()
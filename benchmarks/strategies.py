@@ -0,0 +1,201 @@
+"""Throughput benchmark for each obfuscation strategy.
+
+Masks one generated column with every strategy (mask, hmac, keep_last,
+email_domain, fixed_width) through each code path: pandas DataFrames
+(memory, stream and parallel modes), Arrow record batches (Parquet) and raw
+CSV fields (the raw engine). Only the obfuscation itself is timed; there is
+no S3, parsing or serialisation. Every case reports rows/s and the projected
+time to mask 100M rows, and the results are written as JSON. Given a
+baseline, the run fails if any case is slower than the baseline allows.
+
+Usage:
+    python benchmarks/strategies.py --rows 1000000 --output results.json
+    python benchmarks/strategies.py --strategies hmac --cardinality 200
+    python benchmarks/strategies.py --baseline benchmarks/strategies_baseline.json
+    python benchmarks/strategies.py --compare results.json --baseline ...
+    python benchmarks/strategies.py --save-baseline benchmarks/strategies_baseline.json
+
+Baselines depend on the machine they were recorded on; record them on the
+host that runs the comparison.
+"""
+
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+
+import pandas as pd
+import pyarrow as pa
+
+from obfuscator.csv_rewriter import CsvRewriter
+from obfuscator.obfuscate_pii import obfuscate_pii, obfuscate_pii_arrow
+from obfuscator.strategies import build_strategy
+
+STRATEGIES = {
+    "mask": "mask",
+    "hmac": "hmac",
+    "keep_last": {"strategy": "keep_last", "n": 4},
+    "email_domain": "email_domain",
+    "fixed_width": "fixed_width",
+}
+PATHS = ["pandas", "arrow", "raw"]
+
+DEFAULT_ROWS = 1_000_000
+DEFAULT_REPEAT = 3
+DEFAULT_THROUGHPUT_TOLERANCE = 0.25
+PROJECTED_ROWS = 100_000_000
+BENCHMARK_KEY = "benchmark-key"
+
+
+def generate_values(rows: int, cardinality: int) -> list:
+    """Return email-like values with ``cardinality`` distinct values."""
+    return [f"user.{i % cardinality}@example{i % 97}.com" for i in range(rows)]
+
+
+def _raw_lines(values: list) -> bytes:
+    return ("id,pii\n" + "".join(f"{i},{v}\n" for i, v in enumerate(values))).encode()
+
+
+def run_case(strategy_name: str, path: str, values: list, repeat: int) -> dict:
+    """Time one strategy over one code path, keeping the fastest repeat."""
+    spec = STRATEGIES[strategy_name]
+    rows = len(values)
+    if path == "pandas":
+        data = pd.DataFrame({"id": range(rows), "pii": values})
+    elif path == "arrow":
+        data = pa.record_batch({"id": pa.array(range(rows)), "pii": pa.array(values)})
+    else:
+        data = _raw_lines(values)
+
+    best = None
+    for _ in range(repeat):
+        # A fresh strategy per repeat, so memos start empty as in a new job
+        strategy = build_strategy("pii", spec, BENCHMARK_KEY)
+        strategies = {} if strategy is None else {"pii": strategy}
+        start = time.perf_counter()
+        if path == "pandas":
+            obfuscate_pii(data, ["pii"], copy=False, strategies=strategies)
+        elif path == "arrow":
+            obfuscate_pii_arrow(data, ["pii"], strategies)
+        else:
+            rewriter = CsvRewriter(["pii"], strategies)
+            rewriter.feed(data)
+            rewriter.close()
+        seconds = time.perf_counter() - start
+        best = seconds if best is None else min(best, seconds)
+
+    rows_per_s = rows / best if best else float("inf")
+    return {
+        "strategy": strategy_name,
+        "path": path,
+        "rows": rows,
+        "cardinality": len(set(values)),
+        "seconds": round(best, 4),
+        "rows_per_s": round(rows_per_s),
+        "seconds_per_100m_rows": round(PROJECTED_ROWS / rows_per_s, 1),
+    }
+
+
+def case_id(result: dict) -> str:
+    return f"{result['strategy']}/{result['path']}"
+
+
+def compare(
+    results: list,
+    baseline: list,
+    throughput_tolerance: float = DEFAULT_THROUGHPUT_TOLERANCE,
+) -> list:
+    """Compare results with a baseline.
+
+    Returns:
+        list: A description of every regression; cases missing from either
+        side are ignored.
+    """
+    expected = {case_id(case): case for case in baseline}
+    regressions = []
+    for result in results:
+        base = expected.get(case_id(result))
+        if base is None:
+            continue
+        minimum = base["rows_per_s"] * (1 - throughput_tolerance)
+        if result["rows_per_s"] < minimum:
+            regressions.append(
+                f"{case_id(result)}: {result['rows_per_s']} rows/s is below "
+                f"{minimum:.0f} (baseline {base['rows_per_s']})"
+            )
+    return regressions
+
+
+def _csv_list(value: str) -> list:
+    return [item for item in value.split(",") if item]
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--rows", type=int, default=DEFAULT_ROWS)
+    parser.add_argument(
+        "--cardinality", type=int, help="distinct values (default: all unique)"
+    )
+    parser.add_argument("--strategies", default=",".join(STRATEGIES))
+    parser.add_argument("--paths", default=",".join(PATHS))
+    parser.add_argument("--repeat", type=int, default=DEFAULT_REPEAT)
+    parser.add_argument("--output", help="file to write the JSON results to")
+    parser.add_argument("--baseline", help="JSON results to compare against")
+    parser.add_argument("--compare", help="compare existing results; run nothing")
+    parser.add_argument("--save-baseline", help="file to store these results in")
+    parser.add_argument(
+        "--throughput-tolerance", type=float, default=DEFAULT_THROUGHPUT_TOLERANCE
+    )
+    args = parser.parse_args(argv)
+
+    if args.compare:
+        with open(args.compare) as f:
+            report = json.load(f)
+    else:
+        values = generate_values(args.rows, args.cardinality or args.rows)
+        results = []
+        for strategy_name in _csv_list(args.strategies):
+            for path in _csv_list(args.paths):
+                result = run_case(strategy_name, path, values, args.repeat)
+                print(
+                    f"{case_id(result)}: {result['rows_per_s']} rows/s, "
+                    f"{result['seconds_per_100m_rows']}s per 100M rows",
+                    file=sys.stderr,
+                )
+                results.append(result)
+        report = {
+            "environment": {
+                "python": platform.python_version(),
+                "platform": platform.platform(),
+                "cpus": os.cpu_count(),
+            },
+            "results": results,
+        }
+
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text + "\n")
+    if args.save_baseline:
+        with open(args.save_baseline, "w") as f:
+            f.write(text + "\n")
+    if not args.output and not args.save_baseline:
+        print(text)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)["results"]
+        regressions = compare(
+            report["results"], baseline, args.throughput_tolerance
+        )
+        for regression in regressions:
+            print(f"REGRESSION {regression}", file=sys.stderr)
+        if regressions:
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,378 @@
+"""Throughput and memory benchmark suite for the obfuscator.
+
+Runs a matrix of file sizes, column counts, PII-column ratios, formats and
+processing variants (memory, stream, raw engine, parallel), each in a fresh
+interpreter against a moto S3 bucket, so it needs no network access. With
+``--storage local`` the files are read from disk instead, which leaves out
+the overhead of moto. Every
+case reports seconds, MB/s, rows/s and peak RSS, and the results are written
+as JSON. Given a baseline, the run fails if any case is slower or uses more
+memory than the baseline allows.
+
+Usage:
+    python benchmarks/suite.py --profile smoke --output results.json
+    python benchmarks/suite.py --profile standard --baseline benchmarks/baseline.json
+    python benchmarks/suite.py --sizes 1024,4096 --formats csv --variants raw,parallel
+    python benchmarks/suite.py --profile large --storage local
+    python benchmarks/suite.py --compare results.json --baseline benchmarks/baseline.json
+    python benchmarks/suite.py --profile smoke --save-baseline benchmarks/baseline.json
+
+Baselines depend on the machine they were recorded on; record them on the
+host that runs the comparison.
+"""
+
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+
+PROFILES = {
+    "smoke": {"sizes": [1], "columns": [5], "pii_ratios": [0.4]},
+    "standard": {
+        "sizes": [1, 10, 100],
+        "columns": [5, 20],
+        "pii_ratios": [0.2, 0.5],
+    },
+    "large": {"sizes": [1024, 4096], "columns": [10], "pii_ratios": [0.3]},
+}
+
+VARIANTS = {
+    "csv": {
+        "memory": {},
+        "stream": {"mode": "stream"},
+        "raw": {"engine": "raw"},
+        "parallel": {"mode": "parallel", "engine": "raw"},
+    },
+    "json": {"memory": {}, "stream": {"mode": "stream"}, "raw": {"engine": "raw"}},
+    "parquet": {"memory": {}, "stream": {"mode": "stream"}},
+}
+
+DEFAULT_THROUGHPUT_TOLERANCE = 0.25
+DEFAULT_MEMORY_TOLERANCE = 0.25
+GENERATION_BLOCK_ROWS = 200_000
+
+CHILD = """
+import contextlib, json, resource, sys, time
+import boto3
+from moto import mock_aws
+from obfuscator.process_file import process_s3_file, stream_s3_file
+
+def peak_rss_mb():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024 if sys.platform == "darwin" else 1024)
+
+with contextlib.nullcontext() if {local!r} else mock_aws():
+    if not {local!r}:
+        s3 = boto3.client("s3", region_name="us-east-1")
+        s3.create_bucket(Bucket="benchmark-bucket")
+        s3.upload_file({path!r}, "benchmark-bucket", {key!r})
+    job = json.dumps({job!r})
+    for module in {warm_imports!r}:
+        __import__(module)  # import cost belongs to the cold-start benchmark
+    baseline_rss_mb = peak_rss_mb()
+
+    start = time.perf_counter()
+    if {streaming!r}:
+        output_bytes = sum(len(chunk) for chunk in stream_s3_file(job))
+    else:
+        output_bytes = process_s3_file(job).getbuffer().nbytes
+    seconds = time.perf_counter() - start
+
+print(json.dumps({{
+    "seconds": seconds,
+    "output_bytes": output_bytes,
+    "baseline_rss_mb": baseline_rss_mb,
+    "peak_rss_mb": peak_rss_mb(),
+}}))
+"""
+
+
+def _column_names(columns: int, pii_ratio: float):
+    """Return the PII and other column names of a generated file."""
+    pii_count = max(1, round(columns * pii_ratio))
+    pii = [f"pii_{i}" for i in range(pii_count)]
+    other = [f"col_{i}" for i in range(columns - pii_count)]
+    return pii, other
+
+
+def _frame(start: int, rows: int, pii: list, other: list):
+    """Build one block of generated rows with strings, integers and floats."""
+    import numpy as np
+    import pandas as pd
+
+    ids = np.arange(start, start + rows)
+    data = {"id": ids}
+    for i, name in enumerate(pii):
+        email = f"person-{i}-{{}}@example.com"
+        data[name] = pd.Series(ids % 100_003).map(email.format)
+    for i, name in enumerate(other):
+        if i % 3 == 0:
+            data[name] = pd.Series(ids % 997).map(f"category {i} {{}}".format)
+        elif i % 3 == 1:
+            data[name] = (ids * 7 + i) % 1_000_000
+        else:
+            data[name] = (ids % 10_000) / 7.0
+    return pd.DataFrame(data)
+
+
+def generate_file(path: str, fmt: str, size_mb: int, columns: int, pii_ratio: float):
+    """Generate a file of about ``size_mb`` MB, block by block.
+
+    Returns:
+        int: The number of rows written.
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    pii, other = _column_names(columns, pii_ratio)
+    sample = _frame(0, 1000, pii, other)
+    if fmt == "parquet":
+        sample_size = len(sample.to_parquet(index=False))
+    elif fmt == "json":
+        sample_size = len(sample.to_json(orient="records", lines=True))
+    else:
+        sample_size = len(sample.to_csv(index=False))
+    total_rows = max(1, int(size_mb * 1024 * 1024 / (sample_size / 1000)))
+
+    writer = None
+    with open(path, "wb") as f:
+        for start in range(0, total_rows, GENERATION_BLOCK_ROWS):
+            rows = min(GENERATION_BLOCK_ROWS, total_rows - start)
+            block = _frame(start, rows, pii, other)
+            if fmt == "parquet":
+                table = pa.Table.from_pandas(block, preserve_index=False)
+                writer = writer or pq.ParquetWriter(f, table.schema)
+                writer.write_table(table)
+            elif fmt == "json":
+                f.write(block.to_json(orient="records", lines=True).encode("utf-8"))
+            else:
+                f.write(block.to_csv(index=False, header=start == 0).encode("utf-8"))
+        if writer is not None:
+            writer.close()
+    return total_rows
+
+
+def run_case(case: dict, path: str, rows: int, storage: str = "s3") -> dict:
+    """Run one case in a fresh interpreter and return its measurements."""
+    key = os.path.basename(path)
+    pii, _ = _column_names(case["columns"], case["pii_ratio"])
+    options = VARIANTS[case["format"]][case["variant"]]
+    local = storage == "local"
+    location = os.path.abspath(path) if local else f"s3://benchmark-bucket/{key}"
+    job = {"file_to_obfuscate": location, "pii_fields": pii}
+    job.update(options)
+    streaming = "mode" in options or "engine" in options
+    warm_imports = [] if options.get("engine") == "raw" else ["pandas"]
+    if case["format"] == "parquet":
+        warm_imports.append("pyarrow.parquet")
+
+    code = CHILD.format(
+        path=path,
+        key=key,
+        job=job,
+        local=local,
+        streaming=streaming,
+        warm_imports=warm_imports,
+    )
+    result = subprocess.run(
+        [sys.executable, "-c", code], capture_output=True, text=True, check=True
+    )
+    measured = json.loads(result.stdout.strip().splitlines()[-1])
+
+    input_mb = os.path.getsize(path) / (1024 * 1024)
+    return {
+        **case,
+        "storage": storage,
+        "rows": rows,
+        "input_mb": round(input_mb, 3),
+        "seconds": round(measured["seconds"], 4),
+        "mb_per_s": round(input_mb / measured["seconds"], 3),
+        "rows_per_s": round(rows / measured["seconds"], 1),
+        "output_bytes": measured["output_bytes"],
+        "baseline_rss_mb": round(measured["baseline_rss_mb"], 1),
+        "peak_rss_mb": round(measured["peak_rss_mb"], 1),
+    }
+
+
+def case_id(case: dict) -> str:
+    """Return the key that identifies a case across runs."""
+    return (
+        f"{case['format']}/{case['variant']}/{case['size_mb']}MB/"
+        f"{case['columns']}cols/pii{case['pii_ratio']}"
+    )
+
+
+def build_cases(sizes, columns, pii_ratios, formats, variants) -> list:
+    """Expand the benchmark matrix into a list of cases."""
+    cases = []
+    for fmt in formats:
+        for size_mb in sizes:
+            for column_count in columns:
+                for pii_ratio in pii_ratios:
+                    for variant in VARIANTS[fmt]:
+                        if variants and variant not in variants:
+                            continue
+                        cases.append(
+                            {
+                                "format": fmt,
+                                "variant": variant,
+                                "size_mb": size_mb,
+                                "columns": column_count,
+                                "pii_ratio": pii_ratio,
+                            }
+                        )
+    return cases
+
+
+def run_suite(cases: list, data_dir: str, storage: str = "s3") -> list:
+    """Run every case, generating each input file once."""
+    results = []
+    generated = {}
+    for case in cases:
+        name = (
+            f"bench_{case['size_mb']}mb_{case['columns']}c_"
+            f"{case['pii_ratio']}p.{case['format']}"
+        )
+        path = os.path.join(data_dir, name)
+        if path not in generated:
+            generated[path] = generate_file(
+                path,
+                case["format"],
+                case["size_mb"],
+                case["columns"],
+                case["pii_ratio"],
+            )
+        result = run_case(case, path, generated[path], storage)
+        print(
+            f"{case_id(case)}: {result['mb_per_s']} MB/s, "
+            f"{result['rows_per_s']:.0f} rows/s, {result['peak_rss_mb']} MB peak RSS",
+            file=sys.stderr,
+        )
+        results.append(result)
+    return results
+
+
+def compare(
+    results: list,
+    baseline: list,
+    throughput_tolerance: float = DEFAULT_THROUGHPUT_TOLERANCE,
+    memory_tolerance: float = DEFAULT_MEMORY_TOLERANCE,
+) -> list:
+    """Compare results with a baseline.
+
+    Returns:
+        list: A description of every regression; cases missing from either
+        side are ignored.
+    """
+    expected = {case_id(case): case for case in baseline}
+    regressions = []
+    for result in results:
+        base = expected.get(case_id(result))
+        if base is None:
+            continue
+        minimum = base["mb_per_s"] * (1 - throughput_tolerance)
+        if result["mb_per_s"] < minimum:
+            regressions.append(
+                f"{case_id(result)}: {result['mb_per_s']} MB/s is below "
+                f"{minimum:.3f} (baseline {base['mb_per_s']})"
+            )
+        maximum = base["peak_rss_mb"] * (1 + memory_tolerance)
+        if result["peak_rss_mb"] > maximum:
+            regressions.append(
+                f"{case_id(result)}: {result['peak_rss_mb']} MB peak RSS is above "
+                f"{maximum:.1f} (baseline {base['peak_rss_mb']})"
+            )
+    return regressions
+
+
+def _csv_list(value: str, cast):
+    return [cast(item) for item in value.split(",") if item]
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--profile", choices=PROFILES, default="smoke")
+    parser.add_argument("--sizes", help="comma-separated file sizes in MB")
+    parser.add_argument("--columns", help="comma-separated column counts")
+    parser.add_argument("--pii-ratios", help="comma-separated PII column ratios")
+    parser.add_argument("--formats", default="csv,json,parquet")
+    parser.add_argument("--variants", help="e.g. memory,stream,raw,parallel")
+    parser.add_argument(
+        "--storage",
+        choices=["s3", "local"],
+        default="s3",
+        help="read inputs from a moto S3 bucket or straight from disk",
+    )
+    parser.add_argument("--data-dir", help="directory to keep generated files in")
+    parser.add_argument("--output", help="file to write the JSON results to")
+    parser.add_argument("--baseline", help="JSON results to compare against")
+    parser.add_argument("--compare", help="compare existing results; run nothing")
+    parser.add_argument("--save-baseline", help="file to store these results in")
+    parser.add_argument(
+        "--throughput-tolerance", type=float, default=DEFAULT_THROUGHPUT_TOLERANCE
+    )
+    parser.add_argument(
+        "--memory-tolerance", type=float, default=DEFAULT_MEMORY_TOLERANCE
+    )
+    args = parser.parse_args(argv)
+
+    if args.compare:
+        with open(args.compare) as f:
+            report = json.load(f)
+    else:
+        profile = PROFILES[args.profile]
+        cases = build_cases(
+            _csv_list(args.sizes, int) if args.sizes else profile["sizes"],
+            _csv_list(args.columns, int) if args.columns else profile["columns"],
+            _csv_list(args.pii_ratios, float)
+            if args.pii_ratios
+            else profile["pii_ratios"],
+            _csv_list(args.formats, str),
+            _csv_list(args.variants, str) if args.variants else None,
+        )
+        if args.data_dir:
+            os.makedirs(args.data_dir, exist_ok=True)
+            results = run_suite(cases, args.data_dir, args.storage)
+        else:
+            with tempfile.TemporaryDirectory() as data_dir:
+                results = run_suite(cases, data_dir, args.storage)
+        report = {
+            "environment": {
+                "python": platform.python_version(),
+                "platform": platform.platform(),
+                "cpus": os.cpu_count(),
+            },
+            "results": results,
+        }
+
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text + "\n")
+    if args.save_baseline:
+        with open(args.save_baseline, "w") as f:
+            f.write(text + "\n")
+    if not args.output and not args.save_baseline:
+        print(text)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)["results"]
+        regressions = compare(
+            report["results"],
+            baseline,
+            args.throughput_tolerance,
+            args.memory_tolerance,
+        )
+        for regression in regressions:
+            print(f"REGRESSION {regression}", file=sys.stderr)
+        if regressions:
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
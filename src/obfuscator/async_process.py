@@ -0,0 +1,279 @@
+import asyncio
+import io
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, List, Optional, Tuple, Union
+from obfuscator.formats import get_format
+from obfuscator.metrics import JobMetrics, MetricsRecorder
+from obfuscator.read_file import parse_file
+from obfuscator.process_file import (
+    _download_job,
+    _has_no_pii,
+    _is_streaming,
+    _new_recorder,
+    _obfuscate_in_memory,
+    _parse_input,
+    _pass_through,
+    _plan_job,
+    _run_job,
+    _upload_output,
+)
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_CONCURRENCY = 64
+
+
+def _obfuscate_file(job: dict, file_data: bytes) -> io.BytesIO:
+    """Parse, obfuscate and write the downloaded file of a parsed job."""
+    df = parse_file(
+        file_data,
+        job["file_format"],
+        job["compression"],
+        job["engine"],
+        list(job["strategies"]),
+    )
+    return _obfuscate_in_memory(job, df)
+
+
+class AsyncObfuscator:
+    """Obfuscates S3 files from asyncio code without blocking the event loop.
+
+    At most ``max_concurrency`` jobs are in flight at once. The S3 requests
+    of each job (probing, downloading, uploading) run on a thread pool of
+    that size, so many small objects can wait on the network at the same
+    time, while parsing, obfuscation and serialisation run on a separate
+    pool of ``cpu_workers`` threads so that they cannot starve the I/O.
+    Streaming, raw engine and Parquet jobs interleave their I/O with the
+    work on each chunk and run entirely on the CPU pool.
+
+    The S3 client's connection pool should be at least ``max_concurrency``
+    connections (see :func:`~obfuscator.s3_client.configure_s3_client`), or
+    requests queue for a connection. An obfuscator belongs to the event
+    loop it is first used in; await ``aclose`` when done, or use it as an
+    async context manager.
+
+    Args:
+        max_concurrency (int): The maximum number of jobs in flight.
+        cpu_workers (int, optional): The number of threads for CPU-bound
+            work. Defaults to the number of CPUs.
+
+    Raises:
+        ValueError: If either bound is not a positive integer.
+    """
+
+    def __init__(
+        self,
+        max_concurrency: int = DEFAULT_MAX_CONCURRENCY,
+        cpu_workers: Optional[int] = None,
+    ):
+        if not isinstance(max_concurrency, int) or max_concurrency <= 0:
+            raise ValueError("max_concurrency must be a positive integer.")
+        if cpu_workers is None:
+            cpu_workers = os.cpu_count() or 1
+        if not isinstance(cpu_workers, int) or cpu_workers <= 0:
+            raise ValueError("cpu_workers must be a positive integer.")
+
+        self.max_concurrency = max_concurrency
+        self.cpu_workers = cpu_workers
+        self._io_executor = ThreadPoolExecutor(
+            max_workers=max_concurrency, thread_name_prefix="obfuscator-io"
+        )
+        self._cpu_executor = ThreadPoolExecutor(
+            max_workers=cpu_workers, thread_name_prefix="obfuscator-cpu"
+        )
+        # Created in the event loop, which Python 3.9 binds it to
+        self._semaphore = None
+
+    async def __aenter__(self) -> "AsyncObfuscator":
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.aclose()
+
+    def close(self):
+        """Shuts down the thread pools without waiting for them.
+
+        Steps that are already running finish in the background; no new
+        steps can start.
+        """
+        self._io_executor.shutdown(wait=False)
+        self._cpu_executor.shutdown(wait=False)
+
+    def _shutdown(self):
+        self._io_executor.shutdown()
+        self._cpu_executor.shutdown()
+
+    async def aclose(self):
+        """Shuts down the thread pools and waits for their running steps.
+
+        The wait happens on another thread, so the event loop keeps running
+        other tasks meanwhile.
+        """
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(None, self._shutdown)
+
+    async def _run_step(
+        self, executor: ThreadPoolExecutor, recorder: MetricsRecorder, function, *args
+    ):
+        """Run a blocking step of a job on a pool thread and await its result."""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(executor, recorder.run, function, *args)
+
+    async def _run_job(
+        self, job: dict, recorder: MetricsRecorder
+    ) -> Union[io.BytesIO, str]:
+        report = recorder.report
+        io_executor = self._io_executor
+        if job["mode"] == "auto":
+            await self._run_step(io_executor, recorder, _plan_job, job, report)
+        if (
+            _is_streaming(job)
+            or get_format(job["file_format"], job["engine"]).reads_ranges
+        ):
+            return await self._run_step(
+                self._cpu_executor, recorder, _run_job, job, report
+            )
+
+        if await self._run_step(io_executor, recorder, _has_no_pii, job):
+            return await self._run_step(
+                io_executor, recorder, _pass_through, job, report
+            )
+        file_data = await self._run_step(io_executor, recorder, _download_job, job)
+        output = await self._run_step(
+            self._cpu_executor, recorder, _obfuscate_file, job, file_data
+        )
+        del file_data
+        if job["output_location"]:
+            return await self._run_step(
+                io_executor, recorder, _upload_output, job, report, [output.getbuffer()]
+            )
+        report.bytes_out = output.getbuffer().nbytes
+        return output
+
+    async def process_s3_file_with_metrics(
+        self,
+        json_input: str,
+        metrics_hook: Optional[Callable[[JobMetrics], None]] = None,
+    ) -> Tuple[Union[io.BytesIO, str], JobMetrics]:
+        """Process a file like :meth:`process_s3_file` and report its metrics.
+
+        The wall time of the report starts once the job is admitted, not
+        while it waits for a free slot.
+
+        Args:
+            json_input (str): JSON string containing the S3 URI and PII fields.
+            metrics_hook (callable, optional): Called with the metrics report
+                when the job finishes, whether or not it succeeded.
+
+        Returns:
+            tuple: The output of :meth:`process_s3_file` and its
+            :class:`~obfuscator.metrics.JobMetrics` report.
+
+        Raises:
+            ValueError: If the JSON input is invalid or missing required fields.
+            RuntimeError: If there is an error processing the file.
+        """
+        try:
+            job = _parse_input(json_input)
+        except ValueError as e:
+            logger.error(f"Input validation error: {e}")
+            raise
+
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        async with self._semaphore:
+            recorder = _new_recorder(job)
+            error = None
+            try:
+                return await self._run_job(job, recorder), recorder.report
+
+            except ValueError as e:
+                # Re-raise ValueError for input validation errors
+                error = e
+                logger.error(f"Input validation error: {e}")
+                raise
+            except asyncio.CancelledError as e:
+                # A step already running on a pool thread still completes
+                error = e
+                raise
+            except Exception as e:
+                # Wrap unexpected errors in RuntimeError
+                error = e
+                logger.error(f"Error processing S3 file: {e}")
+                raise RuntimeError(f"Error processing S3 file: {e}")
+            finally:
+                recorder.finish(error, metrics_hook)
+
+    async def process_s3_file(
+        self,
+        json_input: str,
+        metrics_hook: Optional[Callable[[JobMetrics], None]] = None,
+    ) -> Union[io.BytesIO, str]:
+        """Process a file from S3 like :func:`~obfuscator.process_file.process_s3_file`.
+
+        Waits for a free slot if ``max_concurrency`` jobs are already running.
+
+        Args:
+            json_input (str): JSON string containing the S3 URI and PII fields,
+                with the same options as the blocking API.
+            metrics_hook (callable, optional): Called with a
+                :class:`~obfuscator.metrics.JobMetrics` report when the job
+                finishes.
+
+        Returns:
+            io.BytesIO | str: The byte stream of the processed file, or the
+            output location if one was given.
+
+        Raises:
+            ValueError: If the JSON input is invalid or missing required fields.
+            RuntimeError: If there is an error processing the file.
+        """
+        output, _ = await self.process_s3_file_with_metrics(json_input, metrics_hook)
+        return output
+
+    async def process_s3_files(
+        self,
+        json_inputs: List[str],
+        metrics_hook: Optional[Callable[[JobMetrics], None]] = None,
+    ) -> List[Union[io.BytesIO, str, Exception]]:
+        """Process many files concurrently, up to ``max_concurrency`` at once.
+
+        Args:
+            json_inputs (list): A JSON input string per file.
+            metrics_hook (callable, optional): Called with the metrics report
+                of each file as it finishes.
+
+        Returns:
+            list: The output of each file in input order, or the exception
+            it raised. A failed file does not stop the others.
+        """
+        jobs = [self.process_s3_file(j, metrics_hook) for j in json_inputs]
+        return await asyncio.gather(*jobs, return_exceptions=True)
+
+
+async def process_s3_file_async(
+    json_input: str,
+    metrics_hook: Optional[Callable[[JobMetrics], None]] = None,
+) -> Union[io.BytesIO, str]:
+    """Process a single file from S3 without blocking the event loop.
+
+    For many files, share one :class:`AsyncObfuscator` instead, which bounds
+    the number of jobs in flight and reuses its threads.
+
+    Args:
+        json_input (str): JSON string containing the S3 URI and PII fields.
+        metrics_hook (callable, optional): Called with the metrics report when
+            the job finishes.
+
+    Returns:
+        io.BytesIO | str: The byte stream of the processed file, or the
+        output location if one was given.
+
+    Raises:
+        ValueError: If the JSON input is invalid or missing required fields.
+        RuntimeError: If there is an error processing the file.
+    """
+    async with AsyncObfuscator(max_concurrency=1, cpu_workers=1) as obfuscator:
+        return await obfuscator.process_s3_file(json_input, metrics_hook)
@@ -0,0 +1,158 @@
+import io
+import json
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Callable, List, Optional, Union
+from obfuscator.process_file import process_s3_file
+from obfuscator.formats import FORMATS
+from obfuscator.metrics import JobMetrics
+from obfuscator.compression import split_compression
+from obfuscator.s3_client import get_s3_client
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_WORKERS = 8
+
+
+@dataclass
+class BatchResult:
+    """The outcome of obfuscating one object in a batch.
+
+    Attributes:
+        s3_uri (str): The S3 URI of the object.
+        output (io.BytesIO | str, optional): The obfuscated file, or the S3
+            URI it was written to, if it succeeded.
+        error (Exception, optional): The error raised, if it failed.
+        metrics (JobMetrics, optional): The metrics report of the object,
+            unless its input was rejected before processing started.
+    """
+
+    s3_uri: str
+    output: Optional[Union[io.BytesIO, str]] = None
+    error: Optional[Exception] = None
+    metrics: Optional[JobMetrics] = None
+
+    @property
+    def succeeded(self) -> bool:
+        return self.error is None
+
+
+def list_s3_uris(prefix_uri: str) -> List[str]:
+    """Lists the URIs of all supported files under an S3 prefix.
+
+    Args:
+        prefix_uri (str): An S3 URI of the form ``s3://bucket/prefix/``.
+
+    Returns:
+        list: The S3 URIs of every CSV, JSON and Parquet object under the
+        prefix, including compressed ones, in key order.
+
+    Raises:
+        ValueError: If the URI has no bucket name.
+    """
+    bucket_name, _, prefix = prefix_uri.replace("s3://", "").partition("/")
+    if not bucket_name:
+        raise ValueError("Invalid S3 URI format.")
+
+    s3_client = get_s3_client()
+    paginator = s3_client.get_paginator("list_objects_v2")
+    uris = []
+    for page in paginator.paginate(Bucket=bucket_name, Prefix=prefix):
+        for obj in page.get("Contents", []):
+            key = obj["Key"]
+            if split_compression(key)[0] in FORMATS:
+                uris.append(f"s3://{bucket_name}/{key}")
+            else:
+                logger.info(f"Skipping unsupported object: {bucket_name}/{key}")
+    return uris
+
+
+def _process_one(
+    s3_uri: str,
+    job: dict,
+    output_prefix: Optional[str],
+    metrics_hook: Optional[Callable[[JobMetrics], None]] = None,
+) -> BatchResult:
+    """Process a single object of the batch, capturing any error."""
+    job = {**job, "file_to_obfuscate": s3_uri}
+    if output_prefix:
+        object_key = s3_uri.replace("s3://", "").split("/", 1)[-1]
+        job["output_location"] = output_prefix.rstrip("/") + "/" + object_key
+
+    reports = []
+
+    def hook(report: JobMetrics):
+        reports.append(report)
+        if metrics_hook is not None:
+            metrics_hook(report)
+
+    try:
+        output = process_s3_file(json.dumps(job), metrics_hook=hook)
+        return BatchResult(s3_uri, output=output, metrics=reports[0])
+    except Exception as e:
+        return BatchResult(s3_uri, error=e, metrics=reports[0] if reports else None)
+
+
+def process_s3_batch(
+    json_input: str,
+    metrics_hook: Optional[Callable[[JobMetrics], None]] = None,
+) -> List[BatchResult]:
+    """Obfuscate many S3 objects concurrently.
+
+    ``files_to_obfuscate`` is either a list of S3 URIs or a single
+    ``s3://bucket/prefix/`` URI ending in ``/``, whose objects are listed
+    page by page. Every other field of the input (``pii_fields``, ``mode``,
+    ``engine`` and so on) is applied to each object as in
+    :func:`process_s3_file`. With an ``output_prefix``, each output is
+    uploaded to the prefix followed by the object's key instead of being
+    held in memory.
+
+    Args:
+        json_input (str): JSON string containing the files to obfuscate, the
+            PII fields and an optional ``max_workers`` bound on concurrency.
+        metrics_hook (callable, optional): Called with the metrics report of
+            each object as it finishes. It may be called from several
+            threads at once.
+
+    Returns:
+        list: A :class:`BatchResult` per object, in input (or key) order.
+        A failed object does not stop the rest of the batch.
+
+    Raises:
+        ValueError: If the JSON input is invalid or missing required fields.
+    """
+    try:
+        input_data = json.loads(json_input)
+    except json.JSONDecodeError as e:
+        raise ValueError(f"Invalid JSON input: {e}")
+
+    files = input_data.pop("files_to_obfuscate", None)
+    max_workers = input_data.pop("max_workers", DEFAULT_MAX_WORKERS)
+    output_prefix = input_data.pop("output_prefix", None)
+    if not files:
+        raise ValueError("Missing required S3 file locations.")
+    if not isinstance(max_workers, int) or max_workers <= 0:
+        raise ValueError("max_workers must be a positive integer.")
+
+    if isinstance(files, str):
+        if not files.endswith("/"):
+            raise ValueError("An S3 prefix must end with '/'.")
+        s3_uris = list_s3_uris(files)
+    else:
+        s3_uris = list(files)
+
+    logger.info(f"Processing {len(s3_uris)} files with {max_workers} workers")
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = [
+            executor.submit(
+                _process_one, s3_uri, input_data, output_prefix, metrics_hook
+            )
+            for s3_uri in s3_uris
+        ]
+        results = [future.result() for future in futures]
+
+    failures = sum(not result.succeeded for result in results)
+    if failures:
+        logger.warning(f"{failures} of {len(results)} files failed to process")
+    return results
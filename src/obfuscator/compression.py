@@ -0,0 +1,195 @@
+import bz2
+import os
+import zlib
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from itertools import chain
+from typing import Iterable, Iterator, Optional, Tuple
+
+COMPRESSION_EXTENSIONS = {
+    "gz": "gzip",
+    "gzip": "gzip",
+    "bz2": "bz2",
+    "zst": "zstd",
+    "zstd": "zstd",
+}
+COMPRESSION_LEVELS = {"gzip": 6, "bz2": 9, "zstd": 3}
+DEFAULT_BLOCK_SIZE = 4 * 1024 * 1024  # bytes of input per compressed block
+DEFAULT_MAX_WORKERS = min(8, os.cpu_count() or 1)
+
+
+def split_compression(object_key: str) -> Tuple[str, Optional[str]]:
+    """Split an object key into its file format and compression.
+
+    Args:
+        object_key (str): The key of an object, such as ``data.csv.gz``.
+
+    Returns:
+        tuple: The file format (``csv``) and the compression (``gzip``), or
+        None if the key has no compression extension.
+    """
+    extensions = object_key.split(".")
+    compression = COMPRESSION_EXTENSIONS.get(extensions[-1])
+    if compression is None:
+        return extensions[-1], None
+    return (extensions[-2] if len(extensions) > 2 else ""), compression
+
+
+def _zstandard():
+    """Import the optional zstandard package."""
+    try:
+        import zstandard
+    except ImportError:
+        raise RuntimeError(
+            "zstd compression requires the zstandard package "
+            "(pip install zstandard)."
+        )
+    return zstandard
+
+
+def _new_decompressor(compression: str):
+    if compression == "gzip":
+        return zlib.decompressobj(zlib.MAX_WBITS | 16)
+    if compression == "bz2":
+        return bz2.BZ2Decompressor()
+    if compression == "zstd":
+        return _zstandard().ZstdDecompressor().decompressobj()
+    raise ValueError(f"Unsupported compression: {compression}")
+
+
+def decompress_chunks(chunks: Iterable[bytes], compression: str) -> Iterator[bytes]:
+    """Decompresses a byte stream incrementally, chunk by chunk.
+
+    Concatenated members (multi-member gzip, multi-stream bz2 and
+    multi-frame zstd, as written by parallel compressors) are decompressed
+    one after another.
+
+    Args:
+        chunks (Iterable[bytes]): The compressed stream, split anywhere.
+        compression (str): ``"gzip"``, ``"bz2"`` or ``"zstd"``.
+
+    Yields:
+        bytes: Successive pieces of the decompressed stream.
+
+    Raises:
+        ValueError: If the stream is corrupt or ends mid-member.
+        RuntimeError: If zstd is requested without zstandard installed.
+    """
+    decompressor = _new_decompressor(compression)
+    in_member = False
+    for chunk in chunks:
+        data = chunk
+        while data:
+            in_member = True
+            try:
+                output = decompressor.decompress(data)
+            except Exception as e:  # zlib.error, OSError or ZstdError
+                raise ValueError(f"Invalid {compression} data: {e}")
+            if output:
+                yield output
+            if not decompressor.eof:
+                break
+            # A member ended; anything left over starts the next one
+            data = decompressor.unused_data
+            decompressor = _new_decompressor(compression)
+            in_member = False
+    if in_member:
+        raise ValueError(f"Truncated {compression} data.")
+
+
+def decompress_bytes(data: bytes, compression: str) -> bytes:
+    """Decompress a whole buffer; see :func:`decompress_chunks`."""
+    return b"".join(decompress_chunks([data], compression))
+
+
+def _compress_block(block: bytes, compression: str, level: int) -> bytes:
+    """Compress one block as a complete, independently readable member."""
+    if compression == "gzip":
+        compressor = zlib.compressobj(level, zlib.DEFLATED, zlib.MAX_WBITS | 16)
+        return compressor.compress(block) + compressor.flush()
+    return bz2.compress(block, level)
+
+
+def _blocks(chunks: Iterable[bytes], block_size: int) -> Iterator[bytes]:
+    """Regroup chunks into blocks of ``block_size`` bytes; the last is shorter."""
+    pending = []
+    size = 0
+    for chunk in chunks:
+        pending.append(chunk)
+        size += len(chunk)
+        if size >= block_size:
+            data = b"".join(pending)
+            end = len(data) - len(data) % block_size
+            for start in range(0, end, block_size):
+                yield data[start : start + block_size]
+            pending = [data[end:]]
+            size = len(data) - end
+    if size:
+        yield b"".join(pending)
+
+
+def compress_chunks(
+    chunks: Iterable[bytes],
+    compression: str,
+    level: Optional[int] = None,
+    block_size: int = DEFAULT_BLOCK_SIZE,
+    max_workers: int = DEFAULT_MAX_WORKERS,
+) -> Iterator[bytes]:
+    """Compresses a byte stream, using several cores for large outputs.
+
+    gzip and bz2 output is cut into blocks of ``block_size`` bytes that are
+    compressed on a thread pool (zlib and bz2 release the GIL) as separate
+    members of one file. Standard tools and readers decompress them as a
+    single stream. At most two blocks per worker are in flight at once. zstd
+    output is compressed by zstandard's own worker threads as one frame.
+    Output that fits in one block is compressed inline.
+
+    Args:
+        chunks (Iterable[bytes]): The uncompressed stream, split anywhere.
+        compression (str): ``"gzip"``, ``"bz2"`` or ``"zstd"``.
+        level (int, optional): The compression level. Defaults to 6 for gzip,
+            9 for bz2 and 3 for zstd.
+        block_size (int): The number of input bytes per gzip or bz2 block.
+        max_workers (int): The maximum number of blocks compressed at once.
+
+    Yields:
+        bytes: Successive pieces of the compressed stream.
+
+    Raises:
+        ValueError: If the compression is unsupported.
+        RuntimeError: If zstd is requested without zstandard installed.
+    """
+    if compression not in COMPRESSION_LEVELS:
+        raise ValueError(f"Unsupported compression: {compression}")
+    if level is None:
+        level = COMPRESSION_LEVELS[compression]
+
+    if compression == "zstd":
+        zstandard = _zstandard()
+        compressor = zstandard.ZstdCompressor(level=level, threads=-1).compressobj()
+        for chunk in chunks:
+            output = compressor.compress(chunk)
+            if output:
+                yield output
+        yield compressor.flush()
+        return
+
+    blocks = _blocks(chunks, block_size)
+    first = next(blocks, b"")
+    second = next(blocks, None)
+    if second is None or max_workers == 1:
+        remaining = chain([first], [] if second is None else [second], blocks)
+        for block in remaining:
+            yield _compress_block(block, compression, level)
+        return
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        in_flight = deque()
+        for block in chain([first, second], blocks):
+            in_flight.append(
+                executor.submit(_compress_block, block, compression, level)
+            )
+            if len(in_flight) >= 2 * max_workers:
+                yield in_flight.popleft().result()
+        while in_flight:
+            yield in_flight.popleft().result()
@@ -0,0 +1,220 @@
+import codecs
+import re
+from typing import Iterable, Iterator, List, Optional
+
+OBFUSCATED_FIELD = b"***"
+
+# A quoted field (with "" escapes, tolerating stray bytes after the closing
+# quote) or an unquoted field running up to the next delimiter.
+_FIELD_PATTERN = re.compile(rb'"(?:[^"]|"")*"[^,]*|[^,]*')
+
+
+def _split_fields(record: bytes) -> List[bytes]:
+    """Split one CSV record into its raw fields, honouring quotes (RFC 4180)."""
+    if b'"' not in record:
+        return record.split(b",")
+
+    fields = []
+    position = 0
+    while True:
+        match = _FIELD_PATTERN.match(record, position)
+        fields.append(match.group())
+        position = match.end()
+        if position >= len(record) or record[position : position + 1] != b",":
+            return fields
+        position += 1
+
+
+def _unquote(field: bytes) -> str:
+    """Return the text value of a raw header field.
+
+    A UTF-8 byte order mark is dropped before the quotes are, as pandas
+    does, so the first field of an Excel-style ``\ufeff"name"`` header is
+    ``name``.
+    """
+    if field.startswith(codecs.BOM_UTF8):
+        field = field[len(codecs.BOM_UTF8) :]
+    if field.startswith(b'"') and field.endswith(b'"') and len(field) >= 2:
+        field = field[1:-1].replace(b'""', b'"')
+    return field.decode("utf-8")
+
+
+def _quote(text: str) -> bytes:
+    """Return a value as a raw field, quoted only if it needs to be."""
+    if any(character in text for character in ',"\r\n'):
+        text = '"' + text.replace('"', '""') + '"'
+    return text.encode("utf-8")
+
+
+class CsvRewriter:
+    """Rewrites the PII fields of a CSV byte stream without parsing values.
+
+    The header is read to find the indices of the PII columns; every later
+    record is split on unquoted commas, those fields are replaced with
+    ``***`` (or the output of the field's strategy) and the record is
+    joined again. All other bytes, including quoting, line endings and number
+    formatting, are passed through exactly as they appear in the input.
+
+    Args:
+        pii_fields (list): List of fields to obfuscate.
+        strategies (dict, optional): A strategy per field that is obfuscated
+            from the text of its raw value instead of replaced with ``***``.
+    """
+
+    def __init__(self, pii_fields: list, strategies: Optional[dict] = None):
+        self.pii_fields = pii_fields
+        self.strategies = strategies or {}
+        self._pii_indices = None
+        self._field_strategies = {}
+        self._tail = b""
+        self._open_record = []
+        self._in_quotes = False
+
+    def _rewrite_plain_lines(self, lines: List[bytes]) -> List[bytes]:
+        """Rewrite lines known to contain no quotes or carriage returns.
+
+        This is the hot loop for typical files, so it skips the per-line
+        checks that ``_rewrite_lines`` needs for quoted records.
+        """
+        pii_indices = self._pii_indices
+        output = []
+        append = output.append
+        if self._field_strategies:
+            for line in lines:
+                if line:
+                    line = b",".join(self._replace_fields(line.split(b",")))
+                append(line)
+            return output
+        for line in lines:
+            if line:
+                fields = line.split(b",")
+                field_count = len(fields)
+                for index in pii_indices:
+                    if index < field_count:
+                        fields[index] = OBFUSCATED_FIELD
+                line = b",".join(fields)
+            append(line)
+        return output
+
+    def _replace_fields(self, fields: List[bytes]) -> List[bytes]:
+        """Replace the PII fields of a split record in place."""
+        field_count = len(fields)
+        field_strategies = self._field_strategies
+        for index in self._pii_indices:
+            if index < field_count:
+                strategy = field_strategies.get(index)
+                if strategy is None:
+                    fields[index] = OBFUSCATED_FIELD
+                else:
+                    fields[index] = strategy.obfuscate_field(fields[index])
+        return fields
+
+    def _rewrite_record(self, record: bytes) -> bytes:
+        """Return the record with its PII fields replaced."""
+        line_ending = b""
+        if record.endswith(b"\r"):
+            record, line_ending = record[:-1], b"\r"
+        if not record:
+            return record + line_ending
+
+        fields = _split_fields(record)
+        if self._pii_indices is None:
+            names = [_unquote(field) for field in fields]
+            self._pii_indices = [
+                index for index, name in enumerate(names) if name in self.pii_fields
+            ]
+            self._field_strategies = {
+                index: self.strategies[names[index]]
+                for index in self._pii_indices
+                if names[index] in self.strategies
+            }
+            return record + line_ending
+
+        if not self._pii_indices:
+            return record + line_ending
+        return b",".join(self._replace_fields(fields)) + line_ending
+
+    def _rewrite_lines(self, lines: List[bytes]) -> List[bytes]:
+        """Rewrite complete lines, joining lines that share a quoted field."""
+        output = []
+        for line in lines:
+            if self._in_quotes or line.count(b'"') % 2:
+                self._open_record.append(line)
+                if line.count(b'"') % 2:
+                    self._in_quotes = not self._in_quotes
+                if self._in_quotes:
+                    continue
+                line = b"\n".join(self._open_record)
+                self._open_record = []
+            output.append(self._rewrite_record(line))
+        return output
+
+    def feed(self, chunk: bytes) -> bytes:
+        """Rewrite the next chunk of input.
+
+        Args:
+            chunk (bytes): The next bytes of the CSV file, split anywhere.
+
+        Returns:
+            bytes: The rewritten output for every record completed so far.
+        """
+        data = self._tail + chunk
+        end = data.rfind(b"\n") + 1
+        self._tail = data[end:]
+        complete = data[:end]
+        if not complete:
+            return b""
+
+        if self._pii_indices == [] and not self._in_quotes:
+            return complete
+
+        lines = complete.split(b"\n")
+        if (
+            self._pii_indices
+            and not self._in_quotes
+            and b'"' not in complete
+            and b"\r" not in complete
+        ):
+            return b"\n".join(self._rewrite_plain_lines(lines))
+
+        lines.pop()
+        output = self._rewrite_lines(lines)
+        return b"".join(record + b"\n" for record in output)
+
+    def close(self) -> bytes:
+        """Flush the final record, which may lack a trailing newline.
+
+        Returns:
+            bytes: The rewritten output for the remaining input.
+        """
+        output = self._rewrite_lines([self._tail]) if self._tail else []
+        if self._open_record:
+            # Unterminated quoted field at the end of the file; pass it through.
+            output.append(b"\n".join(self._open_record))
+            self._open_record = []
+        self._tail = b""
+        return b"\n".join(output)
+
+
+def rewrite_csv(
+    chunks: Iterable[bytes], pii_fields: list, strategies: Optional[dict] = None
+) -> Iterator[bytes]:
+    """Rewrites the PII fields of a CSV byte stream, chunk by chunk.
+
+    Args:
+        chunks (Iterable[bytes]): The CSV file, split into chunks anywhere.
+        pii_fields (list): List of fields to obfuscate.
+        strategies (dict, optional): A strategy per field that is not masked
+            with ``***``.
+
+    Yields:
+        bytes: The rewritten CSV, with every other byte left unchanged.
+    """
+    rewriter = CsvRewriter(pii_fields, strategies)
+    for chunk in chunks:
+        output = rewriter.feed(chunk)
+        if output:
+            yield output
+    output = rewriter.close()
+    if output:
+        yield output
@@ -0,0 +1,484 @@
+from __future__ import annotations
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Dict, Optional
+
+if TYPE_CHECKING:
+    import pandas as pd
+    import pyarrow as pa
+
+PARQUET_CODECS = ["none", "snappy", "gzip", "brotli", "lz4", "zstd"]
+
+
+@dataclass
+class WriterOptions:
+    """Tuning of the writers that serialise the output.
+
+    Attributes:
+        parquet_compression (str): The Parquet compression codec, one of
+            :data:`PARQUET_CODECS`.
+        parquet_compression_level (int, optional): The level of the codec,
+            for codecs that have levels (gzip, brotli, zstd).
+        row_group_size (int, optional): The maximum number of rows per
+            Parquet row group. Defaults to pyarrow's.
+        use_dictionary (bool): Whether Parquet columns are dictionary
+            encoded. Masked columns hold one repeated value, so they encode
+            to a one-entry dictionary and almost no data.
+        batch_size (int, optional): The number of rows serialised at a time
+            for CSV and JSON, which bounds the text held in memory while
+            writing. Defaults to the whole DataFrame.
+    """
+
+    parquet_compression: str = "snappy"
+    parquet_compression_level: Optional[int] = None
+    row_group_size: Optional[int] = None
+    use_dictionary: bool = True
+    batch_size: Optional[int] = None
+
+    def parquet_writer_kwargs(self) -> dict:
+        """Return the options of a ``pyarrow.parquet.ParquetWriter``."""
+        return {
+            "compression": self.parquet_compression,
+            "compression_level": self.parquet_compression_level,
+            "use_dictionary": self.use_dictionary,
+        }
+
+
+def parse_writer_options(input_data: dict) -> WriterOptions:
+    """Build the writer options from the fields of a JSON input.
+
+    The fields are ``parquet_compression``, ``parquet_compression_level``,
+    ``row_group_size``, ``use_dictionary`` and ``write_batch_size``.
+
+    Raises:
+        ValueError: If an option is out of range.
+    """
+    options = WriterOptions(
+        parquet_compression=input_data.get("parquet_compression", "snappy"),
+        parquet_compression_level=input_data.get("parquet_compression_level"),
+        row_group_size=input_data.get("row_group_size"),
+        use_dictionary=input_data.get("use_dictionary", True),
+        batch_size=input_data.get("write_batch_size"),
+    )
+    if options.parquet_compression not in PARQUET_CODECS:
+        raise ValueError(
+            f"Unsupported Parquet compression: {options.parquet_compression}"
+        )
+    level = options.parquet_compression_level
+    if level is not None and not isinstance(level, int):
+        raise ValueError("parquet_compression_level must be an integer.")
+    for name, value in (
+        ("row_group_size", options.row_group_size),
+        ("write_batch_size", options.batch_size),
+    ):
+        if value is not None and (not isinstance(value, int) or value <= 0):
+            raise ValueError(f"{name} must be a positive integer.")
+    if not isinstance(options.use_dictionary, bool):
+        raise ValueError("use_dictionary must be true or false.")
+    return options
+
+
+class FileFormat(ABC):
+    """Base class of the reader and writer of one file format.
+
+    An instance reads or writes one file. Whole files are written with
+    :meth:`write`; files written chunk by chunk get :meth:`write_chunk` (or
+    :meth:`write_arrow_chunk`) once per chunk and then :meth:`finish`, so
+    instances may keep state between chunks, such as whether the CSV header
+    has been written.
+
+    Attributes:
+        compressible (bool): Whether files of the format may have a
+            compression extension such as ``.gz``.
+        reads_ranges (bool): Whether :meth:`read` is given a seekable file
+            to read ranges of, rather than the whole downloaded file.
+        expansion_factor (float): Roughly how many times its size in bytes
+            a file takes in memory while it is processed whole, counting
+            its bytes, its DataFrame and the output.
+
+    Args:
+        options (WriterOptions, optional): Tuning of the writer.
+        schema (pyarrow.Schema, optional): The schema of a file written in
+            chunks, for formats that have one. Defaults to the schema of the
+            first chunk.
+    """
+
+    compressible = True
+    reads_ranges = False
+    expansion_factor = 5.0
+
+    def __init__(
+        self,
+        options: Optional[WriterOptions] = None,
+        schema: Optional[pa.Schema] = None,
+    ):
+        self.options = options or WriterOptions()
+        self.schema = schema
+
+    @abstractmethod
+    def read(
+        self,
+        source,
+        pii_fields: Optional[list] = None,
+        text_fields: Optional[list] = None,
+    ) -> pd.DataFrame:
+        """Parse a file into a DataFrame.
+
+        Args:
+            source: The decompressed contents of the file as a bytes-like
+                object, or a seekable file if :attr:`reads_ranges` is set.
+            pii_fields (list, optional): Fields that will be obfuscated,
+                which readers may skip and return as '***'.
+            text_fields (list, optional): Fields that are obfuscated from
+                their text, which text formats read as strings instead of
+                inferring their types, so every engine and mode obfuscates
+                the same text.
+
+        Returns:
+            pd.DataFrame: The contents of the file.
+
+        Raises:
+            ValueError: If the file is empty or cannot be parsed.
+        """
+
+    @abstractmethod
+    def write(self, dataframe: pd.DataFrame, buffer):
+        """Write a DataFrame as a whole file to a binary file."""
+
+    def write_chunk(self, dataframe: pd.DataFrame, buffer):
+        """Write the next chunk of a file to a binary file.
+
+        Defaults to writing each chunk as a whole file, which suits formats
+        whose files can simply be concatenated.
+        """
+        self.write(dataframe, buffer)
+
+    def write_arrow_chunk(self, data, buffer):
+        """Write the next chunk of a file from a ``pyarrow`` table or batch."""
+        self.write_chunk(data.to_pandas(), buffer)
+
+    def finish(self, buffer):
+        """Write the end of a file written in chunks."""
+
+
+def records_frame(records: list, text_fields: Optional[list] = None) -> pd.DataFrame:
+    """Build a DataFrame from parsed JSON records.
+
+    The values of ``text_fields`` are kept as their text (see
+    :func:`~obfuscator.json_stream.json_text`) rather than converted with
+    the rest of their column, so ``1`` is not read as ``1.0`` in a column
+    with missing values.
+    """
+    import pandas as pd
+    from obfuscator.json_stream import json_text
+
+    dataframe = pd.DataFrame.from_records(records)
+    for field in text_fields or ():
+        if field in dataframe.columns:
+            values = [json_text(record.get(field)) for record in records]
+            dataframe[field] = pd.Series(values, index=dataframe.index, dtype=object)
+    return dataframe
+
+
+def _batches(dataframe: pd.DataFrame, batch_size: Optional[int]):
+    """Yield successive slices of at most ``batch_size`` rows."""
+    if batch_size is None or len(dataframe) <= batch_size:
+        yield dataframe
+        return
+    for start in range(0, len(dataframe), batch_size):
+        yield dataframe.iloc[start : start + batch_size]
+
+
+def _align_columns(dataframe: pd.DataFrame, columns: Optional[list]) -> pd.DataFrame:
+    """Return a chunk with the columns of the first chunk, in their order.
+
+    Fields that the chunk lacks are added as missing values without a type,
+    so that they can take the type of the first chunk's column.
+
+    Raises:
+        ValueError: If the chunk has fields that the first chunk did not
+            have, which cannot be added once the header or schema of the
+            file is written.
+    """
+    if columns is None or list(dataframe.columns) == columns:
+        return dataframe
+    extra = [str(name) for name in dataframe.columns if name not in columns]
+    if extra:
+        raise ValueError(
+            f"A chunk has fields that the first chunk does not have "
+            f"({', '.join(extra)}); convert the file in memory mode"
+        )
+    missing = [name for name in columns if name not in dataframe.columns]
+    dataframe = dataframe.reindex(columns=columns)
+    for name in missing:
+        dataframe[name] = dataframe[name].astype(object)
+    return dataframe
+
+
+class CsvFormat(FileFormat):
+    """CSV files, read and written with pandas.
+
+    Every chunk of a file written in chunks is written with the columns of
+    the first one, under its header.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._header = True
+        self._columns = None
+
+    def read(self, source, pii_fields=None, text_fields=None):
+        import pandas as pd
+        from obfuscator.s3_file import MemoryFile
+
+        dtype = dict.fromkeys(text_fields or (), str)
+        return pd.read_csv(MemoryFile(source), dtype=dtype)
+
+    def write(self, dataframe, buffer):
+        dataframe.to_csv(
+            buffer,
+            index=False,
+            header=self._header,
+            chunksize=self.options.batch_size,
+        )
+
+    def write_chunk(self, dataframe, buffer):
+        dataframe = _align_columns(dataframe, self._columns)
+        self.write(dataframe, buffer)
+        self._header = False
+        self._columns = list(dataframe.columns)
+
+
+class JsonFormat(FileFormat):
+    """JSON files holding a top-level array of records or JSON Lines, read
+    record by record as in stream mode and written as JSON Lines.
+
+    Parsing the records the way stream mode does keeps the output of a file
+    the same whichever mode its size selects, and lets the values of text
+    fields keep their text.
+    """
+
+    # Keys repeated in every record make the text larger than its values
+    expansion_factor = 4.0
+
+    def read(self, source, pii_fields=None, text_fields=None):
+        from obfuscator.json_stream import JsonRecordParser
+
+        parser = JsonRecordParser()
+        records = parser.feed(bytes(source)) + parser.close()
+        return records_frame(records, text_fields)
+
+    def write(self, dataframe, buffer):
+        # to_json builds the whole document as a string before writing it
+        for batch in _batches(dataframe, self.options.batch_size):
+            batch.to_json(buffer, orient="records", lines=True)
+
+
+def _typed_schema(schema: pa.Schema) -> pa.Schema:
+    """Replace the null type of columns without any values with strings."""
+    import pyarrow as pa
+
+    fields = [
+        field.with_type(pa.string()) if pa.types.is_null(field.type) else field
+        for field in schema
+    ]
+    return pa.schema(fields, metadata=schema.metadata)
+
+
+class ParquetFormat(FileFormat):
+    """Parquet files, read and written with pyarrow.
+
+    Reads fetch the footer first and then only the non-PII column chunks;
+    the PII columns are added back as '***' without being downloaded or
+    decoded. Files written in chunks go through one ``ParquetWriter``, and
+    every chunk must have the types of the first one (or of ``schema``);
+    chunks whose types can be cast to them are cast. Columns that are empty
+    in the first chunk have no type yet and are written as strings.
+    """
+
+    compressible = False
+    reads_ranges = True
+    # Encoded and compressed columns decode to many times their size
+    expansion_factor = 10.0
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._writer = None
+        self._columns = None
+
+    def read(self, source, pii_fields=None, text_fields=None):
+        import pandas as pd
+        import pyarrow.parquet as pq
+        from obfuscator.obfuscate_pii import insert_obfuscated_columns
+
+        if source.seek(0, 2) == 0:
+            raise pd.errors.EmptyDataError("Empty parquet file")
+        source.seek(0)
+        pii_fields = pii_fields or []
+        parquet_file = pq.ParquetFile(source, pre_buffer=True)
+        schema = parquet_file.schema_arrow
+        columns = [name for name in schema.names if name not in pii_fields]
+        table = parquet_file.read(columns=columns, use_pandas_metadata=True)
+        return insert_obfuscated_columns(table, schema, pii_fields).to_pandas()
+
+    def write(self, dataframe, buffer):
+        kwargs = self.options.parquet_writer_kwargs()
+        dataframe.to_parquet(
+            buffer,
+            index=False,
+            compression=kwargs.pop("compression"),
+            row_group_size=self.options.row_group_size,
+            **kwargs,
+        )
+
+    def write_chunk(self, dataframe, buffer):
+        import pyarrow as pa
+
+        dataframe = _align_columns(dataframe, self._columns)
+        self._columns = list(dataframe.columns)
+        self.write_arrow_chunk(
+            pa.Table.from_pandas(dataframe, preserve_index=False), buffer
+        )
+
+    def _open_writer(self, schema: pa.Schema, buffer):
+        import pyarrow.parquet as pq
+
+        self._writer = pq.ParquetWriter(
+            buffer, schema, **self.options.parquet_writer_kwargs()
+        )
+
+    def write_arrow_chunk(self, data, buffer):
+        import pyarrow as pa
+
+        if self._writer is None:
+            self._open_writer(self.schema or _typed_schema(data.schema), buffer)
+        schema = self._writer.schema
+        if not data.schema.equals(schema):
+            try:
+                data = data.cast(schema)
+            except (pa.ArrowInvalid, pa.ArrowNotImplementedError) as e:
+                raise ValueError(
+                    f"A chunk does not match the Parquet schema of the first: {e}"
+                )
+        if isinstance(data, pa.RecordBatch):
+            self._writer.write_batch(data, row_group_size=self.options.row_group_size)
+        else:
+            self._writer.write_table(data, row_group_size=self.options.row_group_size)
+
+    def finish(self, buffer):
+        if self._writer is None:
+            import pyarrow as pa
+
+            self._open_writer(self.schema or pa.schema([]), buffer)
+        self._writer.close()
+
+
+def _arrow_buffer(source):
+    """Wrap a bytes-like object in a pyarrow reader without copying it."""
+    import pyarrow as pa
+
+    return pa.BufferReader(pa.py_buffer(source))
+
+
+class ArrowCsvFormat(CsvFormat):
+    """CSV files parsed on several threads with ``pyarrow.csv.read_csv``.
+
+    Values are read as pandas reads them: empty strings are missing, text
+    fields are strings, and timestamps are not parsed while the dates and
+    times that pyarrow always infers are turned back into their text. Files
+    are written like :class:`CsvFormat`, so outputs match the pandas engine.
+    """
+
+    def read(self, source, pii_fields=None, text_fields=None):
+        import pandas as pd
+        import pyarrow as pa
+        import pyarrow.csv as pa_csv
+
+        try:
+            table = pa_csv.read_csv(
+                _arrow_buffer(source),
+                read_options=pa_csv.ReadOptions(use_threads=True),
+                convert_options=pa_csv.ConvertOptions(
+                    column_types=dict.fromkeys(text_fields or (), pa.string()),
+                    strings_can_be_null=True,
+                    timestamp_parsers=[],
+                ),
+            )
+        except pa.ArrowInvalid as e:
+            if "Empty CSV file" in str(e):
+                raise pd.errors.EmptyDataError("No columns to parse from file")
+            raise
+        for index, field in enumerate(table.schema):
+            if pa.types.is_temporal(field.type):
+                # ISO dates and times, which cast back to the same text
+                column = table.column(index).cast(pa.string())
+                table = table.set_column(index, field.name, column)
+        return table.to_pandas()
+
+
+class ArrowJsonFormat(JsonFormat):
+    """JSON Lines files parsed on several threads with
+    ``pyarrow.json.read_json``.
+
+    ``pyarrow`` reads only JSON Lines and infers a type for every column, so
+    empty files, files holding a top-level array and files with text fields
+    are parsed like :class:`JsonFormat` instead. Files are written like
+    :class:`JsonFormat`.
+    """
+
+    def read(self, source, pii_fields=None, text_fields=None):
+        import pyarrow.json as pa_json
+
+        start = bytes(memoryview(source)[:4096]).lstrip()
+        if text_fields or not start or start.startswith(b"["):
+            return super().read(source, pii_fields, text_fields)
+        table = pa_json.read_json(
+            _arrow_buffer(source),
+            read_options=pa_json.ReadOptions(use_threads=True),
+        )
+        return table.to_pandas()
+
+
+FORMATS: Dict[str, Dict[str, type]] = {
+    "csv": {"pandas": CsvFormat, "pyarrow": ArrowCsvFormat},
+    "json": {"pandas": JsonFormat, "pyarrow": ArrowJsonFormat},
+    "parquet": {"pandas": ParquetFormat, "pyarrow": ParquetFormat},
+}
+
+
+def register_format(name: str, engine: str, file_format: type):
+    """Make a file format available to an engine.
+
+    The format is then read and written in memory mode, selected by the
+    extension of the object key and by ``output_format``.
+
+    Args:
+        name (str): The format's name, which is the file extension.
+        engine (str): The engine that the format is read with, such as
+            ``"pandas"`` or ``"pyarrow"``.
+        file_format (type): A :class:`FileFormat` subclass.
+
+    Raises:
+        ValueError: If the engine is ``"raw"``, which does not parse files.
+    """
+    if engine == "raw":
+        raise ValueError("The raw engine cannot be given formats.")
+    FORMATS.setdefault(name, {})[engine] = file_format
+
+
+def get_format(name: str, engine: str = "pandas") -> type:
+    """Return the class that reads and writes a format with an engine.
+
+    Raises:
+        ValueError: If the format is unsupported, or not by the engine.
+    """
+    if name not in FORMATS:
+        raise ValueError(f"Unsupported file format: {name}")
+    if engine not in FORMATS[name]:
+        raise ValueError(f"The {engine} engine does not support {name} files")
+    return FORMATS[name][engine]
+
+
+def is_compressible(name: str) -> bool:
+    """Return whether files of a format may have a compression extension."""
+    return all(file_format.compressible for file_format in FORMATS[name].values())
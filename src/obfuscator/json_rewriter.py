@@ -0,0 +1,313 @@
+import codecs
+import json
+import re
+from json.decoder import scanstring
+from typing import Iterable, Iterator, List, Optional, Tuple, Union
+from obfuscator.json_stream import JsonRecordParser, json_text
+
+OBFUSCATED_VALUE = '"***"'
+
+_BOM = codecs.BOM_UTF8.decode("utf-8")
+
+# Every element of an array, written as ``[]`` or ``[*]`` in a path.
+ANY_INDEX = -1
+
+_WHITESPACE = re.compile(r"[ \t\n\r]*")
+_WHITESPACE_CHARACTERS = " \t\n\r"
+_PATH_SEGMENT = re.compile(r"([^.\[\]]*)((?:\[(?:\d*|\*)\])*)")
+_PATH_INDEX = re.compile(r"\[(\d*|\*)\]")
+
+
+def parse_field_path(path: str) -> List[Union[str, int]]:
+    """Split a field path into the keys and array indices it follows.
+
+    Keys are separated by dots, and array elements are selected with
+    ``[n]``, or ``[]`` / ``[*]`` for every element, so
+    ``orders[].card.number`` is ``["orders", ANY_INDEX, "card", "number"]``.
+
+    Args:
+        path (str): The field path, such as ``customer.address.postcode``.
+
+    Returns:
+        list: The keys (str), indices (int) and :data:`ANY_INDEX` of the path.
+
+    Raises:
+        ValueError: If the path is empty or malformed.
+    """
+    steps = []
+    for segment in path.split("."):
+        match = _PATH_SEGMENT.fullmatch(segment)
+        if match is None or not (match.group(1) or match.group(2)):
+            raise ValueError(f"Invalid field path: {path}")
+        if match.group(1):
+            steps.append(match.group(1))
+        for index in _PATH_INDEX.findall(match.group(2)):
+            steps.append(int(index) if index.isdigit() else ANY_INDEX)
+    return steps
+
+
+class _PathNode:
+    """One step of the field paths; a PII node obfuscates its whole value."""
+
+    __slots__ = ("children", "has_keys", "pii", "strategy")
+
+    def __init__(self):
+        self.children = {}
+        self.has_keys = False
+        self.pii = False
+        self.strategy = None
+
+
+def _build_path_tree(pii_fields: list, strategies: dict) -> _PathNode:
+    root = _PathNode()
+    for field in pii_fields:
+        node = root
+        for step in parse_field_path(field):
+            node.has_keys = node.has_keys or isinstance(step, str)
+            node = node.children.setdefault(step, _PathNode())
+        node.pii = True
+        node.strategy = strategies.get(field)
+    return root
+
+
+class JsonRewriter(JsonRecordParser):
+    """Rewrites the PII values of a JSON byte stream at their field paths.
+
+    Records are framed exactly as :class:`JsonRecordParser` frames them (a
+    top-level array or JSON Lines), but instead of being decoded each record
+    is walked only along the paths of the PII fields: subtrees outside those
+    paths are skipped over, and the values on them are replaced in the text.
+    Everything else, including key order, whitespace, number formatting and
+    escapes, is passed through exactly as it appears in the input, so nested
+    fields are obfuscated without flattening or re-serialising the records.
+    A leading byte order mark is kept too.
+
+    A key step that meets an array applies to every element of the array, so
+    ``orders.card`` and ``orders[].card`` are the same path. Masked values
+    become ``"***"`` whatever their type; values with a strategy are
+    obfuscated from their text (strings unescaped, anything else as compact
+    JSON; see :func:`~obfuscator.json_stream.json_text`) and nulls stay null.
+
+    Args:
+        pii_fields (list): List of field paths to obfuscate, such as
+            ``["name", "customer.email", "orders[].card"]``.
+        strategies (dict, optional): A strategy per field path that is
+            obfuscated from the text of its value instead of replaced with
+            ``***``.
+
+    Raises:
+        ValueError: If a field path is malformed.
+    """
+
+    def __init__(self, pii_fields: list, strategies: Optional[dict] = None):
+        super().__init__()
+        self.pii_fields = pii_fields
+        self.strategies = strategies or {}
+        self._paths = _build_path_tree(pii_fields, self.strategies)
+        self._replacements = []
+        self._scan_once = self._decoder.scan_once
+        # The BOM is passed through, so it is not stripped by the decoder
+        self._text_decoder = codecs.getincrementaldecoder("utf-8")()
+        self._at_start = True
+
+    def _replacement(self, node: _PathNode, buffer: str, start: int, end: int):
+        if node.strategy is None:
+            return OBFUSCATED_VALUE
+        text = buffer[start:end]
+        if text == "null":
+            return text
+        if text.startswith('"'):
+            text = scanstring(text, 1)[0]
+        else:
+            text = json_text(json.loads(text))
+        return json.dumps(node.strategy.obfuscate_text(text), ensure_ascii=False)
+
+    def _walk(self, buffer: str, position: int, node: _PathNode) -> int:
+        """Find the PII values in the value at ``position``; return its end."""
+        if node.pii:
+            end = self._scan_once(buffer, position)[1]
+            replacement = self._replacement(node, buffer, position, end)
+            self._replacements.append((position, end, replacement))
+            return end
+
+        char = buffer[position]
+        if char == "{":
+            return self._walk_object(buffer, position, node)
+        if char == "[":
+            return self._walk_array(buffer, position, node)
+        return self._scan_once(buffer, position)[1]
+
+    # The walks below run for every key on the PII paths of every record, so
+    # single spaces are stepped over without a regex match, and values off
+    # the paths are skipped with the C scanner directly.
+
+    def _walk_object(self, buffer: str, position: int, node: _PathNode) -> int:
+        children = node.children
+        skip_whitespace = _WHITESPACE.match
+        position = skip_whitespace(buffer, position + 1).end()
+        if buffer[position] == "}":
+            return position + 1
+        while True:
+            if buffer[position] != '"':
+                raise json.JSONDecodeError(
+                    "Expecting property name enclosed in double quotes",
+                    buffer,
+                    position,
+                )
+            key, position = scanstring(buffer, position + 1)
+            if buffer[position] != ":":
+                position = skip_whitespace(buffer, position).end()
+                if buffer[position] != ":":
+                    raise json.JSONDecodeError(
+                        "Expecting ':' delimiter", buffer, position
+                    )
+            position += 1
+            if buffer[position] == " ":
+                position += 1
+            if buffer[position] in _WHITESPACE_CHARACTERS:
+                position = skip_whitespace(buffer, position).end()
+
+            child = children.get(key)
+            if child is None:
+                position = self._scan_once(buffer, position)[1]
+            else:
+                position = self._walk(buffer, position, child)
+
+            char = buffer[position]
+            if char in _WHITESPACE_CHARACTERS:
+                position = skip_whitespace(buffer, position).end()
+                char = buffer[position]
+            if char == "}":
+                return position + 1
+            if char != ",":
+                raise json.JSONDecodeError("Expecting ',' delimiter", buffer, position)
+            position += 1
+            if buffer[position] == " ":
+                position += 1
+            if buffer[position] in _WHITESPACE_CHARACTERS:
+                position = skip_whitespace(buffer, position).end()
+
+    def _walk_array(self, buffer: str, position: int, node: _PathNode) -> int:
+        children = node.children
+        # Key steps apply to every element of an array they meet
+        every = children.get(ANY_INDEX) or (node if node.has_keys else None)
+        skip_whitespace = _WHITESPACE.match
+        position = skip_whitespace(buffer, position + 1).end()
+        if buffer[position] == "]":
+            return position + 1
+        index = 0
+        while True:
+            child = children.get(index, every)
+            if child is None:
+                position = self._scan_once(buffer, position)[1]
+            else:
+                position = self._walk(buffer, position, child)
+
+            position = skip_whitespace(buffer, position).end()
+            char = buffer[position]
+            if char == "]":
+                return position + 1
+            if char != ",":
+                raise json.JSONDecodeError("Expecting ',' delimiter", buffer, position)
+            position = skip_whitespace(buffer, position + 1).end()
+            index += 1
+
+    def _decode_record(self, buffer: str, position: int) -> Tuple[None, int]:
+        """Find the PII values of the record at ``position``; return its end."""
+        found = len(self._replacements)
+        try:
+            return None, self._walk(buffer, position, self._paths)
+        except json.JSONDecodeError:
+            del self._replacements[found:]
+            raise
+        except StopIteration as e:
+            del self._replacements[found:]
+            raise json.JSONDecodeError("Expecting value", buffer, e.value) from None
+        except IndexError:
+            del self._replacements[found:]
+            raise json.JSONDecodeError(
+                "Unterminated JSON value", buffer, len(buffer)
+            ) from None
+
+    def _rewrite(self, final: bool) -> bytes:
+        pieces = []
+        if self._at_start and self._buffer:
+            self._at_start = False
+            if self._buffer.startswith(_BOM):
+                self._buffer = self._buffer[len(_BOM) :]
+                pieces.append(_BOM)
+
+        buffer = self._buffer
+        self._replacements = []
+        self._parse(final)
+        consumed = len(buffer) - len(self._buffer)
+
+        last = 0
+        for start, end, replacement in self._replacements:
+            if start >= consumed:
+                break  # Part of a record that is held back for more data
+            pieces.append(buffer[last:start])
+            pieces.append(replacement)
+            last = end
+        pieces.append(buffer[last:consumed])
+        return "".join(pieces).encode("utf-8")
+
+    def feed(self, chunk: bytes) -> bytes:
+        """Rewrite the next chunk of input.
+
+        Args:
+            chunk (bytes): The next bytes of the JSON document, split anywhere.
+
+        Returns:
+            bytes: The rewritten output of every record completed by this
+            chunk, with the text between records.
+
+        Raises:
+            ValueError: If the input is not valid JSON.
+        """
+        self._buffer += self._text_decoder.decode(chunk)
+        return self._rewrite(final=False)
+
+    def close(self) -> bytes:
+        """Rewrite the rest of the input.
+
+        Returns:
+            bytes: The remaining output.
+
+        Raises:
+            ValueError: If the input is incomplete or not valid JSON.
+        """
+        self._buffer += self._text_decoder.decode(b"", final=True)
+        rewritten = self._rewrite(final=True)
+        if self._in_array and not self._array_closed:
+            raise ValueError("Unterminated JSON array.")
+        return rewritten
+
+
+def rewrite_json(
+    chunks: Iterable[bytes], pii_fields: list, strategies: Optional[dict] = None
+) -> Iterator[bytes]:
+    """Yields the rewritten pieces of a JSON byte stream.
+
+    Args:
+        chunks (Iterable[bytes]): A JSON array or JSON Lines document, split
+            into chunks anywhere.
+        pii_fields (list): List of field paths to obfuscate.
+        strategies (dict, optional): A strategy per field path that is
+            obfuscated another way than '***'.
+
+    Yields:
+        bytes: Successive pieces of the rewritten document.
+
+    Raises:
+        ValueError: If a field path is malformed or the input is not valid
+            JSON.
+    """
+    rewriter = JsonRewriter(pii_fields, strategies)
+    for chunk in chunks:
+        rewritten = rewriter.feed(chunk)
+        if rewritten:
+            yield rewritten
+    rewritten = rewriter.close()
+    if rewritten:
+        yield rewritten
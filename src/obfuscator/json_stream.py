@@ -0,0 +1,152 @@
+import codecs
+import json
+from typing import Any, Iterable, Iterator, List, Optional, Tuple
+
+_WHITESPACE = " \t\r\n"
+
+
+def json_text(value: Any) -> Optional[str]:
+    """Return the text of a parsed JSON value that strategies obfuscate.
+
+    Strings are their own text and nulls stay None; numbers, booleans,
+    arrays and objects are written back as compact JSON, so ``1.50`` is
+    ``"1.5"`` and ``true`` is ``"true"`` whichever engine parsed them.
+    """
+    if value is None or isinstance(value, str):
+        return value
+    return json.dumps(value, ensure_ascii=False, separators=(",", ":"))
+
+
+class JsonRecordParser:
+    """Incrementally parses JSON records from chunks of bytes.
+
+    Accepts either a top-level JSON array of records or JSON Lines (one
+    record per line, or any whitespace-separated sequence of JSON values).
+    Each record is decoded as soon as its last byte arrives, so only the
+    current partial record is buffered between chunks.
+    """
+
+    def __init__(self):
+        self._decoder = json.JSONDecoder()
+        self._text_decoder = codecs.getincrementaldecoder("utf-8-sig")()
+        self._buffer = ""
+        self._in_array = None
+        self._array_closed = False
+        self._expect_value = True
+
+    def _decode_record(self, buffer: str, position: int) -> Tuple[Any, int]:
+        """Decode the record starting at ``position``; return it and its end.
+
+        Raises:
+            json.JSONDecodeError: If the record is invalid or incomplete.
+        """
+        return self._decoder.raw_decode(buffer, position)
+
+    def _parse(self, final: bool) -> List[Any]:
+        """Decode every complete record in the buffer."""
+        buffer = self._buffer
+        position = 0
+        records = []
+        while True:
+            while position < len(buffer) and buffer[position] in _WHITESPACE:
+                position += 1
+            if position == len(buffer):
+                break
+
+            char = buffer[position]
+            if self._array_closed:
+                raise ValueError(f"Unexpected data after JSON array: {char!r}")
+            if self._in_array is None:
+                self._in_array = char == "["
+                if self._in_array:
+                    position += 1
+                    continue
+            if self._in_array:
+                if char == "]":
+                    self._array_closed = True
+                    position += 1
+                    continue
+                if char == "," and not self._expect_value:
+                    self._expect_value = True
+                    position += 1
+                    continue
+                if not self._expect_value:
+                    raise ValueError(f"Expected ',' or ']' in JSON array: {char!r}")
+
+            try:
+                record, end = self._decode_record(buffer, position)
+            except json.JSONDecodeError:
+                if final:
+                    raise
+                break  # The record is incomplete; wait for more data
+            if end == len(buffer) and not final:
+                break  # A number at the end of the buffer may be truncated
+            records.append(record)
+            position = end
+            self._expect_value = not self._in_array
+
+        self._buffer = buffer[position:]
+        return records
+
+    def feed(self, chunk: bytes) -> List[Any]:
+        """Parse the next chunk of input.
+
+        Args:
+            chunk (bytes): The next bytes of the JSON document, split anywhere.
+
+        Returns:
+            list: Every record completed by this chunk.
+
+        Raises:
+            ValueError: If the input is not valid JSON.
+        """
+        self._buffer += self._text_decoder.decode(chunk)
+        return self._parse(final=False)
+
+    def close(self) -> List[Any]:
+        """Parse the rest of the input.
+
+        Returns:
+            list: The remaining records.
+
+        Raises:
+            ValueError: If the input is incomplete or not valid JSON.
+        """
+        self._buffer += self._text_decoder.decode(b"", final=True)
+        records = self._parse(final=True)
+        if self._in_array and not self._array_closed:
+            raise ValueError("Unterminated JSON array.")
+        return records
+
+
+def iter_json_batches(
+    chunks: Iterable[bytes], batch_size: int
+) -> Iterator[List[Any]]:
+    """Yields batches of records parsed incrementally from a JSON byte stream.
+
+    Args:
+        chunks (Iterable[bytes]): A JSON array or JSON Lines document, split
+            into chunks anywhere.
+        batch_size (int): The maximum number of records per batch.
+
+    Yields:
+        list: Up to ``batch_size`` records at a time, in document order.
+
+    Raises:
+        ValueError: If the input is not valid JSON.
+    """
+    parser = JsonRecordParser()
+    batch = []
+    for chunk in chunks:
+        for record in parser.feed(chunk):
+            batch.append(record)
+            if len(batch) == batch_size:
+                yield batch
+                batch = []
+    for record in parser.close():
+        batch.append(record)
+        if len(batch) == batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
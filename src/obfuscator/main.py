@@ -1,3 +1,4 @@
+import logging
 import sys
 from obfuscator.process_file import process_s3_file
 
@@ -5,7 +6,8 @@ from obfuscator.process_file import process_s3_file
 def obfuscator(json_input):
     """
     Entry point for the CLI.
-    Returns a BytesIO object containing the processed file.
+    Returns a BytesIO object containing the processed file, or the S3 URI
+    it was written to if the input has an output_location.
     """
     try:
         # Process the file
@@ -20,6 +22,10 @@ def obfuscator(json_input):
 
 
 if __name__ == "__main__":
+    logging.basicConfig(
+        level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s"
+    )
+
     if len(sys.argv) != 2:
         print(
             'Usage: obfuscator \'{"file_to_obfuscate": "s3://my-bucket/file.csv", '
@@ -33,5 +39,8 @@ if __name__ == "__main__":
     bytestream = obfuscator(json_input)
 
     # Print the bytestream content (for demonstration)
-    print("Processed file content:")
-    print(bytestream.getvalue().decode("utf-8"))
+    if isinstance(bytestream, str):
+        print(f"Processed file written to: {bytestream}")
+    else:
+        print("Processed file content:")
+        print(bytestream.getvalue().decode("utf-8"))
@@ -0,0 +1,372 @@
+import contextvars
+import io
+import json
+import logging
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, field, asdict
+from typing import Callable, Dict, Iterable, Iterator, Optional
+
+try:
+    import resource
+except ImportError:  # pragma: no cover - not available on Windows
+    resource = None
+
+logger = logging.getLogger(__name__)
+
+STAGES = [
+    "probe",
+    "download",
+    "decompress",
+    "parse",
+    "obfuscate",
+    "serialise",
+    "compress",
+    "upload",
+]
+
+_current_recorder = contextvars.ContextVar("obfuscator_metrics", default=None)
+
+
+@dataclass
+class StageMetrics:
+    """Totals for one stage of a job, summed over every chunk.
+
+    Attributes:
+        wall_seconds (float): Elapsed time spent in the stage, excluding
+            nested stages run by the same thread.
+        cpu_seconds (float): CPU time of the threads that ran the stage,
+            excluding nested stages.
+        bytes_in (int): Bytes consumed by the stage.
+        bytes_out (int): Bytes produced by the stage.
+        rows (int): Rows handled by the stage.
+        calls (int): How many times the stage ran.
+    """
+
+    wall_seconds: float = 0.0
+    cpu_seconds: float = 0.0
+    bytes_in: int = 0
+    bytes_out: int = 0
+    rows: int = 0
+    calls: int = 0
+
+
+@dataclass
+class JobMetrics:
+    """A metrics report for one processed file.
+
+    Stages that run on other threads (such as ranged downloads) can overlap
+    the stages of the calling thread, so stage wall times may add up to more
+    than ``wall_seconds``.
+
+    Attributes:
+        s3_uri (str): The S3 URI of the input file.
+        file_format (str): The format of the file.
+        mode (str): The processing mode.
+        engine (str): The processing engine.
+        stages (dict): A :class:`StageMetrics` per stage name that ran.
+        wall_seconds (float): Elapsed time of the whole job.
+        cpu_seconds (float): CPU time of the calling thread for the job, and
+            of any worker threads that ran its steps through
+            :meth:`MetricsRecorder.run`.
+        bytes_in (int): Bytes downloaded from S3.
+        bytes_out (int): Bytes of obfuscated output.
+        rows (int): Rows obfuscated (not counted by the raw CSV engine).
+        process_peak_memory_bytes (int): The peak resident set size of the
+            whole process so far (``ru_maxrss``) when the job finished, or 0
+            where it cannot be measured. This is a high-water mark, not the
+            memory of the job: it includes every earlier and concurrent job
+            of the process and never goes down.
+        error (str, optional): The error that stopped the job, if any.
+    """
+
+    s3_uri: str
+    file_format: str
+    mode: str
+    engine: str
+    stages: Dict[str, StageMetrics] = field(default_factory=dict)
+    wall_seconds: float = 0.0
+    cpu_seconds: float = 0.0
+    bytes_in: int = 0
+    bytes_out: int = 0
+    rows: int = 0
+    process_peak_memory_bytes: int = 0
+    error: Optional[str] = None
+
+    @property
+    def succeeded(self) -> bool:
+        return self.error is None
+
+    def to_dict(self) -> dict:
+        """Return the report as plain, JSON-serialisable data."""
+        return asdict(self)
+
+
+def _process_peak_memory_bytes() -> int:
+    """Return the peak resident set size of the process in bytes."""
+    if resource is None:
+        return 0
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+class MetricsRecorder:
+    """Collects stage metrics for one job into a :class:`JobMetrics` report.
+
+    Args:
+        report (JobMetrics): The report to fill in.
+    """
+
+    def __init__(self, report: JobMetrics):
+        self.report = report
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._start_wall = time.perf_counter()
+        self._start_cpu = time.thread_time()
+        self._worker_cpu = 0.0
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[StageMetrics]:
+        """Times a stage and yields a scratch record for its counts.
+
+        Counts added to the yielded record are merged into the report when
+        the stage ends.
+        """
+        stack = getattr(self._local, "stack", None)
+        if stack is None:
+            stack = self._local.stack = []
+        counts = StageMetrics()
+        stack.append(counts)
+        start_wall = time.perf_counter()
+        start_cpu = time.thread_time()
+        try:
+            yield counts
+        finally:
+            wall = time.perf_counter() - start_wall
+            cpu = time.thread_time() - start_cpu
+            stack.pop()
+            if stack:
+                # The enclosing stage excludes the time spent in this one
+                stack[-1].wall_seconds -= wall
+                stack[-1].cpu_seconds -= cpu
+            with self._lock:
+                totals = self.report.stages.setdefault(name, StageMetrics())
+                totals.wall_seconds += wall + counts.wall_seconds
+                totals.cpu_seconds += cpu + counts.cpu_seconds
+                totals.bytes_in += counts.bytes_in
+                totals.bytes_out += counts.bytes_out
+                totals.rows += counts.rows
+                totals.calls += 1
+
+    @contextmanager
+    def activate(self) -> Iterator["MetricsRecorder"]:
+        """Makes this the recorder that :func:`stage` reports to."""
+        token = _current_recorder.set(self)
+        try:
+            yield self
+        finally:
+            _current_recorder.reset(token)
+
+    def run(self, function: Callable, *args):
+        """Runs a step of this job on the current (worker) thread.
+
+        The step reports its stages to this recorder, and its CPU time counts
+        towards the job's.
+        """
+        start_cpu = time.thread_time()
+        try:
+            with self.activate():
+                return function(*args)
+        finally:
+            cpu = time.thread_time() - start_cpu
+            with self._lock:
+                self._worker_cpu += cpu
+
+    def finish(
+        self,
+        error: Optional[BaseException] = None,
+        hook: Optional[Callable[[JobMetrics], None]] = None,
+    ) -> JobMetrics:
+        """Completes the report and passes it to the hook, if any.
+
+        Args:
+            error (Exception, optional): The error that stopped the job.
+            hook (callable, optional): Called with the finished report.
+                Errors raised by the hook are logged, not raised.
+
+        Returns:
+            JobMetrics: The finished report.
+        """
+        report = self.report
+        report.wall_seconds = time.perf_counter() - self._start_wall
+        report.cpu_seconds = time.thread_time() - self._start_cpu + self._worker_cpu
+        report.process_peak_memory_bytes = _process_peak_memory_bytes()
+        if error is not None:
+            report.error = str(error)
+        download = report.stages.get("download")
+        if download is not None:
+            report.bytes_in = download.bytes_in
+        for name in ("obfuscate", "parse"):
+            if name in report.stages and report.stages[name].rows:
+                report.rows = report.stages[name].rows
+                break
+
+        if hook is not None:
+            try:
+                hook(report)
+            except Exception as e:
+                logger.warning(f"Metrics hook failed: {e}")
+        return report
+
+
+def current_recorder() -> Optional[MetricsRecorder]:
+    """Return the recorder of the job running in this context, if any."""
+    return _current_recorder.get()
+
+
+@contextmanager
+def stage(name: str, recorder: Optional[MetricsRecorder] = None):
+    """Times a stage of the current job; does nothing outside of a job.
+
+    Args:
+        name (str): The stage name, one of :data:`STAGES`.
+        recorder (MetricsRecorder, optional): The recorder to report to, for
+            code running on threads that do not share the job's context.
+            Defaults to the current recorder.
+
+    Yields:
+        StageMetrics: A record to add the byte and row counts of the stage to.
+    """
+    recorder = recorder or _current_recorder.get()
+    if recorder is None:
+        yield StageMetrics()
+        return
+    with recorder.stage(name) as counts:
+        yield counts
+
+
+def metered(items: Iterable, name: str, counter: str) -> Iterator:
+    """Yields items unchanged, recording the time to produce each as a stage.
+
+    Args:
+        items (Iterable): The items to pass through, such as byte chunks or
+            DataFrames.
+        name (str): The stage to record each ``next`` call as.
+        counter (str): The count to add each item's length to:
+            ``"bytes_in"``, ``"bytes_out"`` or ``"rows"``.
+
+    Yields:
+        The items of ``items``.
+    """
+    iterator = iter(items)
+    while True:
+        with stage(name) as counts:
+            item = next(iterator, None)
+            if item is not None:
+                setattr(counts, counter, getattr(counts, counter) + len(item))
+        if item is None:
+            return
+        yield item
+
+
+class MeteredReader(io.RawIOBase):
+    """Wraps a readable stream, recording each read as the download stage.
+
+    Args:
+        raw: The stream to read from, such as an S3 streaming body.
+    """
+
+    def __init__(self, raw):
+        super().__init__()
+        self._raw = raw
+
+    def readable(self) -> bool:
+        return True
+
+    def read(self, size: int = -1) -> bytes:
+        with stage("download") as counts:
+            data = self._raw.read(None if size is None or size < 0 else size)
+            counts.bytes_in += len(data)
+        return data
+
+    def readinto(self, buffer) -> int:
+        data = self.read(len(buffer))
+        buffer[: len(data)] = data
+        return len(data)
+
+    def close(self):
+        self._raw.close()
+        super().close()
+
+
+def emf_document(report: JobMetrics, namespace: str = "Obfuscator") -> dict:
+    """Format a report as a CloudWatch Embedded Metric Format document.
+
+    Args:
+        report (JobMetrics): The report to format.
+        namespace (str): The CloudWatch namespace of the metrics.
+
+    Returns:
+        dict: The EMF document, dimensioned by file format, mode and engine.
+    """
+    values = {
+        "WallSeconds": (report.wall_seconds, "Seconds"),
+        "CpuSeconds": (report.cpu_seconds, "Seconds"),
+        "BytesIn": (report.bytes_in, "Bytes"),
+        "BytesOut": (report.bytes_out, "Bytes"),
+        "Rows": (report.rows, "Count"),
+        "ProcessPeakMemoryBytes": (report.process_peak_memory_bytes, "Bytes"),
+        "Failed": (0 if report.succeeded else 1, "Count"),
+    }
+    for name, totals in report.stages.items():
+        prefix = name.capitalize()
+        values[f"{prefix}Seconds"] = (totals.wall_seconds, "Seconds")
+        values[f"{prefix}CpuSeconds"] = (totals.cpu_seconds, "Seconds")
+
+    document = {
+        "_aws": {
+            "Timestamp": int(time.time() * 1000),
+            "CloudWatchMetrics": [
+                {
+                    "Namespace": namespace,
+                    "Dimensions": [["FileFormat", "Mode", "Engine"]],
+                    "Metrics": [
+                        {"Name": name, "Unit": unit}
+                        for name, (_, unit) in values.items()
+                    ],
+                }
+            ],
+        },
+        "FileFormat": report.file_format,
+        "Mode": report.mode,
+        "Engine": report.engine,
+        "S3Uri": report.s3_uri,
+    }
+    for name, (value, _) in values.items():
+        document[name] = value
+    if report.error is not None:
+        document["Error"] = report.error
+    return document
+
+
+class EmfEmitter:
+    """A metrics hook that writes each report as one line of CloudWatch EMF.
+
+    In AWS Lambda, EMF lines written to standard output are turned into
+    CloudWatch metrics without any API calls.
+
+    Args:
+        namespace (str): The CloudWatch namespace of the metrics.
+        stream: The text stream to write to. Defaults to standard output.
+    """
+
+    def __init__(self, namespace: str = "Obfuscator", stream=None):
+        self.namespace = namespace
+        self.stream = stream
+
+    def __call__(self, report: JobMetrics):
+        stream = self.stream or sys.stdout
+        stream.write(json.dumps(emf_document(report, self.namespace)) + "\n")
+        stream.flush()
@@ -1,18 +1,193 @@
-import pandas as pd
+from __future__ import annotations
+from typing import TYPE_CHECKING, Optional, Union
 
+if TYPE_CHECKING:
+    import pandas as pd
+    import pyarrow as pa
 
-def obfuscate_pii(dataframe: pd.DataFrame, pii_fields: list) -> pd.DataFrame:
+OBFUSCATED_VALUE = "***"
+
+
+def masked_fields(pii_fields: list, strategies: Optional[dict] = None) -> list:
+    """Return the PII fields that are replaced with '***'.
+
+    Args:
+        pii_fields (list): List of fields to obfuscate.
+        strategies (dict, optional): The strategies of the fields that are
+            not masked, by field name.
+
+    Returns:
+        list: The fields of ``pii_fields`` without a strategy.
+    """
+    if not strategies:
+        return pii_fields
+    return [field for field in pii_fields if field not in strategies]
+
+
+def _build_strategies(strategies: Optional[dict]) -> dict:
+    """Create the strategies given by name, such as ``{"phone": "keep_last"}``."""
+    if not strategies:
+        return {}
+    from obfuscator.strategies import build_strategy
+
+    built = {}
+    for field, strategy in strategies.items():
+        if isinstance(strategy, (str, dict)):
+            strategy = build_strategy(field, strategy)
+        if strategy is not None:
+            built[field] = strategy
+    return built
+
+
+def obfuscate_pii(
+    dataframe: pd.DataFrame,
+    pii_fields: list,
+    copy: bool = True,
+    strategies: Optional[dict] = None,
+) -> pd.DataFrame:
     """Replaces PII fields in the DataFrame with obfuscated ('***') values.
 
     Args:
         dataframe (pd.DataFrame): The DataFrame containing the data.
         pii_fields (list): List of fields to obfuscate.
+        copy (bool): If False, the non-PII columns of the result share their
+            memory with ``dataframe`` instead of being deep-copied, and the
+            masked columns are one single-category ``Categorical`` whose
+            codes (one byte per row) they all share. Use this when the input
+            DataFrame is discarded afterwards and the result is not modified
+            in place.
+        strategies (dict, optional): A strategy per field that is obfuscated
+            another way than '***', such as an
+            :class:`~obfuscator.tokenise.HmacTokeniser` or a
+            :class:`~obfuscator.strategies.KeepLast` mask. Strategies may
+            also be given as they are in the ``pii_fields`` input, such as
+            ``"email_domain"`` or ``{"strategy": "keep_last", "n": 4}``.
 
     Returns:
         pd.DataFrame: The DataFrame with obfuscated PII fields.
     """
+    strategies = _build_strategies(strategies)
+    if not copy:
+        import numpy as np
+        import pandas as pd
+
+        # Assigning a column copies it, so the result is built from its
+        # columns instead: every masked column then shares one codes array
+        # and the other columns are not copied.
+        fields = set(pii_fields)
+        masked = None
+        columns = []
+        for position, name in enumerate(dataframe.columns):
+            column = dataframe.iloc[:, position]
+            if name in strategies and name in fields:
+                column = strategies[name].obfuscate_series(column)
+            elif name in fields:
+                if masked is None:
+                    masked = pd.Categorical.from_codes(
+                        np.zeros(len(dataframe), dtype=np.int8),
+                        categories=[OBFUSCATED_VALUE],
+                    )
+                column = masked
+            columns.append(column.array if isinstance(column, pd.Series) else column)
+        obfuscated_df = pd.DataFrame(
+            dict(enumerate(columns)), index=dataframe.index, copy=False
+        )
+        obfuscated_df.columns = dataframe.columns
+        return obfuscated_df
+
     obfuscated_df = dataframe.copy()
     for field in pii_fields:
-        if field in obfuscated_df.columns:
-            obfuscated_df[field] = "***"
+        if field not in obfuscated_df.columns:
+            continue
+        if field in strategies:
+            strategy = strategies[field]
+            obfuscated_df[field] = strategy.obfuscate_series(obfuscated_df[field])
+        else:
+            obfuscated_df[field] = OBFUSCATED_VALUE
     return obfuscated_df
+
+
+def _obfuscated_arrow_column(length: int) -> pa.DictionaryArray:
+    """Return a dictionary-encoded array of ``length`` '***' values."""
+    import numpy as np
+    import pyarrow as pa
+
+    return pa.DictionaryArray.from_arrays(
+        pa.array(np.zeros(length, dtype=np.int8)),
+        pa.array([OBFUSCATED_VALUE]),
+    )
+
+
+def obfuscate_pii_arrow(
+    data: Union[pa.Table, pa.RecordBatch],
+    pii_fields: list,
+    strategies: Optional[dict] = None,
+) -> Union[pa.Table, pa.RecordBatch]:
+    """Replaces PII fields in an Arrow table or record batch with '***'.
+
+    Every masked column is replaced with the same dictionary-encoded array,
+    so the masked columns cost one shared index buffer in total and the
+    non-PII columns are passed through without being copied.
+
+    Args:
+        data (pa.Table | pa.RecordBatch): The Arrow data to obfuscate.
+        pii_fields (list): List of fields to obfuscate.
+        strategies (dict, optional): A strategy per field that is obfuscated
+            another way than '***', such as an
+            :class:`~obfuscator.tokenise.HmacTokeniser` or a
+            :class:`~obfuscator.strategies.KeepLast` mask. Strategies may
+            also be given as they are in the ``pii_fields`` input, such as
+            ``"email_domain"`` or ``{"strategy": "keep_last", "n": 4}``.
+
+    Returns:
+        pa.Table | pa.RecordBatch: The data with obfuscated PII fields.
+    """
+    pii_indices = [
+        index for index, name in enumerate(data.schema.names) if name in pii_fields
+    ]
+    if not pii_indices:
+        return data
+
+    import pyarrow as pa
+
+    strategies = _build_strategies(strategies)
+    obfuscated_column = None
+    for index in pii_indices:
+        name = data.schema.names[index]
+        if name in strategies:
+            column = strategies[name].obfuscate_arrow(data.column(index))
+        else:
+            if obfuscated_column is None:
+                obfuscated_column = _obfuscated_arrow_column(data.num_rows)
+            column = obfuscated_column
+        data = data.set_column(index, pa.field(name, column.type), column)
+    return data
+
+
+def insert_obfuscated_columns(
+    data: Union[pa.Table, pa.RecordBatch], schema: pa.Schema, pii_fields: list
+) -> Union[pa.Table, pa.RecordBatch]:
+    """Adds '***' columns for PII fields that were left out when reading.
+
+    Used with column projection: the reader decodes only the non-PII columns
+    of ``schema`` and this puts the PII columns back in their original
+    positions, already obfuscated.
+
+    Args:
+        data (pa.Table | pa.RecordBatch): The data read without PII columns.
+        schema (pa.Schema): The full schema of the file the data came from.
+        pii_fields (list): List of fields to obfuscate.
+
+    Returns:
+        pa.Table | pa.RecordBatch: The data with every column of ``schema``.
+    """
+    import pyarrow as pa
+
+    obfuscated_column = None
+    for index, name in enumerate(schema.names):
+        if name in pii_fields:
+            if obfuscated_column is None:
+                obfuscated_column = _obfuscated_arrow_column(data.num_rows)
+            field = pa.field(name, obfuscated_column.type)
+            data = data.add_column(index, field, obfuscated_column)
+    return data
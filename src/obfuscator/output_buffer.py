@@ -0,0 +1,127 @@
+import io
+import mmap
+import os
+import tempfile
+from typing import Optional, Union
+
+
+class SpooledBuffer(io.BufferedIOBase):
+    """A binary buffer that moves to a temporary file once it grows too large.
+
+    Output is held in an ``io.BytesIO`` until more than ``threshold`` bytes
+    have been written, then spilled to an anonymous temporary file in
+    ``spill_dir`` (``/tmp`` on Lambda) and written there from then on, so
+    resident memory stays bounded however large the output gets. Like
+    ``io.BytesIO`` it can be read, written and seeked, and ``getvalue`` and
+    ``getbuffer`` return its contents; once spilled, ``getbuffer`` maps the
+    file instead of reading it into memory.
+
+    Args:
+        threshold (int): The number of bytes held in memory before spilling.
+        spill_dir (str, optional): The directory of the temporary file.
+            Defaults to the system temporary directory.
+    """
+
+    def __init__(self, threshold: int, spill_dir: Optional[str] = None):
+        super().__init__()
+        self.threshold = threshold
+        self.spill_dir = spill_dir
+        self._file = io.BytesIO()
+        self._map = None
+
+    @property
+    def spilled(self) -> bool:
+        """Whether the contents have moved to a temporary file."""
+        return not isinstance(self._file, io.BytesIO)
+
+    def _spill(self):
+        spill_file = tempfile.TemporaryFile(dir=self.spill_dir)
+        spill_file.write(self._file.getbuffer())
+        spill_file.seek(self._file.tell())
+        self._file = spill_file
+
+    def readable(self) -> bool:
+        return True
+
+    def writable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def tell(self) -> int:
+        return self._file.tell()
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        return self._file.seek(offset, whence)
+
+    def read(self, size: Optional[int] = -1) -> bytes:
+        return self._file.read(size)
+
+    def read1(self, size: int = -1) -> bytes:
+        return self._file.read(size)
+
+    def readinto(self, buffer) -> int:
+        return self._file.readinto(buffer)
+
+    def write(self, data) -> int:
+        if not self.spilled and self._file.tell() + len(data) > self.threshold:
+            self._spill()
+        return self._file.write(data)
+
+    def truncate(self, size: Optional[int] = None) -> int:
+        return self._file.truncate(size)
+
+    def flush(self):
+        self._file.flush()
+
+    def getbuffer(self) -> memoryview:
+        """Return a read-only view of the contents without copying them."""
+        if not self.spilled:
+            return self._file.getbuffer()
+        self._file.flush()
+        size = os.fstat(self._file.fileno()).st_size
+        if self._map is None or len(self._map) != size:
+            # A previous map stays alive as long as views of it do
+            self._map = (
+                mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+                if size
+                else b""
+            )
+        return memoryview(self._map)
+
+    def getvalue(self) -> bytes:
+        """Return the whole contents as bytes."""
+        if not self.spilled:
+            return self._file.getvalue()
+        return bytes(self.getbuffer())
+
+    def close(self):
+        if self.closed:
+            return
+        super().close()
+        if isinstance(self._map, mmap.mmap):
+            try:
+                self._map.close()
+            except BufferError:
+                pass  # Freed with the views still using it
+        self._file.close()
+
+
+def new_output_buffer(
+    spill_threshold: Optional[int] = None, spill_dir: Optional[str] = None
+) -> Union[io.BytesIO, SpooledBuffer]:
+    """Return an empty buffer for output.
+
+    Args:
+        spill_threshold (int, optional): The size above which the output is
+            spilled to a temporary file. If None, it is always kept in
+            memory.
+        spill_dir (str, optional): The directory of the temporary file.
+
+    Returns:
+        io.BytesIO | SpooledBuffer: The buffer.
+    """
+    if spill_threshold is None:
+        return io.BytesIO()
+    return SpooledBuffer(spill_threshold, spill_dir)
@@ -0,0 +1,230 @@
+import io
+import logging
+import multiprocessing
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import chain
+from typing import Iterable, Iterator, Optional
+from obfuscator.obfuscate_pii import obfuscate_pii
+from obfuscator.csv_rewriter import CsvRewriter
+from obfuscator.stream_file import _open_body, _body_chunks, RAW_READ_SIZE
+from obfuscator.metrics import stage
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PARALLEL_PART_SIZE = 16 * 1024 * 1024  # bytes of records per worker task
+
+
+def _next_record_end(data: bytes, start: int, minimum: int) -> int:
+    """Return the offset just past the first record ending at or after minimum.
+
+    ``data[start:]`` must begin at a record boundary. A newline ends a record
+    only when it follows an even number of quotes, so newlines inside quoted
+    fields (including ``""`` escapes) are never split. Returns 0 if no record
+    ends in ``data`` yet.
+    """
+    end = data.find(b"\n", minimum)
+    if end == -1:
+        return 0
+    quotes = data.count(b'"', start, end)
+    while quotes % 2:
+        following = data.find(b"\n", end + 1)
+        if following == -1:
+            return 0
+        quotes += data.count(b'"', end, following)
+        end = following
+    return end + 1
+
+
+def split_csv_records(chunks: Iterable[bytes], part_size: int) -> Iterator[bytes]:
+    """Regroups a CSV byte stream into parts that hold only whole records.
+
+    Args:
+        chunks (Iterable[bytes]): The CSV file, split into chunks anywhere.
+        part_size (int): The minimum size of each part in bytes; the last
+            part may be smaller.
+
+    Yields:
+        bytes: The header record first, then successive parts of complete
+        records, in file order. Joining them gives back the input.
+    """
+    pending = []
+    size = 0
+    header_found = False
+    for chunk in chunks:
+        pending.append(chunk)
+        size += len(chunk)
+        if header_found and size < part_size:
+            continue
+
+        data = b"".join(pending)
+        start = 0
+        if not header_found:
+            start = _next_record_end(data, 0, 0)
+            if not start:
+                pending = [data]
+                continue
+            header_found = True
+            yield data[:start]
+        while True:
+            end = _next_record_end(data, start, start + part_size - 1)
+            if not end:
+                break
+            yield data[start:end]
+            start = end
+        pending = [data[start:]]
+        size = len(data) - start
+
+    data = b"".join(pending)
+    if data:
+        yield data
+
+
+def _obfuscate_csv_part(
+    header: bytes,
+    part: bytes,
+    pii_fields: list,
+    engine: str,
+    include_header: bool,
+    strategies: Optional[dict] = None,
+) -> bytes:
+    """Obfuscate one part of a CSV file; runs in a worker process.
+
+    The pandas engine reads every field as text, so values are written back
+    as they appear in the file whichever part they fall in.
+
+    Args:
+        header (bytes): The header record of the file.
+        part (bytes): Complete records following the header.
+        pii_fields (list): List of fields to obfuscate.
+        engine (str): ``"pandas"`` or ``"raw"``.
+        include_header (bool): Whether to start the output with the header.
+        strategies (dict, optional): A strategy per field that is obfuscated
+            another way than '***'.
+
+    Returns:
+        bytes: The obfuscated records.
+    """
+    if engine == "raw":
+        rewriter = CsvRewriter(pii_fields, strategies)
+        output = rewriter.feed(header)
+        if not include_header:
+            output = b""
+        return output + rewriter.feed(part) + rewriter.close()
+
+    import pandas as pd
+
+    try:
+        # Each part would infer its own types, so a column of codes such as
+        # 007 would be written as 7 in a part without any letters.
+        df = pd.read_csv(io.BytesIO(header + part), dtype=str)
+    except pd.errors.EmptyDataError:
+        return pd.DataFrame().to_csv(index=False).encode("utf-8")
+    obfuscated_df = obfuscate_pii(df, pii_fields, copy=False, strategies=strategies)
+    return obfuscated_df.to_csv(index=False, header=include_header).encode("utf-8")
+
+
+def _wait_for_part(future) -> bytes:
+    """Return the output of a worker, recording the wait as obfuscation."""
+    with stage("obfuscate") as counts:
+        data = future.result()
+        counts.bytes_out += len(data)
+    return data
+
+
+def stream_csv_parallel(
+    bucket_name: Optional[str],
+    object_key: str,
+    pii_fields: list,
+    engine: str = "pandas",
+    processes: Optional[int] = None,
+    part_size: int = DEFAULT_PARALLEL_PART_SIZE,
+    read_size: int = RAW_READ_SIZE,
+    compression: Optional[str] = None,
+    strategies: Optional[dict] = None,
+) -> Iterator[bytes]:
+    """Streams a CSV file from S3, obfuscating parts of it on several cores.
+
+    The body is cut into parts of about ``part_size`` bytes at record
+    boundaries, taking quoted newlines into account, and each part is
+    obfuscated in a process pool. Outputs are yielded in file order with a
+    single header. At most two parts per process are in flight at once, so
+    memory stays bounded regardless of the size of the object. A file that
+    fits in one part, or a job with a single process, is processed inline
+    without starting a pool.
+
+    Args:
+        bucket_name (str, optional): The name of the S3 bucket, or None for
+            the local file at ``object_key``.
+        object_key (str): The key of the object in the S3 bucket.
+        pii_fields (list): List of fields to obfuscate.
+        engine (str): ``"pandas"`` or ``"raw"``, as for a single-core job.
+        processes (int, optional): The number of worker processes. Defaults
+            to the number of CPUs.
+        part_size (int): The approximate number of bytes per worker task.
+        read_size (int): The number of bytes to read from S3 at a time.
+        compression (str, optional): The compression of the object, which is
+            decompressed as it streams in.
+        strategies (dict, optional): A strategy per field that is obfuscated
+            another way than '***'. Each worker process
+            gets its own copy.
+
+    Yields:
+        bytes: Successive pieces of the obfuscated CSV, header first.
+
+    Raises:
+        RuntimeError: If there is an error reading or processing the file.
+    """
+    body = _open_body(bucket_name, object_key)
+    executor = None
+    in_flight = deque()
+    try:
+        chunks = _body_chunks(body, read_size, compression)
+        parts = split_csv_records(chunks, part_size)
+        header = next(parts, b"")
+        first = next(parts, b"")
+        second = next(parts, None)
+        processes = processes or multiprocessing.cpu_count()
+        if second is None or processes == 1:
+            # A pool would only add start-up and pickling overhead.
+            remaining = chain([first], [] if second is None else [second], parts)
+            for index, part in enumerate(remaining):
+                with stage("obfuscate") as counts:
+                    data = _obfuscate_csv_part(
+                        header, part, pii_fields, engine, index == 0, strategies
+                    )
+                    counts.bytes_out += len(data)
+                yield data
+            return
+
+        logger.info(f"Obfuscating {bucket_name}/{object_key} on {processes} processes")
+        # Spawned workers do not inherit the parent's threads or S3 client.
+        executor = ProcessPoolExecutor(
+            max_workers=processes, mp_context=multiprocessing.get_context("spawn")
+        )
+        for index, part in enumerate(chain([first, second], parts)):
+            in_flight.append(
+                executor.submit(
+                    _obfuscate_csv_part,
+                    header,
+                    part,
+                    pii_fields,
+                    engine,
+                    index == 0,
+                    strategies,
+                )
+            )
+            if len(in_flight) >= 2 * processes:
+                yield _wait_for_part(in_flight.popleft())
+        while in_flight:
+            yield _wait_for_part(in_flight.popleft())
+    except Exception as e:
+        logger.error(f"Error processing csv file in parallel: {e}")
+        raise RuntimeError(f"Error processing csv file in parallel: {e}")
+    finally:
+        if executor is not None:
+            # Parts not yet started are dropped if the consumer stops early
+            for future in in_flight:
+                future.cancel()
+            executor.shutdown(wait=True)
+        body.close()
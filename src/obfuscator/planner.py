@@ -0,0 +1,131 @@
+import logging
+import os
+from dataclasses import dataclass
+from typing import Optional
+from obfuscator.formats import get_format
+
+logger = logging.getLogger(__name__)
+
+LAMBDA_MEMORY_VARIABLE = "AWS_LAMBDA_FUNCTION_MEMORY_SIZE"
+MEMORY_HEADROOM = 0.75  # share of the budget a job's data may use
+COMPRESSED_EXPANSION = 5.0  # decompressed bytes per byte of a compressed file
+OUTPUT_SHARE = 0.5  # share of the usable memory a returned output may hold
+
+
+@dataclass
+class Plan:
+    """How an ``"auto"`` job is processed.
+
+    Attributes:
+        mode (str): ``"memory"`` or ``"stream"``.
+        engine (str): The engine, which is ``"pandas"`` where the requested
+            engine cannot stream.
+        spill_threshold (int, optional): The size above which the output is
+            spilled to a temporary file, or None to keep it in memory.
+        estimated_memory (int): The estimated memory of processing the file
+            whole, in bytes.
+    """
+
+    mode: str
+    engine: str
+    spill_threshold: Optional[int]
+    estimated_memory: int
+
+
+def default_memory_budget() -> Optional[int]:
+    """Return the memory that jobs may use by default, in bytes.
+
+    This is the memory limit of the Lambda function, from the
+    ``AWS_LAMBDA_FUNCTION_MEMORY_SIZE`` variable (in MB), or elsewhere the
+    physical memory of the machine, or None if neither is known.
+    """
+    memory_size = os.environ.get(LAMBDA_MEMORY_VARIABLE)
+    if memory_size:
+        try:
+            return int(memory_size) * 1024 * 1024
+        except ValueError:
+            logger.warning(f"Invalid {LAMBDA_MEMORY_VARIABLE}: {memory_size}")
+    try:
+        return os.sysconf("SC_PAGE_SIZE") * os.sysconf("SC_PHYS_PAGES")
+    except (AttributeError, ValueError, OSError):
+        return None
+
+
+def estimate_memory(
+    size: int,
+    file_format: str,
+    compression: Optional[str] = None,
+    engine: str = "pandas",
+) -> int:
+    """Estimate the peak memory of processing a file whole.
+
+    Args:
+        size (int): The size of the file in bytes.
+        file_format (str): The format of the file.
+        compression (str, optional): The compression of the file, if any.
+        engine (str): The engine that reads the file.
+
+    Returns:
+        int: The estimated memory in bytes.
+    """
+    if engine == "raw":
+        engine = "pandas"
+    factor = get_format(file_format, engine).expansion_factor
+    if compression:
+        factor *= COMPRESSED_EXPANSION
+    return int(size * factor)
+
+
+def plan_job(
+    size: int,
+    file_format: str,
+    compression: Optional[str] = None,
+    engine: str = "pandas",
+    streamable: bool = True,
+    returns_output: bool = True,
+    memory_budget: Optional[int] = None,
+) -> Plan:
+    """Choose how to process a file from its size and a memory budget.
+
+    Files whose estimated memory fits in the budget (less some headroom for
+    the interpreter and libraries) are processed in memory, the fastest
+    path. Larger files are streamed chunk by chunk; if their output is
+    returned rather than uploaded and would take a large share of the
+    memory, it is also spilled to a temporary file.
+
+    Args:
+        size (int): The size of the file in bytes.
+        file_format (str): The format of the file.
+        compression (str, optional): The compression of the file, if any.
+        engine (str): The requested engine.
+        streamable (bool): Whether the file can be streamed.
+        returns_output (bool): Whether the output is returned, rather than
+            uploaded as it is produced.
+        memory_budget (int, optional): The memory that the job may use, in
+            bytes. Defaults to :func:`default_memory_budget`.
+
+    Returns:
+        Plan: The mode, engine and spill threshold of the job.
+    """
+    if memory_budget is None:
+        memory_budget = default_memory_budget()
+    estimated_memory = estimate_memory(size, file_format, compression, engine)
+    if memory_budget is None:
+        return Plan("memory", engine, None, estimated_memory)
+
+    usable = int(memory_budget * MEMORY_HEADROOM)
+    if estimated_memory <= usable or not streamable:
+        if estimated_memory > usable:
+            logger.warning(
+                f"{file_format} files cannot be streamed; processing an "
+                f"estimated {estimated_memory} bytes in memory"
+            )
+        return Plan("memory", engine, None, estimated_memory)
+
+    if engine == "pyarrow" and file_format != "parquet":
+        engine = "pandas"  # pyarrow reads CSV and JSON files whole
+    spill_threshold = None
+    output_limit = int(usable * OUTPUT_SHARE)
+    if returns_output and size > output_limit:
+        spill_threshold = output_limit
+    return Plan("stream", engine, spill_threshold, estimated_memory)
@@ -0,0 +1,145 @@
+import logging
+from typing import Optional, Set
+from obfuscator.s3_file import S3File
+from obfuscator.storage import open_file
+from obfuscator.compression import _new_decompressor, decompress_bytes
+from obfuscator.csv_rewriter import _split_fields, _unquote
+from obfuscator.json_stream import JsonRecordParser
+
+logger = logging.getLogger(__name__)
+
+PROBE_SIZE = 64 * 1024  # bytes of the first ranged GET
+MAX_HEADER_SIZE = 1024 * 1024  # CSV headers longer than this are not probed
+
+
+def _csv_header(data: bytes, complete: bool) -> Optional[Set[str]]:
+    """Return the field names in the header record of a CSV prefix.
+
+    Blank lines before the header are skipped, as pandas skips them. Returns
+    None if the header may continue past the prefix, or if its names cannot
+    be read exactly.
+    """
+    start = 0
+    quoted = False
+    position = 0
+    while True:
+        newline = data.find(b"\n", position)
+        if newline == -1:
+            if not complete:
+                return None
+            newline = len(data)
+        elif quoted ^ (data.count(b'"', position, newline) % 2 == 1):
+            # A newline inside a quoted header field does not end the record
+            quoted = True
+            position = newline + 1
+            continue
+        record = data[start:newline].rstrip(b"\r")
+        if record.strip() or newline == len(data):
+            return _header_names(record)
+        start = position = newline + 1
+        quoted = False
+
+
+def _header_names(record: bytes) -> Optional[Set[str]]:
+    """Return the field names of a CSV header record as pandas reads them.
+
+    Returns None for headers whose names pandas may read differently, such
+    as duplicate names (which pandas renames), blank names, stray quotes or
+    bytes that are not UTF-8, so that files the probe cannot read exactly
+    are obfuscated rather than passed through.
+    """
+    try:
+        names = [_unquote(field) for field in _split_fields(record)]
+    except UnicodeDecodeError:
+        return None
+    if len(set(names)) != len(names):
+        return None
+    for name in names:
+        if not name or '"' in name or "\ufeff" in name:
+            return None
+    return set(names)
+
+
+def _csv_fields(file: S3File, compression: Optional[str]) -> Optional[Set[str]]:
+    data = b""
+    size = PROBE_SIZE
+    while True:
+        data += file.read(size - len(data))
+        complete = len(data) >= file.size
+        if compression and complete:
+            text = decompress_bytes(data, compression)
+        elif compression:
+            # The start of the first member decompresses on its own
+            text = _new_decompressor(compression).decompress(data)
+        else:
+            text = data
+        fields = _csv_header(text, complete)
+        if fields is not None or complete or size >= MAX_HEADER_SIZE:
+            return fields
+        size *= 4
+
+
+def _json_fields(file: S3File, compression: Optional[str]) -> Optional[Set[str]]:
+    # JSON records have no shared schema, so the keys of the first records
+    # say nothing about later ones: only objects read whole are probed.
+    if file.size > PROBE_SIZE:
+        return None
+    data = file.read()
+    if compression:
+        data = decompress_bytes(data, compression)
+    parser = JsonRecordParser()
+    records = parser.feed(data) + parser.close()
+    fields = set()
+    for record in records:
+        if not isinstance(record, dict):
+            return None
+        fields.update(record)
+    return fields
+
+
+def _parquet_fields(file: S3File) -> Set[str]:
+    import pyarrow.parquet as pq
+
+    return set(pq.read_schema(file).names)
+
+
+def read_field_names(
+    bucket_name: Optional[str],
+    object_key: str,
+    file_format: str,
+    compression: Optional[str] = None,
+) -> Optional[Set[str]]:
+    """Reads the top-level field names of an S3 object with small ranged GETs.
+
+    CSV names come from the header record (the first 64 KiB of the object,
+    read further only for longer headers), and Parquet names from the
+    schema in the footer. JSON has no header, so JSON objects are read only
+    if they are no larger than the first GET, and their names are the keys
+    of every record.
+
+    Args:
+        bucket_name (str, optional): The name of the S3 bucket, or None for
+            the local file at ``object_key``.
+        object_key (str): The key of the object in the S3 bucket.
+        file_format (str): The format of the object (csv, json, parquet).
+        compression (str, optional): The compression of the object.
+
+    Returns:
+        set | None: The field names, or None if they cannot be read cheaply
+        (or the object is empty), in which case the object may contain any
+        field.
+    """
+    try:
+        with open_file(bucket_name, object_key, stage_name="probe") as file:
+            if not file.size:
+                return None
+            if file_format == "csv":
+                return _csv_fields(file, compression)
+            if file_format == "json":
+                return _json_fields(file, compression)
+            if file_format == "parquet":
+                return _parquet_fields(file)
+    except Exception as e:
+        # Probing is only a shortcut; the full job reports any real error
+        logger.warning(f"Could not read the fields of {object_key}: {e}")
+    return None
@@ -1,68 +1,705 @@
+from __future__ import annotations
 import json
 import io
 import logging
+import os
+from typing import TYPE_CHECKING, Callable, Iterable, Iterator, Optional, Tuple, Union
+from botocore.exceptions import ClientError
 from obfuscator.read_file import read_file
-from obfuscator.obfuscate_pii import obfuscate_pii
+from obfuscator.obfuscate_pii import obfuscate_pii, masked_fields
+from obfuscator.strategies import build_strategy
+from obfuscator.json_rewriter import parse_field_path
 from obfuscator.write_file import write_file
+from obfuscator.formats import (
+    FORMATS,
+    get_format,
+    is_compressible,
+    parse_writer_options,
+)
+from obfuscator.output_buffer import SpooledBuffer, new_output_buffer
+from obfuscator.stream_file import (
+    _client_error,
+    stream_object,
+    stream_csv,
+    stream_csv_raw,
+    stream_json,
+    stream_json_raw,
+    stream_parquet,
+    DEFAULT_CHUNK_SIZE,
+)
+from obfuscator.parallel_csv import stream_csv_parallel
+from obfuscator.s3_upload import copy_object
+from obfuscator.storage import (
+    _file_error,
+    object_size,
+    open_writer,
+    parse_location,
+    read_object,
+)
+from obfuscator.planner import plan_job
+from obfuscator.probe import read_field_names
+from obfuscator.metrics import JobMetrics, MetricsRecorder, stage, metered
+from obfuscator.compression import split_compression, compress_chunks
+from obfuscator.s3_file import DEFAULT_DOWNLOAD_PART_SIZE, DEFAULT_DOWNLOAD_CONCURRENCY
+
+if TYPE_CHECKING:
+    import pandas as pd
 
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+SUPPORTED_MODES = ["memory", "stream", "parallel", "auto"]
+STREAMING_FORMATS = ["csv", "json", "parquet"]
+PARALLEL_FORMATS = ["csv"]
+SUPPORTED_ENGINES = ["pandas", "pyarrow", "raw"]
+RAW_ENGINE_FORMATS = ["csv", "json"]
+COMPRESS_READ_SIZE = 4 * 1024 * 1024  # bytes of output read per compression step
 
-def process_s3_file(json_input: str) -> io.BytesIO:
-    """Process file from S3, obfuscate PII fields, and return as a byte stream.
+
+def _parse_pii_fields(pii_fields, hmac_key: Optional[str] = None) -> Tuple[list, dict]:
+    """Split the ``pii_fields`` input into field names and strategies.
+
+    ``pii_fields`` is either a list of fields to mask with '***', or an
+    object mapping each field to a strategy name (``"mask"``, ``"hmac"`` or
+    any name in :data:`~obfuscator.strategies.STRATEGIES`) or to an object
+    with a ``strategy`` name and its options.
+
+    Raises:
+        ValueError: If a strategy is unsupported, its options are invalid, or
+            an ``"hmac"`` field has no key.
+    """
+    if not isinstance(pii_fields, dict):
+        return pii_fields, {}
+
+    strategies = {}
+    for field, spec in pii_fields.items():
+        strategy = build_strategy(field, spec, hmac_key)
+        if strategy is not None:
+            strategies[field] = strategy
+    return list(pii_fields), strategies
+
+
+def _parse_input(json_input: str) -> dict:
+    """Parse and validate the JSON input for a processing job.
 
     Args:
         json_input (str): JSON string containing the S3 URI and PII fields.
 
     Returns:
-        io.BytesIO: The byte stream of the processed file.
+        dict: The bucket name (None for a local file), object key (or
+        path), file format, compression, PII
+        fields and their strategies, processing mode, engine, chunk size,
+        worker processes, download options, whether to probe the fields,
+        spill options, memory budget, output format and compression, writer
+        options and output location of the job.
 
     Raises:
         ValueError: If the JSON input is invalid or missing required fields.
-        RuntimeError: If there is an error processing the file.
     """
     try:
-        # Parse JSON input
         input_data = json.loads(json_input)
-        s3_uri = input_data.get("file_to_obfuscate")
-        pii_fields = input_data.get("pii_fields", [])
+    except json.JSONDecodeError as e:
+        raise ValueError(f"Invalid JSON input: {e}")
 
-        # Validate input
-        if not s3_uri:
-            raise ValueError("Missing required S3 file location.")
+    s3_uri = input_data.get("file_to_obfuscate")
+    pii_fields = input_data.get("pii_fields", [])
+    mode = input_data.get("mode", "memory")
+    engine = input_data.get("engine", "pandas")
+    chunk_size = input_data.get("chunk_size", DEFAULT_CHUNK_SIZE)
+    processes = input_data.get("processes")
+    output_location = input_data.get("output_location")
+    probe_fields = input_data.get("probe_fields", True)
+    spill_threshold = input_data.get("spill_threshold")
+    spill_dir = input_data.get("spill_dir")
+    memory_budget = input_data.get("memory_budget")
+    download_part_size = input_data.get(
+        "download_part_size", DEFAULT_DOWNLOAD_PART_SIZE
+    )
+    download_concurrency = input_data.get(
+        "download_concurrency", DEFAULT_DOWNLOAD_CONCURRENCY
+    )
 
-        # Extract bucket name, object key, and file format
-        parts = s3_uri.replace("s3://", "").split("/", 1)
-        if len(parts) != 2:
-            raise ValueError("Invalid S3 URI format.")
-        bucket_name, object_key = parts[0], parts[1]
-        file_format = object_key.split(".")[-1]
+    # Validate input
+    if not s3_uri:
+        raise ValueError("Missing required S3 file location.")
 
-        # Validate file format
-        if file_format not in ["csv", "json", "parquet"]:
-            raise ValueError(f"Unsupported file format: {file_format}")
+    pii_fields, strategies = _parse_pii_fields(
+        pii_fields, input_data.get("hmac_key")
+    )
 
-        # Read file from S3
-        logger.info(f"Reading file from S3: {s3_uri}")
-        df = read_file(bucket_name, object_key, file_format)
+    # Extract bucket name (None for local files), object key, file format and
+    # compression
+    bucket_name, object_key = parse_location(s3_uri)
+    file_format, compression = split_compression(object_key)
 
-        # Obfuscate PII fields
-        logger.info(f"Obfuscating PII fields: {pii_fields}")
-        obfuscated_df = obfuscate_pii(df, pii_fields)
+    # Validate file format
+    if file_format not in FORMATS:
+        raise ValueError(f"Unsupported file format: {file_format}")
+    if compression and not is_compressible(file_format):
+        raise ValueError(f"Compressed {file_format} files are not supported")
 
-        # Write obfuscated data to byte stream
-        logger.info(f"Writing obfuscated data to byte stream in {file_format} format")
-        return write_file(obfuscated_df, file_format)
+    # Validate output format and location; the output is compressed as its
+    # key says, or as the input if it is returned
+    output_format = input_data.get("output_format", file_format)
+    if output_format not in FORMATS:
+        raise ValueError(f"Unsupported output format: {output_format}")
+    output_bucket, output_key = None, None
+    if output_location:
+        output_bucket, output_key = parse_location(output_location)
+        if output_bucket == "" or not output_key:
+            raise ValueError("Invalid output S3 URI format.")
+        output_compression = split_compression(output_key)[1]
+        if output_compression and not is_compressible(output_format):
+            raise ValueError(f"Compressed {output_format} files are not supported")
+    else:
+        output_compression = compression if is_compressible(output_format) else None
+    writer_options = parse_writer_options(input_data)
+
+    # Validate processing mode
+    if mode not in SUPPORTED_MODES:
+        raise ValueError(f"Unsupported processing mode: {mode}")
+    if mode == "stream" and file_format not in STREAMING_FORMATS:
+        raise ValueError(f"Streaming is not supported for {file_format} files")
+    if mode == "parallel" and file_format not in PARALLEL_FORMATS:
+        raise ValueError(
+            f"Parallel processing is not supported for {file_format} files"
+        )
+    if engine not in SUPPORTED_ENGINES:
+        raise ValueError(f"Unsupported engine: {engine}")
+    if engine == "raw" and file_format not in RAW_ENGINE_FORMATS:
+        raise ValueError(f"The raw engine does not support {file_format} files")
+    if engine != "raw":
+        get_format(file_format, engine)
+        get_format(output_format, engine)
+    if engine == "pyarrow" and mode in ("stream", "parallel") and (
+        file_format != "parquet"
+    ):
+        raise ValueError(f"The pyarrow engine reads whole {file_format} files")
+    if output_format != file_format and (engine == "raw" or mode == "parallel"):
+        raise ValueError(
+            f"Converting {file_format} files to {output_format} needs the "
+            "pandas engine in memory or stream mode"
+        )
+    if engine == "raw" and file_format == "json":
+        for field in pii_fields:
+            parse_field_path(field)
+    if not isinstance(chunk_size, int) or chunk_size <= 0:
+        raise ValueError("chunk_size must be a positive integer.")
+    if processes is not None and (not isinstance(processes, int) or processes <= 0):
+        raise ValueError("processes must be a positive integer.")
+    if not isinstance(download_part_size, int) or download_part_size <= 0:
+        raise ValueError("download_part_size must be a positive integer.")
+    if not isinstance(download_concurrency, int) or download_concurrency <= 0:
+        raise ValueError("download_concurrency must be a positive integer.")
+    if not isinstance(probe_fields, bool):
+        raise ValueError("probe_fields must be true or false.")
+    if spill_threshold is not None and (
+        not isinstance(spill_threshold, int) or spill_threshold < 0
+    ):
+        raise ValueError("spill_threshold must be a non-negative integer.")
+    if spill_dir is not None and not (
+        isinstance(spill_dir, str) and os.path.isdir(spill_dir)
+    ):
+        raise ValueError("spill_dir must be an existing directory.")
+    if memory_budget is not None and (
+        not isinstance(memory_budget, int) or memory_budget <= 0
+    ):
+        raise ValueError("memory_budget must be a positive integer.")
+
+    return {
+        "s3_uri": s3_uri,
+        "bucket_name": bucket_name,
+        "object_key": object_key,
+        "file_format": file_format,
+        "compression": compression,
+        "pii_fields": pii_fields,
+        "strategies": strategies,
+        "mode": mode,
+        "engine": engine,
+        "chunk_size": chunk_size,
+        "processes": processes,
+        "download_part_size": download_part_size,
+        "download_concurrency": download_concurrency,
+        "probe_fields": probe_fields,
+        "spill_threshold": spill_threshold,
+        "spill_dir": spill_dir,
+        "memory_budget": memory_budget,
+        "output_format": output_format,
+        "output_compression": output_compression,
+        "writer_options": writer_options,
+        "output_location": output_location,
+        "output_bucket": output_bucket,
+        "output_key": output_key,
+    }
+
+
+def _stream_obfuscated(job: dict) -> Iterator[bytes]:
+    """Yield the uncompressed, obfuscated output of a parsed job."""
+    compression = job["compression"]
+    strategies = job["strategies"]
+    if job["mode"] == "parallel":
+        yield from stream_csv_parallel(
+            job["bucket_name"],
+            job["object_key"],
+            job["pii_fields"],
+            engine=job["engine"],
+            processes=job["processes"],
+            compression=compression,
+            strategies=strategies,
+        )
+    elif job["engine"] == "raw" and job["file_format"] == "json":
+        yield from stream_json_raw(
+            job["bucket_name"],
+            job["object_key"],
+            job["pii_fields"],
+            compression=compression,
+            strategies=strategies,
+        )
+    elif job["engine"] == "raw":
+        yield from stream_csv_raw(
+            job["bucket_name"],
+            job["object_key"],
+            job["pii_fields"],
+            compression=compression,
+            strategies=strategies,
+        )
+    elif job["file_format"] == "csv":
+        yield from stream_csv(
+            job["bucket_name"],
+            job["object_key"],
+            job["pii_fields"],
+            chunk_size=job["chunk_size"],
+            compression=compression,
+            strategies=strategies,
+            output_format=job["output_format"],
+            writer_options=job["writer_options"],
+        )
+    elif job["file_format"] == "json":
+        yield from stream_json(
+            job["bucket_name"],
+            job["object_key"],
+            job["pii_fields"],
+            chunk_size=job["chunk_size"],
+            compression=compression,
+            strategies=strategies,
+            output_format=job["output_format"],
+            writer_options=job["writer_options"],
+        )
+    elif job["file_format"] == "parquet":
+        yield from stream_parquet(
+            job["bucket_name"],
+            job["object_key"],
+            job["pii_fields"],
+            chunk_size=job["chunk_size"],
+            strategies=strategies,
+            output_format=job["output_format"],
+            writer_options=job["writer_options"],
+        )
+
+
+def _stream_job(job: dict) -> Iterator[bytes]:
+    """Yield the obfuscated output of a parsed job chunk by chunk.
+
+    Compressed inputs produce CSV and JSON output with the same compression.
+    """
+    logger.info(f"Streaming file from S3: {job['s3_uri']}")
+    logger.info(f"Obfuscating PII fields: {job['pii_fields']}")
+    chunks = _stream_obfuscated(job)
+    if job["output_compression"]:
+        chunks = metered(
+            compress_chunks(chunks, job["output_compression"]),
+            "compress",
+            "bytes_out",
+        )
+    yield from chunks
+
+
+def _stream_output(job: dict) -> Iterator[bytes]:
+    """Yield the output of a parsed job, passing files without PII through."""
+    if _has_no_pii(job):
+        logger.info(f"No PII fields in {job['s3_uri']}; streaming it unchanged")
+        yield from stream_object(job["bucket_name"], job["object_key"])
+    else:
+        yield from _stream_job(job)
+
+
+def _process_in_memory(job: dict) -> io.BytesIO:
+    """Read, obfuscate and write a parsed job with the whole file in memory."""
+    file_format = job["file_format"]
+
+    # Read file from S3
+    logger.info(f"Reading file from S3: {job['s3_uri']}")
+    df = read_file(
+        job["bucket_name"],
+        job["object_key"],
+        file_format,
+        masked_fields(job["pii_fields"], job["strategies"]),
+        part_size=job["download_part_size"],
+        max_concurrency=job["download_concurrency"],
+        compression=job["compression"],
+        engine=job["engine"],
+        text_fields=list(job["strategies"]),
+    )
+
+    return _obfuscate_in_memory(job, df)
+
+
+def _new_output(job: dict) -> Union[io.BytesIO, SpooledBuffer]:
+    """Return an empty buffer for a parsed job's output, spooled if asked."""
+    return new_output_buffer(job["spill_threshold"], job["spill_dir"])
+
+
+def _obfuscate_in_memory(job: dict, df: pd.DataFrame) -> io.BytesIO:
+    """Obfuscate, write and compress the DataFrame of a parsed job."""
+    output_format = job["output_format"]
+
+    # Obfuscate PII fields
+    logger.info(f"Obfuscating PII fields: {job['pii_fields']}")
+    with stage("obfuscate") as counts:
+        obfuscated_df = obfuscate_pii(
+            df, job["pii_fields"], copy=False, strategies=job["strategies"]
+        )
+        counts.rows += len(df)
+
+    # Write obfuscated data to byte stream
+    logger.info(f"Writing obfuscated data to byte stream in {output_format} format")
+    with stage("serialise") as counts:
+        output = write_file(
+            obfuscated_df,
+            output_format,
+            _new_output(job),
+            job["writer_options"],
+            job["engine"],
+        )
+        counts.bytes_out += output.getbuffer().nbytes
+
+    # Compress the output like the input
+    if job["output_compression"]:
+        with stage("compress") as counts:
+            compressed = _new_output(job)
+            chunks = iter(lambda: output.read(COMPRESS_READ_SIZE), b"")
+            for chunk in compress_chunks(chunks, job["output_compression"]):
+                compressed.write(chunk)
+            counts.bytes_out += compressed.tell()
+        output.close()
+        compressed.seek(0)
+        return compressed
+    return output
+
+
+def _has_no_pii(job: dict) -> bool:
+    """Return whether a parsed job's file certainly contains no PII fields.
+
+    The field names are read from the CSV header, Parquet schema or small
+    JSON object with ranged GETs; files whose names cannot be read cheaply
+    are assumed to contain PII. Files converted to another format or
+    compression are never passed through.
+    """
+    if job["output_format"] != job["file_format"]:
+        return False
+    if job["output_compression"] != job["compression"]:
+        return False
+    pii_fields = job["pii_fields"]
+    if not pii_fields:
+        return True
+    if not job["probe_fields"]:
+        return False
+    if job["engine"] == "raw" and job["file_format"] == "json":
+        # Only the top-level key of each nested path can be probed
+        pii_fields = [parse_field_path(field)[0] for field in pii_fields]
+
+    names = read_field_names(
+        job["bucket_name"], job["object_key"], job["file_format"], job["compression"]
+    )
+    return names is not None and not any(field in names for field in pii_fields)
+
+
+def _pass_through(job: dict, report: JobMetrics) -> Union[io.BytesIO, str]:
+    """Output a job's file unchanged, copying it within S3 if it has an output.
+
+    Used for files without PII fields, which need no download, parsing or
+    serialisation. The copy counts as the upload stage; copies to or from
+    local files are streamed through the job instead.
+    """
+    logger.info(f"No PII fields in {job['s3_uri']}; passing it through unchanged")
+    if job["bucket_name"] and job["output_bucket"]:
+        with stage("upload") as counts:
+            try:
+                size = copy_object(
+                    job["bucket_name"],
+                    job["object_key"],
+                    job["output_bucket"],
+                    job["output_key"],
+                )
+            except ClientError as e:
+                raise _client_error(e, job["bucket_name"], job["object_key"])
+            counts.bytes_out += size
+        report.bytes_out = size
+        return job["output_location"]
+    if job["output_location"]:
+        chunks = stream_object(job["bucket_name"], job["object_key"])
+        return _upload_output(job, report, chunks)
+
+    if job["spill_threshold"] is not None:
+        # Stream the file so that it never has to fit in memory
+        output = _new_output(job)
+        for chunk in stream_object(job["bucket_name"], job["object_key"]):
+            output.write(chunk)
+        report.bytes_out = output.tell()
+        output.seek(0)
+        return output
+
+    data = _download_job(job)
+    report.bytes_out = len(data)
+    return io.BytesIO(data)
+
+
+def _download_job(job: dict) -> bytes:
+    """Download the whole file of a parsed job as the download stage."""
+    with stage("download") as counts:
+        try:
+            data = read_object(
+                job["bucket_name"],
+                job["object_key"],
+                part_size=job["download_part_size"],
+                max_concurrency=job["download_concurrency"],
+            )
+        except ClientError as e:
+            raise _client_error(e, job["bucket_name"], job["object_key"])
+        except OSError as e:
+            raise _file_error(e, job["object_key"])
+        counts.bytes_in += len(data)
+    return data
+
+
+def _plan_job(job: dict, report: JobMetrics):
+    """Choose the mode of an ``"auto"`` job from the size of its file.
+
+    The size comes from a HeadObject (or the local file), recorded as part
+    of the probe stage. The job and its report are updated in place.
+    """
+    with stage("probe"):
+        try:
+            size = object_size(job["bucket_name"], job["object_key"])
+        except ClientError as e:
+            raise _client_error(e, job["bucket_name"], job["object_key"])
+        except OSError as e:
+            raise _file_error(e, job["object_key"])
+
+    plan = plan_job(
+        size,
+        job["file_format"],
+        job["compression"],
+        job["engine"],
+        streamable=job["file_format"] in STREAMING_FORMATS,
+        returns_output=not job["output_location"],
+        memory_budget=job["memory_budget"],
+    )
+    logger.info(
+        f"Processing {job['s3_uri']} ({size} bytes, an estimated "
+        f"{plan.estimated_memory} bytes in memory) in {plan.mode} mode"
+    )
+    job["mode"] = report.mode = plan.mode
+    job["engine"] = report.engine = plan.engine
+    if job["spill_threshold"] is None:
+        job["spill_threshold"] = plan.spill_threshold
+
+
+def _is_streaming(job: dict) -> bool:
+    """Return whether a parsed job is processed chunk by chunk."""
+    return job["mode"] in ("stream", "parallel") or job["engine"] == "raw"
+
+
+def _upload_output(job: dict, report: JobMetrics, chunks: Iterable) -> str:
+    """Upload output chunks to a parsed job's output location.
+
+    Each part is uploaded while the next chunks are still being produced;
+    the upload is aborted if producing them fails. The upload stage covers
+    writing to and completing the upload, excluding the stages that produce
+    the output.
+    """
+    logger.info(f"Uploading obfuscated data to {job['output_location']}")
+    with stage("upload") as counts:
+        with open_writer(job["output_bucket"], job["output_key"]) as writer:
+            for chunk in chunks:
+                writer.write(chunk)
+        counts.bytes_out += writer.bytes_written
+    report.bytes_out = writer.bytes_written
+    return job["output_location"]
+
+
+def _upload_job(job: dict, report: JobMetrics) -> str:
+    """Process a parsed job, uploading the output to its output location."""
+    if _is_streaming(job):
+        return _upload_output(job, report, _stream_job(job))
+    return _upload_output(job, report, [_process_in_memory(job).getbuffer()])
+
+
+def _run_job(job: dict, report: JobMetrics) -> Union[io.BytesIO, str]:
+    """Process a parsed job, recording its output size in the report."""
+    if job["mode"] == "auto":
+        _plan_job(job, report)
+    if _has_no_pii(job):
+        return _pass_through(job, report)
+    if job["output_location"]:
+        return _upload_job(job, report)
+
+    if _is_streaming(job):
+        output = _new_output(job)
+        for chunk in _stream_job(job):
+            output.write(chunk)
+        output.seek(0)
+    else:
+        output = _process_in_memory(job)
+    report.bytes_out = output.getbuffer().nbytes
+    return output
+
+
+def _new_recorder(job: dict) -> MetricsRecorder:
+    """Create the metrics recorder for a parsed job."""
+    return MetricsRecorder(
+        JobMetrics(job["s3_uri"], job["file_format"], job["mode"], job["engine"])
+    )
+
+
+def process_s3_file_with_metrics(
+    json_input: str,
+    metrics_hook: Optional[Callable[[JobMetrics], None]] = None,
+) -> Tuple[Union[io.BytesIO, str], JobMetrics]:
+    """Process a file like :func:`process_s3_file` and report its metrics.
+
+    Args:
+        json_input (str): JSON string containing the S3 URI and PII fields.
+        metrics_hook (callable, optional): Called with the metrics report
+            when the job finishes, whether or not it succeeded.
+
+    Returns:
+        tuple: The output of :func:`process_s3_file` and a
+        :class:`~obfuscator.metrics.JobMetrics` report with the wall time,
+        CPU time, bytes and rows of each stage (download, parse, obfuscate,
+        serialise and upload).
+
+    Raises:
+        ValueError: If the JSON input is invalid or missing required fields.
+        RuntimeError: If there is an error processing the file.
+    """
+    try:
+        job = _parse_input(json_input)
+    except ValueError as e:
+        logger.error(f"Input validation error: {e}")
+        raise
+
+    recorder = _new_recorder(job)
+    error = None
+    try:
+        with recorder.activate():
+            return _run_job(job, recorder.report), recorder.report
 
-    except json.JSONDecodeError as e:
-        logger.error(f"Invalid JSON input: {e}")
-        raise ValueError(f"Invalid JSON input: {e}")
     except ValueError as e:
         # Re-raise ValueError for input validation errors
+        error = e
         logger.error(f"Input validation error: {e}")
         raise
     except Exception as e:
         # Wrap unexpected errors in RuntimeError
+        error = e
+        logger.error(f"Error processing S3 file: {e}")
+        raise RuntimeError(f"Error processing S3 file: {e}")
+    finally:
+        recorder.finish(error, metrics_hook)
+
+
+def process_s3_file(
+    json_input: str,
+    metrics_hook: Optional[Callable[[JobMetrics], None]] = None,
+) -> Union[io.BytesIO, str]:
+    """Process file from S3, obfuscate PII fields, and return as a byte stream.
+
+    Args:
+        json_input (str): JSON string containing the S3 URI and PII fields.
+            An optional ``mode`` of ``"stream"`` processes the file in chunks
+            of ``chunk_size`` rows instead of loading it into memory at once.
+            An ``engine`` of ``"raw"`` rewrites CSV PII fields as bytes
+            without parsing the file with pandas; for JSON it rewrites the
+            values at nested field paths such as ``customer.email``. An
+            ``output_location`` S3 URI uploads the output there instead of
+            returning it. Either location may instead be a local file, as a
+            ``file://`` URI or a path, which is read through a memory map.
+            A CSV ``mode`` of ``"parallel"`` splits the file at record
+            boundaries and obfuscates the parts on ``processes`` cores. A
+            ``mode`` of ``"auto"`` chooses memory or stream mode, and
+            whether to spill the output, from the size of the file and a
+            ``memory_budget`` that defaults to the Lambda memory limit.
+        metrics_hook (callable, optional): Called with a
+            :class:`~obfuscator.metrics.JobMetrics` report when the job
+            finishes, for example an :class:`~obfuscator.metrics.EmfEmitter`.
+
+    Returns:
+        io.BytesIO | str: The byte stream of the processed file, or the
+        output location if one was given. With a ``spill_threshold`` the
+        byte stream is a :class:`~obfuscator.output_buffer.SpooledBuffer`,
+        which spills to a temporary file in ``spill_dir`` when it outgrows
+        the threshold.
+
+    Raises:
+        ValueError: If the JSON input is invalid or missing required fields.
+        RuntimeError: If there is an error processing the file.
+    """
+    output, _ = process_s3_file_with_metrics(json_input, metrics_hook)
+    return output
+
+
+def stream_s3_file(
+    json_input: str,
+    metrics_hook: Optional[Callable[[JobMetrics], None]] = None,
+) -> Iterator[bytes]:
+    """Process file from S3 in chunks, yielding the obfuscated output.
+
+    Unlike :func:`process_s3_file`, the output is never collected in memory,
+    so callers can forward each chunk (to a file, socket or upload) as soon as
+    it is produced and keep peak memory bounded by ``chunk_size``.
+
+    Args:
+        json_input (str): JSON string containing the S3 URI and PII fields.
+        metrics_hook (callable, optional): Called with a
+            :class:`~obfuscator.metrics.JobMetrics` report once the stream is
+            exhausted, fails or is closed early. Its wall time includes the
+            time the caller spends between chunks.
+
+    Yields:
+        bytes: Successive pieces of the processed file.
+
+    Raises:
+        ValueError: If the JSON input is invalid or missing required fields.
+        RuntimeError: If there is an error processing the file.
+    """
+    try:
+        job = _parse_input(json_input)
+        if job["file_format"] not in STREAMING_FORMATS:
+            raise ValueError(
+                f"Streaming is not supported for {job['file_format']} files"
+            )
+    except ValueError as e:
+        logger.error(f"Input validation error: {e}")
+        raise
+
+    recorder = _new_recorder(job)
+    error = None
+    try:
+        chunks = _stream_output(job)
+        while True:
+            # Only activate the recorder while this job is producing a chunk
+            with recorder.activate():
+                chunk = next(chunks, None)
+            if chunk is None:
+                break
+            recorder.report.bytes_out += len(chunk)
+            yield chunk
+    except GeneratorExit:
+        error = RuntimeError("Stream closed before it was exhausted")
+        raise
+    except Exception as e:
+        error = e
         logger.error(f"Error processing S3 file: {e}")
         raise RuntimeError(f"Error processing S3 file: {e}")
+    finally:
+        recorder.finish(error, metrics_hook)
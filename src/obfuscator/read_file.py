@@ -1,57 +1,137 @@
-import pandas as pd
-import boto3
-import pyarrow
-import pyarrow.parquet as pq
-import io
+from __future__ import annotations
 import logging
-from pandas.errors import EmptyDataError
+from typing import TYPE_CHECKING, Optional
 from botocore.exceptions import ClientError
+from obfuscator.metrics import stage
+from obfuscator.compression import decompress_bytes
+from obfuscator.formats import get_format
+from obfuscator.s3_file import (
+    DEFAULT_DOWNLOAD_PART_SIZE,
+    DEFAULT_DOWNLOAD_CONCURRENCY,
+)
+from obfuscator.storage import _file_error, open_arrow_file, read_object
 
+if TYPE_CHECKING:
+    import pandas as pd
 
-logging.basicConfig(
-    level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s"
-)
 logger = logging.getLogger(__name__)
 
 
-def read_file(bucket_name: str, object_key: str, file_format: str) -> pd.DataFrame:
+def parse_file(
+    file_data,
+    file_format: str,
+    compression: Optional[str] = None,
+    engine: str = "pandas",
+    text_fields: Optional[list] = None,
+) -> pd.DataFrame:
+    """Parses the downloaded bytes of a CSV or JSON file into a DataFrame.
+
+    Args:
+        file_data (bytes | bytearray): The contents of the file.
+        file_format (str): The format of the file (csv or json).
+        compression (str, optional): The compression of the file (gzip, bz2
+            or zstd), if any.
+        engine (str): The engine that parses the file, ``"pandas"`` or
+            ``"pyarrow"``, which parses on several threads.
+        text_fields (list, optional): Fields read as strings rather than
+            with inferred types, such as fields with a strategy.
+
+    Returns:
+        pd.DataFrame: The DataFrame containing the file data, or an empty
+        DataFrame if the file is empty.
+
+    Raises:
+        RuntimeError: If the file cannot be decompressed or parsed.
+    """
+    import pandas as pd
+
+    reader = get_format(file_format, engine)()
+    try:
+        if compression:
+            with stage("decompress") as counts:
+                file_data = decompress_bytes(file_data, compression)
+                counts.bytes_out += len(file_data)
+
+        with stage("parse") as counts:
+            df = reader.read(file_data, text_fields=text_fields)
+            counts.rows += len(df)
+        return df
+    except pd.errors.EmptyDataError:
+        logger.warning(f"Empty {file_format} file")
+        return pd.DataFrame()
+    except ValueError as e:
+        # pyarrow's ArrowInvalid is a ValueError
+        logger.error(f"Error parsing {file_format} file: {e}")
+        raise RuntimeError(f"Error parsing {file_format} file: {e}")
+
+
+def read_file(
+    bucket_name: Optional[str],
+    object_key: str,
+    file_format: str,
+    pii_fields: Optional[list] = None,
+    part_size: int = DEFAULT_DOWNLOAD_PART_SIZE,
+    max_concurrency: int = DEFAULT_DOWNLOAD_CONCURRENCY,
+    compression: Optional[str] = None,
+    engine: str = "pandas",
+    text_fields: Optional[list] = None,
+) -> pd.DataFrame:
     """Reads a file from S3 and returns the appropriate DataFrame.
 
     Args:
-        bucket_name (str): The name of the S3 bucket.
+        bucket_name (str, optional): The name of the S3 bucket, or None to
+            read the local file at ``object_key`` through a memory map.
         object_key (str): The key of the object in the S3 bucket.
         file_format (str): The format of the file (csv, json, parquet).
+        pii_fields (list, optional): Fields that will be obfuscated. Parquet
+            files skip reading these columns and return them as '***'.
+        part_size (int): The size of the byte ranges that CSV and JSON files
+            larger than one range are downloaded in.
+        max_concurrency (int): The maximum number of ranges fetched at once.
+        compression (str, optional): The compression of a CSV or JSON file
+            (gzip, bz2 or zstd), if any.
+        engine (str): The engine that parses the file, ``"pandas"`` or
+            ``"pyarrow"``; see :mod:`obfuscator.formats`.
+        text_fields (list, optional): Fields of CSV and JSON files read as
+            strings rather than with inferred types.
 
     Returns:
         pd.DataFrame: The DataFrame containing the file data.
 
     Raises:
-        ValueError: If the file format is unsupported.
+        ValueError: If the file format or download options are unsupported.
         RuntimeError: If there is an error reading the file from S3.
     """
-    if file_format not in ["csv", "json", "parquet"]:
-        raise ValueError(f"Unsupported file format: {file_format}")
-    s3_client = boto3.client("s3")
+    reader = get_format(file_format, engine)()
+    if part_size <= 0 or max_concurrency <= 0:
+        raise ValueError("part_size and max_concurrency must be positive integers.")
+    import pandas as pd
+
     try:
-        response = s3_client.get_object(Bucket=bucket_name, Key=object_key)
-        file_data = response["Body"].read()
-        file_buffer = io.BytesIO(file_data)
-
-        if file_format == "csv":
-            return pd.read_csv(file_buffer)
-        elif file_format == "json":
-            return pd.read_json(file_buffer)
-        elif file_format == "parquet":
-            return pq.read_table(file_buffer).to_pandas()
-    except (EmptyDataError, pyarrow.lib.ArrowInvalid, ValueError):
+        if reader.reads_ranges:
+            with open_arrow_file(bucket_name, object_key) as source:
+                with stage("parse") as counts:
+                    df = reader.read(source, pii_fields, text_fields)
+                    counts.rows += len(df)
+            return df
+
+        with stage("download") as counts:
+            file_data = read_object(bucket_name, object_key, part_size, max_concurrency)
+            counts.bytes_in += len(file_data)
+        return parse_file(file_data, file_format, compression, engine, text_fields)
+    except pd.errors.EmptyDataError:
         logger.warning(f"Empty {file_format} file: {bucket_name}/{object_key}")
         return pd.DataFrame()
+    except RuntimeError:
+        raise
     except ClientError as e:
-        if e.response["Error"]["Code"] == "NoSuchKey":
+        if e.response["Error"]["Code"] in ("NoSuchKey", "404"):
             logger.error(f"File not found: {bucket_name}/{object_key}")
         else:
             logger.error(f"S3 Client Error: {e}")
         raise RuntimeError(f"S3 Client Error: {e}")
+    except OSError as e:
+        raise _file_error(e, object_key)
     except Exception as e:
         logger.error(f"Error reading {file_format} file from S3: {e}")
         raise RuntimeError(f"Error reading {file_format} file from S3: {e}")
@@ -0,0 +1,105 @@
+import threading
+
+DEFAULT_MAX_POOL_CONNECTIONS = 50
+DEFAULT_MAX_ATTEMPTS = 5
+DEFAULT_RETRY_MODE = "standard"
+
+_lock = threading.Lock()
+_session = None
+_client = None
+_client_options = {
+    "max_pool_connections": DEFAULT_MAX_POOL_CONNECTIONS,
+    "max_attempts": DEFAULT_MAX_ATTEMPTS,
+    "retry_mode": DEFAULT_RETRY_MODE,
+}
+
+
+def get_s3_client():
+    """Returns the shared S3 client, creating it on first use.
+
+    The client is created once per process from its own boto3 session and
+    reused by every read, write and listing call, so credential resolution,
+    endpoint setup and the HTTP connection pool survive across files, threads
+    and warm Lambda invocations. boto3 clients are thread-safe.
+
+    Returns:
+        botocore.client.S3: The shared S3 client.
+    """
+    global _session, _client
+    if _client is None:
+        import boto3
+        from botocore.config import Config
+
+        with _lock:
+            if _session is None:
+                _session = boto3.session.Session()
+            if _client is None:
+                config = Config(
+                    max_pool_connections=_client_options["max_pool_connections"],
+                    retries={
+                        "total_max_attempts": _client_options["max_attempts"],
+                        "mode": _client_options["retry_mode"],
+                    },
+                )
+                _client = _session.client("s3", config=config)
+    return _client
+
+
+def configure_s3_client(
+    max_pool_connections: int = DEFAULT_MAX_POOL_CONNECTIONS,
+    max_attempts: int = DEFAULT_MAX_ATTEMPTS,
+    retry_mode: str = DEFAULT_RETRY_MODE,
+):
+    """Sets the connection pool and retry options of the shared S3 client.
+
+    The current client is discarded; the next call to :func:`get_s3_client`
+    creates one with the new options.
+
+    Args:
+        max_pool_connections (int): The maximum number of pooled HTTP
+            connections, which bounds how many requests can run at once.
+        max_attempts (int): The maximum number of attempts per request.
+        retry_mode (str): The botocore retry mode (legacy, standard or
+            adaptive).
+
+    Raises:
+        ValueError: If an option is out of range.
+    """
+    if max_pool_connections <= 0:
+        raise ValueError("max_pool_connections must be a positive integer.")
+    if max_attempts <= 0:
+        raise ValueError("max_attempts must be a positive integer.")
+    if retry_mode not in ("legacy", "standard", "adaptive"):
+        raise ValueError(f"Unsupported retry mode: {retry_mode}")
+
+    global _client
+    with _lock:
+        _client_options.update(
+            max_pool_connections=max_pool_connections,
+            max_attempts=max_attempts,
+            retry_mode=retry_mode,
+        )
+        _client = None
+
+
+def set_s3_client(client):
+    """Injects the S3 client to use, for example one with custom credentials.
+
+    Args:
+        client: A boto3 S3 client, or None to go back to the default client.
+    """
+    global _client
+    with _lock:
+        _client = client
+
+
+def reset_s3_client():
+    """Discards the shared S3 client and restores the default options."""
+    global _client
+    with _lock:
+        _client_options.update(
+            max_pool_connections=DEFAULT_MAX_POOL_CONNECTIONS,
+            max_attempts=DEFAULT_MAX_ATTEMPTS,
+            retry_mode=DEFAULT_RETRY_MODE,
+        )
+        _client = None
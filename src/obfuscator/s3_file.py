@@ -0,0 +1,230 @@
+import io
+from concurrent.futures import ThreadPoolExecutor
+from obfuscator.s3_client import get_s3_client
+from obfuscator.metrics import current_recorder, stage
+
+DEFAULT_DOWNLOAD_PART_SIZE = 8 * 1024 * 1024
+DEFAULT_DOWNLOAD_CONCURRENCY = 8
+
+
+class S3File(io.RawIOBase):
+    """A read-only, seekable file-like view of an S3 object.
+
+    Every ``read`` is served by a ranged GET, so readers that only need part
+    of an object (such as a Parquet footer or a subset of its row groups)
+    never download the rest of it.
+
+    Args:
+        bucket_name (str): The name of the S3 bucket.
+        object_key (str): The key of the object in the S3 bucket.
+        s3_client: The boto3 S3 client to use. Defaults to the shared
+            client.
+        stage_name (str): The metrics stage that reads are recorded as.
+
+    Raises:
+        botocore.exceptions.ClientError: If the object cannot be found.
+    """
+
+    def __init__(
+        self,
+        bucket_name: str,
+        object_key: str,
+        s3_client=None,
+        stage_name: str = "download",
+    ):
+        super().__init__()
+        self.bucket_name = bucket_name
+        self.object_key = object_key
+        self.stage_name = stage_name
+        self._s3_client = s3_client or get_s3_client()
+        response = self._s3_client.head_object(Bucket=bucket_name, Key=object_key)
+        self.size = response["ContentLength"]
+        self._position = 0
+        # Readers such as pyarrow may call read() from their own threads
+        self._recorder = current_recorder()
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def tell(self) -> int:
+        return self._position
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        if whence == io.SEEK_SET:
+            position = offset
+        elif whence == io.SEEK_CUR:
+            position = self._position + offset
+        elif whence == io.SEEK_END:
+            position = self.size + offset
+        else:
+            raise ValueError(f"Invalid whence: {whence}")
+        if position < 0:
+            raise ValueError("Negative seek position")
+        self._position = position
+        return self._position
+
+    def read(self, size: int = -1) -> bytes:
+        if size is None or size < 0:
+            end = self.size
+        else:
+            end = min(self._position + size, self.size)
+        if self._position >= end:
+            return b""
+
+        with stage(self.stage_name, self._recorder) as counts:
+            response = self._s3_client.get_object(
+                Bucket=self.bucket_name,
+                Key=self.object_key,
+                Range=f"bytes={self._position}-{end - 1}",
+            )
+            data = response["Body"].read()
+            counts.bytes_in += len(data)
+        self._position += len(data)
+        return data
+
+    def readall(self) -> bytes:
+        return self.read()
+
+    def readinto(self, buffer) -> int:
+        data = self.read(len(buffer))
+        buffer[: len(data)] = data
+        return len(data)
+
+
+class MemoryFile(io.RawIOBase):
+    """A read-only file-like view of a bytes-like buffer that does not copy it.
+
+    ``io.BytesIO`` copies any buffer that is not ``bytes``; this lets parsers
+    read a downloaded ``bytearray`` in place.
+
+    Args:
+        buffer: The bytes-like object to read.
+    """
+
+    def __init__(self, buffer):
+        super().__init__()
+        self._view = memoryview(buffer)
+        self._position = 0
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def tell(self) -> int:
+        return self._position
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        if whence == io.SEEK_SET:
+            self._position = offset
+        elif whence == io.SEEK_CUR:
+            self._position += offset
+        elif whence == io.SEEK_END:
+            self._position = len(self._view) + offset
+        else:
+            raise ValueError(f"Invalid whence: {whence}")
+        return self._position
+
+    def readinto(self, buffer) -> int:
+        data = self._view[self._position : self._position + len(buffer)]
+        buffer[: len(data)] = data
+        self._position += len(data)
+        return len(data)
+
+
+class ChunkFile(io.RawIOBase):
+    """A read-only file-like view of an iterator of byte chunks.
+
+    Lets parsers that expect a file read a stream that is produced chunk by
+    chunk, such as decompressed S3 data, without collecting it first.
+
+    Args:
+        chunks (Iterable[bytes]): The chunks to read, in order.
+    """
+
+    def __init__(self, chunks):
+        super().__init__()
+        self._chunks = iter(chunks)
+        self._buffer = b""
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        while not self._buffer:
+            self._buffer = next(self._chunks, None)
+            if self._buffer is None:
+                self._buffer = b""
+                return 0
+        size = min(len(buffer), len(self._buffer))
+        buffer[:size] = self._buffer[:size]
+        self._buffer = self._buffer[size:]
+        return size
+
+
+def download_object(
+    bucket_name: str,
+    object_key: str,
+    part_size: int = DEFAULT_DOWNLOAD_PART_SIZE,
+    max_concurrency: int = DEFAULT_DOWNLOAD_CONCURRENCY,
+    s3_client=None,
+):
+    """Downloads an S3 object into memory, fetching byte ranges in parallel.
+
+    The object size is found with a HEAD request. Objects no larger than
+    ``part_size`` are fetched with a single GET; larger ones are split into
+    ``part_size`` ranges that are fetched concurrently straight into a
+    preallocated buffer. Every range is pinned to the ETag seen by the HEAD
+    request, so an object replaced mid-download fails instead of mixing
+    versions.
+
+    Args:
+        bucket_name (str): The name of the S3 bucket.
+        object_key (str): The key of the object in the S3 bucket.
+        part_size (int): The size of each byte range in bytes.
+        max_concurrency (int): The maximum number of ranges fetched at once.
+        s3_client: The boto3 S3 client to use. Defaults to the shared
+            client.
+
+    Returns:
+        bytes | bytearray: The contents of the object.
+
+    Raises:
+        ValueError: If ``part_size`` or ``max_concurrency`` is out of range.
+        botocore.exceptions.ClientError: If the object cannot be fetched.
+    """
+    if part_size <= 0:
+        raise ValueError("part_size must be a positive integer.")
+    if max_concurrency <= 0:
+        raise ValueError("max_concurrency must be a positive integer.")
+
+    s3_client = s3_client or get_s3_client()
+    head = s3_client.head_object(Bucket=bucket_name, Key=object_key)
+    size = head["ContentLength"]
+    if size <= part_size:
+        response = s3_client.get_object(
+            Bucket=bucket_name, Key=object_key, IfMatch=head["ETag"]
+        )
+        return response["Body"].read()
+
+    buffer = bytearray(size)
+    view = memoryview(buffer)
+
+    def fetch_range(start: int):
+        end = min(start + part_size, size)
+        response = s3_client.get_object(
+            Bucket=bucket_name,
+            Key=object_key,
+            Range=f"bytes={start}-{end - 1}",
+            IfMatch=head["ETag"],
+        )
+        view[start:end] = response["Body"].read()
+
+    with ThreadPoolExecutor(max_workers=max_concurrency) as executor:
+        # Consume the results so the first failed range is raised here
+        list(executor.map(fetch_range, range(0, size, part_size)))
+    return buffer
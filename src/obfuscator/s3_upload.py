@@ -0,0 +1,203 @@
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from obfuscator.s3_client import get_s3_client
+
+logger = logging.getLogger(__name__)
+
+MIN_PART_SIZE = 5 * 1024 * 1024  # S3 minimum for every part but the last
+DEFAULT_PART_SIZE = 8 * 1024 * 1024
+DEFAULT_MAX_CONCURRENCY = 4
+MAX_COPY_SIZE = 5 * 1024 * 1024 * 1024  # S3 limit of a single CopyObject
+
+
+class S3MultipartWriter:
+    """Uploads bytes to S3 as they are written, using a multipart upload.
+
+    Written bytes are buffered until a full part is available, which is then
+    uploaded on a background thread while the caller keeps producing output.
+    At most ``max_concurrency`` parts are buffered or in flight at once, so
+    memory stays bounded regardless of the size of the object. Output that
+    never fills a part is sent with a single ``put_object`` instead.
+
+    Use as a context manager: the upload is completed on a clean exit and
+    aborted if an exception is raised.
+
+    Args:
+        bucket_name (str): The name of the destination S3 bucket.
+        object_key (str): The key of the destination object.
+        part_size (int): The size of each part in bytes (at least 5 MiB).
+        max_concurrency (int): The maximum number of parts uploading at once.
+
+    Raises:
+        ValueError: If ``part_size`` or ``max_concurrency`` is out of range.
+    """
+
+    def __init__(
+        self,
+        bucket_name: str,
+        object_key: str,
+        part_size: int = DEFAULT_PART_SIZE,
+        max_concurrency: int = DEFAULT_MAX_CONCURRENCY,
+    ):
+        if part_size < MIN_PART_SIZE:
+            raise ValueError(f"part_size must be at least {MIN_PART_SIZE} bytes.")
+        if max_concurrency <= 0:
+            raise ValueError("max_concurrency must be a positive integer.")
+        self.bucket_name = bucket_name
+        self.object_key = object_key
+        self.part_size = part_size
+        self._s3_client = get_s3_client()
+        self._buffer = bytearray()
+        self._upload_id = None
+        self._futures = []
+        self._slots = threading.BoundedSemaphore(max_concurrency)
+        self._executor = ThreadPoolExecutor(max_workers=max_concurrency)
+        self.bytes_written = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+    def _upload_part(self, part_number: int, data: bytes) -> dict:
+        try:
+            response = self._s3_client.upload_part(
+                Bucket=self.bucket_name,
+                Key=self.object_key,
+                UploadId=self._upload_id,
+                PartNumber=part_number,
+                Body=data,
+            )
+            return {"PartNumber": part_number, "ETag": response["ETag"]}
+        finally:
+            self._slots.release()
+
+    def _raise_failed_parts(self):
+        for future in self._futures:
+            if future.done() and future.exception() is not None:
+                raise future.exception()
+
+    def _submit_part(self, data: bytearray):
+        self._raise_failed_parts()
+        if self._upload_id is None:
+            response = self._s3_client.create_multipart_upload(
+                Bucket=self.bucket_name, Key=self.object_key
+            )
+            self._upload_id = response["UploadId"]
+        self._slots.acquire()
+        part_number = len(self._futures) + 1
+        self._futures.append(
+            self._executor.submit(self._upload_part, part_number, data)
+        )
+
+    def write(self, data: bytes) -> int:
+        """Buffers data and starts uploading every part that is full.
+
+        Data is buffered one part at a time, so writing a whole output at
+        once (such as the ``getbuffer()`` of an in-memory file) copies only
+        the parts in flight rather than all of it.
+
+        Args:
+            data (bytes | memoryview): The next bytes of the object.
+
+        Returns:
+            int: The number of bytes written.
+        """
+        view = memoryview(data).cast("B")
+        position = 0
+        while position < len(view):
+            end = position + self.part_size - len(self._buffer)
+            self._buffer += view[position:end]
+            position = min(end, len(view))
+            if len(self._buffer) == self.part_size:
+                part, self._buffer = self._buffer, bytearray()
+                self._submit_part(part)
+        self.bytes_written += len(view)
+        return len(view)
+
+    def close(self):
+        """Uploads the remaining bytes and completes the upload.
+
+        Raises:
+            RuntimeError: If any part failed to upload; the upload is aborted.
+        """
+        try:
+            if self._upload_id is None:
+                self._s3_client.put_object(
+                    Bucket=self.bucket_name,
+                    Key=self.object_key,
+                    Body=bytes(self._buffer),
+                )
+                return
+
+            if self._buffer:
+                self._submit_part(bytes(self._buffer))
+            parts = [future.result() for future in self._futures]
+            self._s3_client.complete_multipart_upload(
+                Bucket=self.bucket_name,
+                Key=self.object_key,
+                UploadId=self._upload_id,
+                MultipartUpload={"Parts": parts},
+            )
+        except Exception as e:
+            self.abort()
+            raise RuntimeError(f"Error uploading to S3: {e}")
+        finally:
+            self._buffer = bytearray()
+            self._executor.shutdown(wait=True)
+
+    def abort(self):
+        """Cancels the upload, discarding any parts already uploaded."""
+        self._executor.shutdown(wait=True)
+        if self._upload_id is not None:
+            logger.warning(
+                f"Aborting multipart upload to {self.bucket_name}/{self.object_key}"
+            )
+            self._s3_client.abort_multipart_upload(
+                Bucket=self.bucket_name,
+                Key=self.object_key,
+                UploadId=self._upload_id,
+            )
+            self._upload_id = None
+
+
+def copy_object(
+    source_bucket: str, source_key: str, bucket_name: str, object_key: str
+) -> int:
+    """Copies an S3 object to another location without downloading it.
+
+    Objects up to 5 GiB are copied with a single ``CopyObject`` request;
+    larger ones are copied part by part with ``UploadPartCopy``, so the data
+    never leaves S3 either way.
+
+    Args:
+        source_bucket (str): The bucket of the object to copy.
+        source_key (str): The key of the object to copy.
+        bucket_name (str): The name of the destination S3 bucket.
+        object_key (str): The key of the destination object.
+
+    Returns:
+        int: The size of the copied object in bytes.
+
+    Raises:
+        botocore.exceptions.ClientError: If the object cannot be copied.
+    """
+    s3_client = get_s3_client()
+    source = {"Bucket": source_bucket, "Key": source_key}
+    head = s3_client.head_object(**source)
+    size = head["ContentLength"]
+    if size <= MAX_COPY_SIZE:
+        s3_client.copy_object(
+            CopySource=source,
+            Bucket=bucket_name,
+            Key=object_key,
+            CopySourceIfMatch=head["ETag"],
+        )
+    else:
+        s3_client.copy(source, bucket_name, object_key)
+    return size
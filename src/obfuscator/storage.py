@@ -0,0 +1,265 @@
+import io
+import logging
+import mmap
+import os
+import tempfile
+from typing import Iterator, Optional, Tuple
+from obfuscator.s3_file import (
+    DEFAULT_DOWNLOAD_PART_SIZE,
+    DEFAULT_DOWNLOAD_CONCURRENCY,
+    MemoryFile,
+    S3File,
+    download_object,
+)
+from obfuscator.s3_upload import S3MultipartWriter
+from obfuscator.s3_client import get_s3_client
+
+logger = logging.getLogger(__name__)
+
+LOCAL_SCHEME = "file://"
+
+# Every storage function takes a bucket name and an object key; a bucket
+# name of None means the key is the path of a local file.
+
+
+def is_local(location: str) -> bool:
+    """Return whether a location is a local file rather than an S3 URI.
+
+    Local files are ``file://`` URIs, absolute paths and paths starting
+    with ``./``, ``../`` or ``~``. Any other location is an S3 URI, whether
+    or not a local file of that name exists, so a job never reads a local
+    file in place of the object it names.
+    """
+    if location.startswith("s3://"):
+        return False
+    if location.startswith((LOCAL_SCHEME, "./", "../", "~")):
+        return True
+    return os.path.isabs(location)
+
+
+def local_path(location: str) -> str:
+    """Return the path of a local file location."""
+    if location.startswith(LOCAL_SCHEME):
+        location = location[len(LOCAL_SCHEME) :]
+    return os.path.expanduser(location)
+
+
+def parse_location(location: str) -> Tuple[Optional[str], str]:
+    """Split a location into a bucket name and key, or None and a local path.
+
+    Raises:
+        ValueError: If an S3 URI has no object key.
+    """
+    if is_local(location):
+        return None, local_path(location)
+    parts = location.replace("s3://", "").split("/", 1)
+    if len(parts) != 2:
+        raise ValueError("Invalid S3 URI format.")
+    return parts[0], parts[1]
+
+
+def _file_error(e: OSError, path: str) -> RuntimeError:
+    """Log a local file error and return the RuntimeError to raise for it."""
+    if isinstance(e, FileNotFoundError):
+        logger.error(f"File not found: {path}")
+    else:
+        logger.error(f"File Error: {e}")
+    return RuntimeError(f"File Error: {e}")
+
+
+def _map_file(path: str):
+    """Memory-map a local file read-only; empty files cannot be mapped."""
+    with open(path, "rb") as file:
+        if os.fstat(file.fileno()).st_size == 0:
+            return b""
+        return mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+class LocalFile(MemoryFile):
+    """A read-only, seekable view of a memory-mapped local file.
+
+    Has the interface of :class:`~obfuscator.s3_file.S3File` and of a
+    streaming S3 body, so every reader works on local files too. Reads are
+    served from the page cache, without reading the whole file into memory.
+
+    Args:
+        path (str): The path of the file.
+
+    Raises:
+        OSError: If the file cannot be opened.
+    """
+
+    def __init__(self, path: str):
+        self._map = _map_file(path)
+        super().__init__(self._map)
+        self.path = path
+        self.size = len(self._map)
+
+    def iter_chunks(self, chunk_size: int) -> Iterator[bytes]:
+        """Yield the rest of the file in chunks of up to ``chunk_size`` bytes."""
+        while True:
+            chunk = self.read(chunk_size)
+            if not chunk:
+                return
+            yield chunk
+
+    def close(self):
+        if not self.closed:
+            self._view.release()
+            if isinstance(self._map, mmap.mmap):
+                self._map.close()
+        super().close()
+
+
+def object_size(bucket_name: Optional[str], object_key: str) -> int:
+    """Returns the size in bytes of an S3 object, from a HeadObject, or of a
+    local file.
+
+    Raises:
+        botocore.exceptions.ClientError: If the S3 object cannot be found.
+        OSError: If the local file cannot be found.
+    """
+    if bucket_name is None:
+        return os.path.getsize(object_key)
+    response = get_s3_client().head_object(Bucket=bucket_name, Key=object_key)
+    return response["ContentLength"]
+
+
+def open_file(bucket_name: Optional[str], object_key: str, stage_name="download"):
+    """Opens an S3 object or local file as a seekable, read-only file.
+
+    Args:
+        bucket_name (str, optional): The name of the S3 bucket, or None for
+            the local file at ``object_key``.
+        object_key (str): The key of the object, or the path of the file.
+        stage_name (str): The metrics stage that S3 reads are recorded as.
+
+    Returns:
+        S3File | LocalFile: The file, with its length in ``size``.
+
+    Raises:
+        botocore.exceptions.ClientError: If the S3 object cannot be found.
+        OSError: If the local file cannot be opened.
+    """
+    if bucket_name is None:
+        return LocalFile(object_key)
+    return S3File(bucket_name, object_key, stage_name=stage_name)
+
+
+def open_arrow_file(bucket_name: Optional[str], object_key: str):
+    """Opens an S3 object or local file for pyarrow readers.
+
+    Local files are opened as pyarrow memory maps, which pyarrow reads
+    without copying: Parquet pages are decoded straight from the page cache.
+
+    Raises:
+        botocore.exceptions.ClientError: If the S3 object cannot be found.
+        OSError: If the local file cannot be opened.
+    """
+    if bucket_name is None:
+        import pyarrow as pa
+
+        return pa.memory_map(object_key)
+    return S3File(bucket_name, object_key)
+
+
+def read_object(
+    bucket_name: Optional[str],
+    object_key: str,
+    part_size: int = DEFAULT_DOWNLOAD_PART_SIZE,
+    max_concurrency: int = DEFAULT_DOWNLOAD_CONCURRENCY,
+):
+    """Returns the whole contents of an S3 object or local file.
+
+    S3 objects are downloaded with :func:`~obfuscator.s3_file.download_object`.
+    Local files are memory-mapped instead of read, so parsers read them in
+    place without a copy.
+
+    Returns:
+        bytes | bytearray | mmap.mmap: The contents as a bytes-like object.
+
+    Raises:
+        botocore.exceptions.ClientError: If the S3 object cannot be fetched.
+        OSError: If the local file cannot be opened.
+    """
+    if bucket_name is None:
+        return _map_file(object_key)
+    return download_object(bucket_name, object_key, part_size, max_concurrency)
+
+
+class LocalFileWriter:
+    """Writes a local file as bytes are written, with the interface of
+    :class:`~obfuscator.s3_upload.S3MultipartWriter`.
+
+    Bytes go to a temporary file in the same directory, which replaces the
+    destination on a clean exit and is removed if an exception is raised,
+    so a failed job never leaves a partial output behind.
+
+    Args:
+        path (str): The path of the destination file.
+
+    Raises:
+        OSError: If the directory of the file cannot be written to.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        directory = os.path.dirname(os.path.abspath(path))
+        fd, self._temp_path = tempfile.mkstemp(
+            dir=directory, prefix=".", suffix=".part"
+        )
+        self._file = io.FileIO(fd, "wb")
+        self.bytes_written = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+    def write(self, data: bytes) -> int:
+        """Writes the next bytes of the file.
+
+        Returns:
+            int: The number of bytes written.
+        """
+        view = memoryview(data)
+        while view:
+            view = view[self._file.write(view) :]
+        self.bytes_written += len(data)
+        return len(data)
+
+    def close(self):
+        """Moves the written file into place."""
+        self._file.close()
+        os.replace(self._temp_path, self.path)
+
+    def abort(self):
+        """Removes the written file."""
+        self._file.close()
+        try:
+            os.remove(self._temp_path)
+        except OSError as e:
+            logger.warning(f"Could not remove {self._temp_path}: {e}")
+
+
+def open_writer(bucket_name: Optional[str], object_key: str):
+    """Opens a writer for an S3 object or local file.
+
+    Use as a context manager: the output is completed on a clean exit and
+    discarded if an exception is raised.
+
+    Args:
+        bucket_name (str, optional): The name of the S3 bucket, or None for
+            the local file at ``object_key``.
+        object_key (str): The key of the object, or the path of the file.
+
+    Returns:
+        S3MultipartWriter | LocalFileWriter: The writer.
+    """
+    if bucket_name is None:
+        return LocalFileWriter(object_key)
+    return S3MultipartWriter(bucket_name, object_key)
@@ -0,0 +1,324 @@
+from __future__ import annotations
+import re
+from abc import ABC, abstractmethod
+from typing import TYPE_CHECKING, Dict, Optional, Union
+from obfuscator.csv_rewriter import _quote, _unquote
+from obfuscator.tokenise import HmacTokeniser, resolve_hmac_key
+
+if TYPE_CHECKING:
+    import pandas as pd
+    import pyarrow as pa
+
+MASK_CHARACTER = "*"
+
+# Letters and digits; separators such as '-', ' ' and '@' are kept.
+_ALPHANUMERIC = re.compile(r"[^\W_]")
+_ARROW_ALPHANUMERIC = r"[\pL\pN]"
+_ASCII_ALPHANUMERICS = b"0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz"
+_ASCII_MASK = str.maketrans(dict.fromkeys(_ASCII_ALPHANUMERICS.decode(), "*"))
+
+
+def _mask_alphanumerics(text: str) -> str:
+    """Replace every letter and digit of one value with '*'."""
+    if text.isascii():
+        return text.translate(_ASCII_MASK)
+    return _ALPHANUMERIC.sub(MASK_CHARACTER, text)
+
+
+def _mask_ascii_alphanumerics(strings: pa.Array, keep_last: int) -> pa.Array:
+    """Mask the letters and digits of an ASCII string array in its data buffer.
+
+    Every character is one byte, so the mask is a NumPy lookup over the
+    bytes of all values at once, and the offsets and validity buffers are
+    reused. The last ``keep_last`` characters of values longer than that are
+    kept.
+    """
+    import numpy as np
+    import pyarrow as pa
+
+    validity, offsets_buffer, data = strings.buffers()
+    offsets = np.frombuffer(offsets_buffer, dtype=np.int32)[
+        strings.offset : strings.offset + len(strings) + 1
+    ]
+    if data is None or not len(strings):
+        return strings
+    start, end = int(offsets[0]), int(offsets[-1])
+    masked = np.frombuffer(data, dtype=np.uint8).copy()
+    region = masked[start:end]
+
+    alphanumeric = np.zeros(256, dtype=bool)
+    alphanumeric[np.frombuffer(_ASCII_ALPHANUMERICS, dtype=np.uint8)] = True
+    to_mask = alphanumeric[region]
+    if keep_last:
+        starts, ends = offsets[:-1] - start, offsets[1:] - start
+        kept_from = np.where(ends - starts > keep_last, ends - keep_last, ends)
+        # Unmask the tails one character position at a time
+        for position in range(keep_last):
+            kept = kept_from + position
+            kept = kept[kept < ends]
+            to_mask[kept] = False
+    region[to_mask] = ord(MASK_CHARACTER)
+
+    return pa.Array.from_buffers(
+        pa.string(),
+        len(strings),
+        [validity, offsets_buffer, pa.py_buffer(masked)],
+        strings.null_count,
+        strings.offset,
+    )
+
+
+class TextMask(ABC):
+    """Base class of format-preserving masks over the text of each value.
+
+    Subclasses implement :meth:`mask_arrow`, which masks a whole Arrow string
+    array with ``pyarrow.compute`` kernels, and :meth:`mask_text`, which masks
+    one value the same way for the raw CSV engine. Columns of other types are
+    cast to strings first, and missing values stay missing.
+    """
+
+    @abstractmethod
+    def mask_arrow(self, strings: pa.Array) -> pa.Array:
+        """Mask a string array; see the subclass for the format."""
+
+    @abstractmethod
+    def mask_text(self, text: str) -> str:
+        """Mask one value exactly as :meth:`mask_arrow` would."""
+
+    def obfuscate_arrow(
+        self, array: Union[pa.Array, pa.ChunkedArray]
+    ) -> Union[pa.Array, pa.ChunkedArray]:
+        """Mask an Arrow array.
+
+        Dictionary-encoded arrays have only their dictionary masked.
+
+        Args:
+            array (pa.Array | pa.ChunkedArray): The values to mask.
+
+        Returns:
+            pa.Array | pa.ChunkedArray: The masked values as strings.
+        """
+        import pyarrow as pa
+        import pyarrow.compute as pc
+
+        if isinstance(array, pa.ChunkedArray):
+            return pa.chunked_array(
+                [self.obfuscate_arrow(chunk) for chunk in array.chunks],
+                type=pa.string(),
+            )
+        if pa.types.is_dictionary(array.type):
+            dictionary = self.obfuscate_arrow(array.dictionary)
+            return pc.take(dictionary, array.indices)
+        if not pa.types.is_string(array.type):
+            array = pc.cast(array, pa.string())
+        return self.mask_arrow(array)
+
+    def obfuscate_series(self, series: pd.Series) -> pd.Series:
+        """Mask a pandas Series through Arrow's string kernels.
+
+        Args:
+            series (pd.Series): The values to mask.
+
+        Returns:
+            pd.Series: An object Series of masked values with the same index,
+            and None where ``series`` is missing.
+        """
+        import pandas as pd
+        import pyarrow as pa
+
+        try:
+            array = pa.Array.from_pandas(series)
+        except (pa.ArrowInvalid, pa.ArrowTypeError):
+            # Mixed or nested values, such as lists parsed from JSON
+            array = pa.Array.from_pandas(series.astype(str).where(series.notna()))
+        masked = self.obfuscate_arrow(array).to_numpy(zero_copy_only=False)
+        return pd.Series(masked, index=series.index, name=series.name)
+
+    def obfuscate_text(self, text: str) -> str:
+        """Mask the text of one value, such as a nested JSON value."""
+        return self.mask_text(text)
+
+    def obfuscate_field(self, field: bytes) -> bytes:
+        """Mask one raw CSV field, quoting the result if it needs it.
+
+        Args:
+            field (bytes): The field as it appears in the file.
+
+        Returns:
+            bytes: The masked field. Empty fields are left empty.
+        """
+        if not field:
+            return field
+        return _quote(self.mask_text(_unquote(field)))
+
+
+class KeepLast(TextMask):
+    """Masks every letter and digit except the last ``n`` characters.
+
+    Separators are kept, so ``0770-0900-1234`` becomes ``****-****-1234``.
+    Values of ``n`` characters or fewer are masked entirely, so short values
+    are never revealed.
+
+    Args:
+        n (int): The number of trailing characters to keep.
+
+    Raises:
+        ValueError: If ``n`` is not a non-negative integer.
+    """
+
+    def __init__(self, n: int = 4):
+        if not isinstance(n, int) or isinstance(n, bool) or n < 0:
+            raise ValueError("n must be a non-negative integer.")
+        self.n = n
+
+    def mask_arrow(self, strings: pa.Array) -> pa.Array:
+        import pyarrow.compute as pc
+
+        if pc.all(pc.string_is_ascii(strings)).as_py() is not False:
+            return _mask_ascii_alphanumerics(strings, self.n)
+        masked = pc.replace_substring_regex(
+            strings, _ARROW_ALPHANUMERIC, MASK_CHARACTER
+        )
+        if not self.n:
+            return masked
+        head = pc.replace_substring_regex(
+            pc.utf8_slice_codeunits(strings, 0, -self.n),
+            _ARROW_ALPHANUMERIC,
+            MASK_CHARACTER,
+        )
+        tail = pc.utf8_slice_codeunits(strings, -self.n)
+        kept = pc.binary_join_element_wise(head, tail, "")
+        return pc.if_else(pc.greater(pc.utf8_length(strings), self.n), kept, masked)
+
+    def mask_text(self, text: str) -> str:
+        if not self.n or len(text) <= self.n:
+            return _mask_alphanumerics(text)
+        return _mask_alphanumerics(text[: -self.n]) + text[-self.n :]
+
+
+class EmailDomain(TextMask):
+    """Replaces the local part of an email address, keeping its domain.
+
+    ``jane.doe@example.com`` becomes ``***@example.com``; values without an
+    ``@`` are replaced with ``***``.
+    """
+
+    masked_local_part = MASK_CHARACTER * 3
+
+    def mask_arrow(self, strings: pa.Array) -> pa.Array:
+        import pyarrow as pa
+        import pyarrow.compute as pc
+
+        domains = pc.replace_substring_regex(
+            strings, "(?s)^.*@", self.masked_local_part + "@"
+        )
+        return pc.if_else(
+            pc.match_substring(strings, "@"),
+            domains,
+            pa.scalar(self.masked_local_part, pa.string()),
+        )
+
+    def mask_text(self, text: str) -> str:
+        if "@" not in text:
+            return self.masked_local_part
+        return f"{self.masked_local_part}@{text.rsplit('@', 1)[1]}"
+
+
+class FixedWidth(TextMask):
+    """Replaces each value with a run of ``*`` characters.
+
+    By default the run is as long as the value, so column widths and length
+    constraints still hold; with ``width`` every value gets exactly ``width``
+    characters, which also hides its length.
+
+    Args:
+        width (int, optional): The number of characters of every value.
+
+    Raises:
+        ValueError: If ``width`` is not a positive integer.
+    """
+
+    def __init__(self, width: Optional[int] = None):
+        if width is not None and (
+            not isinstance(width, int) or isinstance(width, bool) or width <= 0
+        ):
+            raise ValueError("width must be a positive integer.")
+        self.width = width
+
+    def mask_arrow(self, strings: pa.Array) -> pa.Array:
+        import pyarrow as pa
+        import pyarrow.compute as pc
+
+        if self.width is None:
+            return pc.binary_repeat(MASK_CHARACTER, pc.utf8_length(strings))
+        return pc.if_else(
+            pc.is_valid(strings),
+            pa.scalar(MASK_CHARACTER * self.width, pa.string()),
+            pa.scalar(None, pa.string()),
+        )
+
+    def mask_text(self, text: str) -> str:
+        return MASK_CHARACTER * (len(text) if self.width is None else self.width)
+
+
+STRATEGIES: Dict[str, type] = {
+    "hmac": HmacTokeniser,
+    "keep_last": KeepLast,
+    "email_domain": EmailDomain,
+    "fixed_width": FixedWidth,
+}
+
+
+def register_strategy(name: str, strategy: type):
+    """Make a strategy available to the ``pii_fields`` input.
+
+    A strategy is a class whose instances have ``obfuscate_series``,
+    ``obfuscate_arrow``, ``obfuscate_field`` and ``obfuscate_text`` methods,
+    like :class:`TextMask` subclasses; its constructor receives the options
+    given for the field.
+
+    Args:
+        name (str): The name used in ``pii_fields``.
+        strategy (type): The strategy class.
+
+    Raises:
+        ValueError: If the name is ``"mask"``, which is built in.
+    """
+    if name == "mask":
+        raise ValueError("The mask strategy cannot be replaced.")
+    STRATEGIES[name] = strategy
+
+
+def build_strategy(field: str, spec, hmac_key: Optional[str] = None):
+    """Create the strategy of one field from its ``pii_fields`` entry.
+
+    Args:
+        field (str): The field name, for error messages.
+        spec (str | dict): A strategy name, or an object with a ``strategy``
+            name and that strategy's options, such as
+            ``{"strategy": "keep_last", "n": 4}``.
+        hmac_key (str, optional): The job's key for ``"hmac"`` strategies.
+
+    Returns:
+        The strategy, or None for ``"mask"``.
+
+    Raises:
+        ValueError: If the strategy is unsupported or its options are
+            invalid.
+    """
+    options = {}
+    if isinstance(spec, dict):
+        options = dict(spec)
+        spec = options.pop("strategy", None)
+    if spec == "mask":
+        if options:
+            raise ValueError(f"The mask strategy of {field} takes no options.")
+        return None
+    if spec not in STRATEGIES:
+        raise ValueError(f"Unsupported obfuscation strategy for {field}: {spec}")
+    if spec == "hmac":
+        options["key"] = resolve_hmac_key(options.get("key", hmac_key))
+    try:
+        return STRATEGIES[spec](**options)
+    except TypeError as e:
+        raise ValueError(f"Invalid options for the {spec} strategy of {field}: {e}")
@@ -0,0 +1,424 @@
+import logging
+from typing import Iterator, Optional
+from botocore.exceptions import ClientError
+from obfuscator.obfuscate_pii import (
+    obfuscate_pii,
+    obfuscate_pii_arrow,
+    insert_obfuscated_columns,
+    masked_fields,
+)
+from obfuscator.s3_client import get_s3_client
+from obfuscator.metrics import stage, metered, MeteredReader
+from obfuscator.s3_file import ChunkFile
+from obfuscator.storage import LocalFile, _file_error, open_arrow_file
+from obfuscator.compression import decompress_chunks
+from obfuscator.csv_rewriter import rewrite_csv
+from obfuscator.json_stream import iter_json_batches
+from obfuscator.json_rewriter import rewrite_json
+from obfuscator.write_file import FrameWriter, WriterOptions
+from obfuscator.formats import records_frame
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CHUNK_SIZE = 100_000  # rows per chunk
+RAW_READ_SIZE = 1024 * 1024  # bytes per read for byte-level parsers
+
+
+def _client_error(e: ClientError, bucket_name: str, object_key: str) -> RuntimeError:
+    """Log an S3 client error and return the RuntimeError to raise for it."""
+    if e.response["Error"]["Code"] in ("NoSuchKey", "404"):
+        logger.error(f"File not found: {bucket_name}/{object_key}")
+    else:
+        logger.error(f"S3 Client Error: {e}")
+    return RuntimeError(f"S3 Client Error: {e}")
+
+
+def _open_body(bucket_name: Optional[str], object_key: str):
+    """Opens the S3 object and returns its streaming body without reading it.
+
+    Args:
+        bucket_name (str, optional): The name of the S3 bucket, or None for
+            the local file at ``object_key``, which is memory-mapped.
+        object_key (str): The key of the object in the S3 bucket.
+
+    Returns:
+        botocore.response.StreamingBody | LocalFile: The unread body of the
+        object.
+
+    Raises:
+        RuntimeError: If there is an error fetching the object from S3.
+    """
+    if bucket_name is None:
+        try:
+            return LocalFile(object_key)
+        except OSError as e:
+            raise _file_error(e, object_key)
+
+    s3_client = get_s3_client()
+    try:
+        response = s3_client.get_object(Bucket=bucket_name, Key=object_key)
+        return response["Body"]
+    except ClientError as e:
+        raise _client_error(e, bucket_name, object_key)
+
+
+def _body_chunks(
+    body, read_size: int, compression: Optional[str] = None
+) -> Iterator[bytes]:
+    """Yield the decompressed bytes of a streaming body, metering each stage."""
+    chunks = metered(body.iter_chunks(read_size), "download", "bytes_in")
+    if compression:
+        chunks = metered(
+            decompress_chunks(chunks, compression), "decompress", "bytes_out"
+        )
+    return chunks
+
+
+def stream_object(
+    bucket_name: Optional[str], object_key: str, read_size: int = RAW_READ_SIZE
+) -> Iterator[bytes]:
+    """Streams an S3 object unchanged, without decompressing it.
+
+    Args:
+        bucket_name (str, optional): The name of the S3 bucket, or None for
+            the local file at ``object_key``.
+        object_key (str): The key of the object in the S3 bucket.
+        read_size (int): The number of bytes to read from S3 at a time.
+
+    Yields:
+        bytes: Successive pieces of the object.
+
+    Raises:
+        RuntimeError: If there is an error reading the object from S3.
+    """
+    body = _open_body(bucket_name, object_key)
+    try:
+        yield from _body_chunks(body, read_size)
+    except Exception as e:
+        logger.error(f"Error streaming file from S3: {e}")
+        raise RuntimeError(f"Error streaming file from S3: {e}")
+    finally:
+        body.close()
+
+
+def stream_csv(
+    bucket_name: Optional[str],
+    object_key: str,
+    pii_fields: list,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    compression: Optional[str] = None,
+    strategies: Optional[dict] = None,
+    output_format: str = "csv",
+    writer_options: Optional[WriterOptions] = None,
+) -> Iterator[bytes]:
+    """Streams a CSV file from S3, obfuscating it one chunk of rows at a time.
+
+    The S3 body is parsed incrementally, so only ``chunk_size`` rows are held
+    in memory at once regardless of the size of the object. Every field is
+    read as text, so values are written as they appear in the file whichever
+    chunk they fall in, and JSON and Parquet outputs hold strings.
+
+    Args:
+        bucket_name (str, optional): The name of the S3 bucket, or None for
+            the local file at ``object_key``.
+        object_key (str): The key of the object in the S3 bucket.
+        pii_fields (list): List of fields to obfuscate.
+        chunk_size (int): The number of rows to parse per chunk.
+        compression (str, optional): The compression of the object, which is
+            decompressed as it streams in.
+        strategies (dict, optional): A strategy per field that is obfuscated
+            another way than '***'.
+        output_format (str): The format to write (csv, json, parquet).
+        writer_options (WriterOptions, optional): Tuning of the writer.
+
+    Yields:
+        bytes: Successive pieces of the obfuscated file.
+
+    Raises:
+        RuntimeError: If there is an error reading the file from S3.
+    """
+    import pandas as pd
+
+    body = _open_body(bucket_name, object_key)
+    try:
+        writer = FrameWriter(output_format, writer_options)
+        try:
+            with stage("parse"):
+                if compression:
+                    source = ChunkFile(_body_chunks(body, RAW_READ_SIZE, compression))
+                else:
+                    source = MeteredReader(body)
+                # Fields are read as text, or each chunk would infer its own
+                # types and a column could change format between chunks
+                reader = pd.read_csv(source, chunksize=chunk_size, dtype=str)
+        except pd.errors.EmptyDataError:
+            logger.warning(f"Empty csv file: {bucket_name}/{object_key}")
+            yield writer.write(pd.DataFrame()) + writer.close()
+            return
+
+        with reader:
+            for chunk in metered(reader, "parse", "rows"):
+                with stage("obfuscate") as counts:
+                    obfuscated_chunk = obfuscate_pii(
+                        chunk, pii_fields, copy=False, strategies=strategies
+                    )
+                    counts.rows += len(chunk)
+                with stage("serialise") as counts:
+                    data = writer.write(obfuscated_chunk)
+                    counts.bytes_out += len(data)
+                if data:
+                    yield data
+        with stage("serialise") as counts:
+            data = writer.close()
+            counts.bytes_out += len(data)
+        if data:
+            yield data
+    except Exception as e:
+        logger.error(f"Error streaming csv file from S3: {e}")
+        raise RuntimeError(f"Error streaming csv file from S3: {e}")
+    finally:
+        body.close()
+
+
+def stream_csv_raw(
+    bucket_name: Optional[str],
+    object_key: str,
+    pii_fields: list,
+    read_size: int = RAW_READ_SIZE,
+    compression: Optional[str] = None,
+    strategies: Optional[dict] = None,
+) -> Iterator[bytes]:
+    """Streams a CSV file from S3, rewriting only the bytes of PII fields.
+
+    No values are parsed or re-formatted, so every non-PII byte of the file
+    (leading zeros, float precision, quoting, line endings) is preserved.
+
+    Args:
+        bucket_name (str, optional): The name of the S3 bucket, or None for
+            the local file at ``object_key``.
+        object_key (str): The key of the object in the S3 bucket.
+        pii_fields (list): List of fields to obfuscate.
+        read_size (int): The number of bytes to read from S3 at a time.
+        compression (str, optional): The compression of the object, which is
+            decompressed as it streams in.
+        strategies (dict, optional): A strategy per field that is obfuscated
+            another way than '***'.
+
+    Yields:
+        bytes: Successive pieces of the obfuscated CSV.
+
+    Raises:
+        RuntimeError: If there is an error reading the file from S3.
+    """
+    body = _open_body(bucket_name, object_key)
+    try:
+        chunks = _body_chunks(body, read_size, compression)
+        rewritten = rewrite_csv(chunks, pii_fields, strategies)
+        yield from metered(rewritten, "obfuscate", "bytes_out")
+    except Exception as e:
+        logger.error(f"Error streaming csv file from S3: {e}")
+        raise RuntimeError(f"Error streaming csv file from S3: {e}")
+    finally:
+        body.close()
+
+
+def stream_json_raw(
+    bucket_name: Optional[str],
+    object_key: str,
+    pii_fields: list,
+    read_size: int = RAW_READ_SIZE,
+    compression: Optional[str] = None,
+    strategies: Optional[dict] = None,
+) -> Iterator[bytes]:
+    """Streams a JSON file from S3, rewriting only the values at PII paths.
+
+    ``pii_fields`` may be nested field paths such as ``customer.email`` or
+    ``orders[].card``. Records are not flattened or re-serialised: the
+    document keeps its layout (array or JSON Lines), and every byte outside
+    the PII values is preserved.
+
+    Args:
+        bucket_name (str, optional): The name of the S3 bucket, or None for
+            the local file at ``object_key``.
+        object_key (str): The key of the object in the S3 bucket.
+        pii_fields (list): List of field paths to obfuscate.
+        read_size (int): The number of bytes to read from S3 at a time.
+        compression (str, optional): The compression of the object, which is
+            decompressed as it streams in.
+        strategies (dict, optional): A strategy per field path that is
+            obfuscated another way than '***'.
+
+    Yields:
+        bytes: Successive pieces of the obfuscated JSON.
+
+    Raises:
+        RuntimeError: If there is an error reading the file from S3.
+    """
+    body = _open_body(bucket_name, object_key)
+    try:
+        chunks = _body_chunks(body, read_size, compression)
+        rewritten = rewrite_json(chunks, pii_fields, strategies)
+        yield from metered(rewritten, "obfuscate", "bytes_out")
+    except Exception as e:
+        logger.error(f"Error streaming json file from S3: {e}")
+        raise RuntimeError(f"Error streaming json file from S3: {e}")
+    finally:
+        body.close()
+
+
+def stream_json(
+    bucket_name: Optional[str],
+    object_key: str,
+    pii_fields: list,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    read_size: int = RAW_READ_SIZE,
+    compression: Optional[str] = None,
+    strategies: Optional[dict] = None,
+    output_format: str = "json",
+    writer_options: Optional[WriterOptions] = None,
+) -> Iterator[bytes]:
+    """Streams a JSON or JSON Lines file from S3, obfuscating it in batches.
+
+    Records are parsed incrementally as the body arrives, so only one batch
+    of ``chunk_size`` records is held in memory at once. JSON output is JSON
+    Lines, as in the in-memory path.
+
+    Args:
+        bucket_name (str, optional): The name of the S3 bucket, or None for
+            the local file at ``object_key``.
+        object_key (str): The key of the object in the S3 bucket.
+        pii_fields (list): List of fields to obfuscate.
+        chunk_size (int): The maximum number of records per batch.
+        read_size (int): The number of bytes to read from S3 at a time.
+        compression (str, optional): The compression of the object, which is
+            decompressed as it streams in.
+        strategies (dict, optional): A strategy per field that is obfuscated
+            another way than '***'.
+        output_format (str): The format to write (csv, json, parquet).
+        writer_options (WriterOptions, optional): Tuning of the writer.
+
+    Yields:
+        bytes: Successive pieces of the obfuscated file.
+
+    Raises:
+        RuntimeError: If there is an error reading the file from S3.
+    """
+    import pandas as pd
+
+    body = _open_body(bucket_name, object_key)
+    try:
+        writer = FrameWriter(output_format, writer_options)
+        empty = True
+        chunks = _body_chunks(body, read_size, compression)
+        batches = iter_json_batches(chunks, chunk_size)
+        for records in metered(batches, "parse", "rows"):
+            empty = False
+            with stage("parse"):
+                batch = records_frame(records, list(strategies or ()))
+            with stage("obfuscate") as counts:
+                obfuscated_batch = obfuscate_pii(
+                    batch, pii_fields, copy=False, strategies=strategies
+                )
+                counts.rows += len(batch)
+            with stage("serialise") as counts:
+                data = writer.write(obfuscated_batch)
+                counts.bytes_out += len(data)
+            if data:
+                yield data
+        if empty:
+            logger.warning(f"Empty json file: {bucket_name}/{object_key}")
+            yield writer.write(pd.DataFrame()) + writer.close()
+            return
+        with stage("serialise") as counts:
+            data = writer.close()
+            counts.bytes_out += len(data)
+        if data:
+            yield data
+    except Exception as e:
+        logger.error(f"Error streaming json file from S3: {e}")
+        raise RuntimeError(f"Error streaming json file from S3: {e}")
+    finally:
+        body.close()
+
+
+def stream_parquet(
+    bucket_name: Optional[str],
+    object_key: str,
+    pii_fields: list,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    strategies: Optional[dict] = None,
+    output_format: str = "parquet",
+    writer_options: Optional[WriterOptions] = None,
+) -> Iterator[bytes]:
+    """Streams a Parquet file from S3, obfuscating it one record batch at a time.
+
+    Row groups are fetched with ranged reads and rewritten through a
+    ``ParquetWriter`` without ever being converted to pandas, so only one
+    row group is held in memory at once. Masked PII columns are never
+    fetched. Other output formats convert one record batch at a time.
+
+    Args:
+        bucket_name (str, optional): The name of the S3 bucket, or None for
+            the local file at ``object_key``.
+        object_key (str): The key of the object in the S3 bucket.
+        pii_fields (list): List of fields to obfuscate.
+        chunk_size (int): The maximum number of rows per record batch.
+        strategies (dict, optional): A strategy per field that is obfuscated
+            another way than '***'.
+        output_format (str): The format to write (csv, json, parquet).
+        writer_options (WriterOptions, optional): Tuning of the writer.
+
+    Yields:
+        bytes: Successive pieces of the obfuscated file.
+
+    Raises:
+        RuntimeError: If there is an error reading the file from S3.
+    """
+    import pandas as pd
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    try:
+        source = open_arrow_file(bucket_name, object_key)
+    except ClientError as e:
+        raise _client_error(e, bucket_name, object_key)
+    except OSError as e:
+        raise _file_error(e, object_key)
+
+    try:
+        try:
+            parquet_file = pq.ParquetFile(source)
+        except pa.lib.ArrowInvalid:
+            logger.warning(f"Empty parquet file: {bucket_name}/{object_key}")
+            writer = FrameWriter(output_format, writer_options)
+            yield writer.write(pd.DataFrame()) + writer.close()
+            return
+
+        input_schema = parquet_file.schema_arrow
+        masked = masked_fields(pii_fields, strategies)
+        columns = [name for name in input_schema.names if name not in masked]
+        schema = obfuscate_pii_arrow(
+            input_schema.empty_table(), pii_fields, strategies
+        ).schema
+        writer = FrameWriter(output_format, writer_options, schema=schema)
+        batches = parquet_file.iter_batches(batch_size=chunk_size, columns=columns)
+        for batch in metered(batches, "parse", "rows"):
+            with stage("obfuscate") as counts:
+                batch = insert_obfuscated_columns(batch, input_schema, masked)
+                if strategies:
+                    batch = obfuscate_pii_arrow(batch, list(strategies), strategies)
+                counts.rows += batch.num_rows
+            with stage("serialise") as counts:
+                data = writer.write_arrow(batch)
+                counts.bytes_out += len(data)
+            if data:
+                yield data
+        with stage("serialise") as counts:
+            data = writer.close()
+            counts.bytes_out += len(data)
+        yield data
+    except Exception as e:
+        logger.error(f"Error streaming parquet file from S3: {e}")
+        raise RuntimeError(f"Error streaming parquet file from S3: {e}")
+    finally:
+        source.close()
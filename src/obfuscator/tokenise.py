@@ -0,0 +1,198 @@
+from __future__ import annotations
+import hashlib
+import hmac
+import os
+from collections import OrderedDict
+from typing import TYPE_CHECKING, Optional, Union
+from obfuscator.csv_rewriter import _unquote
+
+if TYPE_CHECKING:
+    import pandas as pd
+    import pyarrow as pa
+
+TOKEN_LENGTH = 32  # hex characters (128 bits) of each HMAC-SHA256 token
+DEFAULT_CACHE_SIZE = 65_536  # values remembered per tokeniser
+HMAC_KEY_ENV = "OBFUSCATOR_HMAC_KEY"
+
+
+class HmacTokeniser:
+    """Replaces values with keyed, deterministic HMAC-SHA256 tokens.
+
+    The same value always gets the same token under the same key, so
+    tokenised columns can still be joined across datasets, but the value
+    cannot be recovered or guessed without the key. Values are hashed as
+    their text, and missing values stay missing.
+
+    Columns are tokenised a batch at a time: each distinct value in the batch
+    is hashed once and the tokens are gathered by index, instead of hashing
+    row by row. Tokens of recently seen values are kept in a bounded LRU
+    memo, so low-cardinality columns (such as country or employer) are
+    hashed only the first time a value appears in the job. Batches with more
+    distinct values than the memo holds bypass it, since they would only
+    evict each other.
+
+    Args:
+        key (bytes | str): The secret HMAC key. Strings are UTF-8 encoded.
+        cache_size (int): The maximum number of values to remember.
+
+    Raises:
+        ValueError: If the key is empty or the cache size is negative.
+    """
+
+    def __init__(self, key: Union[bytes, str], cache_size: int = DEFAULT_CACHE_SIZE):
+        if isinstance(key, str):
+            key = key.encode("utf-8")
+        if not key:
+            raise ValueError("The HMAC key must not be empty.")
+        if cache_size < 0:
+            raise ValueError("cache_size must not be negative.")
+        self._key = key
+        self.cache_size = cache_size
+        self._hmac = hmac.new(key, digestmod=hashlib.sha256)
+        self._cache = OrderedDict()
+
+    def __getstate__(self) -> dict:
+        # HMAC objects cannot be pickled, and worker processes start with an
+        # empty memo rather than a copy of the parent's.
+        return {"key": self._key, "cache_size": self.cache_size}
+
+    def __setstate__(self, state: dict):
+        self.__init__(state["key"], state["cache_size"])
+
+    def token(self, value: str) -> str:
+        """Return the token of one value.
+
+        Args:
+            value (str): The text of the value.
+
+        Returns:
+            str: The first :data:`TOKEN_LENGTH` hex characters of the
+            HMAC-SHA256 of the value.
+        """
+        return self._tokens([value])[0]
+
+    def _tokens(self, values: list) -> list:
+        """Return the tokens of distinct values, None for missing ones."""
+        new_hmac = self._hmac.copy
+        if len(values) > self.cache_size:
+            tokens = []
+            for value in values:
+                if value is None:
+                    tokens.append(None)
+                    continue
+                digest = new_hmac()
+                digest.update(str(value).encode("utf-8"))
+                tokens.append(digest.hexdigest()[:TOKEN_LENGTH])
+            return tokens
+
+        cache = self._cache
+        tokens = []
+        for value in values:
+            if value is None:
+                tokens.append(None)
+                continue
+            value = str(value)
+            token = cache.get(value)
+            if token is None:
+                digest = new_hmac()
+                digest.update(value.encode("utf-8"))
+                token = cache[value] = digest.hexdigest()[:TOKEN_LENGTH]
+            else:
+                cache.move_to_end(value)
+            tokens.append(token)
+        while len(cache) > self.cache_size:
+            cache.popitem(last=False)
+        return tokens
+
+    def obfuscate_series(self, series: pd.Series) -> pd.Series:
+        """Tokenise a pandas Series, hashing each distinct value once.
+
+        Args:
+            series (pd.Series): The values to tokenise.
+
+        Returns:
+            pd.Series: An object Series of tokens with the same index, and
+            None where ``series`` is missing.
+        """
+        import numpy as np
+        import pandas as pd
+
+        try:
+            codes, uniques = pd.factorize(series)
+        except TypeError:
+            # Unhashable values, such as lists parsed from JSON
+            codes, uniques = pd.factorize(series.astype(str).where(series.notna()))
+        tokens = np.empty(len(uniques) + 1, dtype=object)
+        tokens[:-1] = self._tokens(list(uniques))
+        # Code -1 (missing) picks the trailing None
+        return pd.Series(tokens.take(codes), index=series.index, name=series.name)
+
+    def obfuscate_arrow(
+        self, array: Union[pa.Array, pa.ChunkedArray]
+    ) -> Union[pa.DictionaryArray, pa.ChunkedArray]:
+        """Tokenise an Arrow array without converting it to Python row by row.
+
+        The array is dictionary encoded, only the dictionary is hashed, and
+        the result reuses the encoded indices.
+
+        Args:
+            array (pa.Array | pa.ChunkedArray): The values to tokenise.
+
+        Returns:
+            pa.DictionaryArray | pa.ChunkedArray: Tokens as a
+            ``dictionary<int32, string>`` array, with nulls where ``array``
+            has nulls.
+        """
+        import pyarrow as pa
+        import pyarrow.compute as pc
+
+        if isinstance(array, pa.ChunkedArray):
+            return pa.chunked_array(
+                [self.obfuscate_arrow(chunk) for chunk in array.chunks],
+                type=pa.dictionary(pa.int32(), pa.string()),
+            )
+        if not pa.types.is_dictionary(array.type):
+            array = pc.dictionary_encode(array)
+        tokens = pa.array(self._tokens(array.dictionary.to_pylist()), pa.string())
+        return pa.DictionaryArray.from_arrays(array.indices.cast(pa.int32()), tokens)
+
+    def obfuscate_text(self, text: str) -> str:
+        """Tokenise the text of one value, such as a nested JSON value."""
+        return self.token(text)
+
+    def obfuscate_field(self, field: bytes) -> bytes:
+        """Tokenise one raw CSV field, which may be quoted.
+
+        Empty fields are missing values and are left empty.
+
+        Args:
+            field (bytes): The field as it appears in the file.
+
+        Returns:
+            bytes: The token of the field's text.
+        """
+        if not field:
+            return field
+        return self.token(_unquote(field)).encode("ascii")
+
+
+def resolve_hmac_key(key: Optional[str] = None) -> str:
+    """Return the HMAC key of a job, falling back to the environment.
+
+    Args:
+        key (str, optional): The key given in the job input.
+
+    Returns:
+        str: The key, or the value of the ``OBFUSCATOR_HMAC_KEY``
+        environment variable.
+
+    Raises:
+        ValueError: If no key is given or set.
+    """
+    key = key or os.environ.get(HMAC_KEY_ENV)
+    if not key:
+        raise ValueError(
+            f"HMAC tokenisation requires a key: set hmac_key in the input or "
+            f"the {HMAC_KEY_ENV} environment variable."
+        )
+    return key
@@ -1,34 +1,136 @@
+from __future__ import annotations
 import io
-import pandas as pd
+from typing import TYPE_CHECKING, BinaryIO, Optional
+from obfuscator.formats import WriterOptions, get_format
 
+if TYPE_CHECKING:
+    import pandas as pd
+    import pyarrow as pa
 
-def write_file(dataframe: pd.DataFrame, file_format: str) -> io.BytesIO:
+
+class _ChunkSink(io.RawIOBase):
+    """A write-only sink that hands written bytes back to the caller.
+
+    ``tell`` keeps counting across drains, so writers that record offsets
+    (such as the Parquet footer) still see a continuous file.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self._chunks = []
+        self._position = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        data = bytes(data)
+        self._chunks.append(data)
+        self._position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._position
+
+    def drain(self) -> bytes:
+        """Return and forget everything written since the last drain."""
+        data = b"".join(self._chunks)
+        self._chunks = []
+        return data
+
+
+def write_file(
+    dataframe: pd.DataFrame,
+    file_format: str,
+    buffer: Optional[BinaryIO] = None,
+    options: Optional[WriterOptions] = None,
+    engine: str = "pandas",
+) -> BinaryIO:
     """Convert a DataFrame to a byte stream in the specified format.
 
     Args:
         dataframe (pd.DataFrame): The DataFrame to convert.
-        file_format (str): The format to convert to (csv, json, parquet).
+        file_format (str): The format to convert to (csv, json, parquet, or
+            any format registered with
+            :func:`~obfuscator.formats.register_format`).
+        buffer (BinaryIO, optional): An empty, seekable binary file to write
+            to, such as a :class:`~obfuscator.output_buffer.SpooledBuffer`.
+            Defaults to a new ``io.BytesIO``.
+        options (WriterOptions, optional): Tuning of the writer.
+        engine (str): The engine whose writer is used.
 
     Returns:
-        io.BytesIO: The byte stream of the converted DataFrame.
+        io.BytesIO | BinaryIO: The byte stream of the converted DataFrame,
+        positioned at its start.
 
     Raises:
-        ValueError: If the output format is unsupported.
-        RuntimeError: If there is an error writing to bytes.
+        RuntimeError: If the output format is unsupported or there is an
+            error writing to bytes.
     """
-    buffer = io.BytesIO()
+    if buffer is None:
+        buffer = io.BytesIO()
 
     try:
-        if file_format == "csv":
-            dataframe.to_csv(buffer, index=False)
-        elif file_format == "json":
-            dataframe.to_json(buffer, orient="records", lines=True)
-        elif file_format == "parquet":
-            dataframe.to_parquet(buffer, index=False)
-        else:
-            raise ValueError(f"Unsupported output format: {file_format}")
-
+        get_format(file_format, engine)(options).write(dataframe, buffer)
         buffer.seek(0)
         return buffer
     except Exception as e:
         raise RuntimeError(f"Error writing {file_format} to bytes: {e}")
+
+
+class FrameWriter:
+    """Writes successive chunks of rows as a single file, chunk by chunk.
+
+    CSV output has one header, JSON output is JSON Lines, and Parquet output
+    is written through one ``ParquetWriter``, so the pieces returned for
+    each chunk join up to one valid file; see
+    :class:`~obfuscator.formats.FileFormat`.
+
+    Args:
+        file_format (str): The format to write (csv, json, parquet).
+        options (WriterOptions, optional): Tuning of the writer.
+        schema (pyarrow.Schema, optional): The schema of a Parquet file.
+            Defaults to the schema of the first chunk.
+        engine (str): The engine whose writer is used.
+
+    Raises:
+        ValueError: If the output format is unsupported.
+    """
+
+    def __init__(
+        self,
+        file_format: str,
+        options: Optional[WriterOptions] = None,
+        schema: Optional[pa.Schema] = None,
+        engine: str = "pandas",
+    ):
+        self.file_format = file_format
+        self._format = get_format(file_format, engine)(options, schema)
+        self._sink = _ChunkSink()
+
+    def write(self, dataframe: pd.DataFrame) -> bytes:
+        """Write a DataFrame.
+
+        Returns:
+            bytes: The output completed by this chunk, which may be empty.
+        """
+        self._format.write_chunk(dataframe, self._sink)
+        return self._sink.drain()
+
+    def write_arrow(self, data) -> bytes:
+        """Write a ``pyarrow`` table or record batch.
+
+        Returns:
+            bytes: The output completed by this chunk, which may be empty.
+        """
+        self._format.write_arrow_chunk(data, self._sink)
+        return self._sink.drain()
+
+    def close(self) -> bytes:
+        """Finish the file.
+
+        Returns:
+            bytes: The rest of the output, such as the Parquet footer.
+        """
+        self._format.finish(self._sink)
+        return self._sink.drain()
@@ -0,0 +1,10 @@
+import pytest
+from obfuscator.s3_client import reset_s3_client
+
+
+@pytest.fixture(autouse=True)
+def fresh_s3_client():
+    """Fixture to stop the shared S3 client leaking between tests."""
+    reset_s3_client()
+    yield
+    reset_s3_client()
@@ -0,0 +1,242 @@
+import pytest
+import asyncio
+import json
+import threading
+import boto3
+from moto import mock_aws
+from obfuscator import async_process
+from obfuscator.async_process import AsyncObfuscator, process_s3_file_async
+
+
+@pytest.fixture(scope="function")
+def mock_s3_bucket():
+    """Fixture to create a mock S3 bucket holding a few files."""
+    with mock_aws():
+        s3 = boto3.client("s3", region_name="eu-west-2")
+        bucket_name = "mock-bucket"
+        s3.create_bucket(
+            Bucket=bucket_name,
+            CreateBucketConfiguration={"LocationConstraint": "eu-west-2"},
+        )
+        for i in range(50):
+            s3.put_object(
+                Bucket=bucket_name,
+                Key=f"daily/file{i}.csv",
+                Body=f"id,name\n{i},Person {i}\n",
+            )
+        yield s3, bucket_name
+
+
+def _input(bucket_name: str, key: str, **options) -> str:
+    return json.dumps(
+        {
+            "file_to_obfuscate": f"s3://{bucket_name}/{key}",
+            "pii_fields": ["name"],
+            **options,
+        }
+    )
+
+
+def test_process_s3_files_concurrently(mock_s3_bucket):
+    """Test that many files are obfuscated concurrently, in input order."""
+    _, bucket_name = mock_s3_bucket
+    inputs = [_input(bucket_name, f"daily/file{i}.csv") for i in range(50)]
+
+    async def run():
+        async with AsyncObfuscator(max_concurrency=16, cpu_workers=2) as obfuscator:
+            return await obfuscator.process_s3_files(inputs)
+
+    results = asyncio.run(run())
+
+    assert [r.getvalue() for r in results] == [
+        f"id,name\n{i},***\n".encode() for i in range(50)
+    ]
+
+
+@pytest.mark.parametrize(
+    "options",
+    [{}, {"mode": "stream"}, {"engine": "raw"}, {"mode": "auto", "memory_budget": 1}],
+)
+def test_process_s3_file_output_location(mock_s3_bucket, options):
+    """Test that outputs are uploaded to the output location in each mode."""
+    s3, bucket_name = mock_s3_bucket
+    output_location = f"s3://{bucket_name}/masked/file3.csv"
+    json_input = _input(
+        bucket_name, "daily/file3.csv", output_location=output_location, **options
+    )
+
+    async def run():
+        async with AsyncObfuscator() as obfuscator:
+            return await obfuscator.process_s3_file_with_metrics(json_input)
+
+    output, report = asyncio.run(run())
+
+    body = s3.get_object(Bucket=bucket_name, Key="masked/file3.csv")["Body"].read()
+    assert output == output_location
+    assert body == b"id,name\n3,***\n"
+    assert report.bytes_out == len(body)
+    assert report.bytes_in == len(b"id,name\n3,Person 3\n")
+    assert "upload" in report.stages
+
+
+def test_process_s3_file_records_stages_of_every_thread(mock_s3_bucket):
+    """Test that the stages run on pool threads are recorded per job."""
+    _, bucket_name = mock_s3_bucket
+    reports = []
+
+    async def run():
+        async with AsyncObfuscator() as obfuscator:
+            await obfuscator.process_s3_files(
+                [_input(bucket_name, f"daily/file{i}.csv") for i in range(4)],
+                metrics_hook=reports.append,
+            )
+
+    asyncio.run(run())
+
+    assert len(reports) == 4
+    for report in reports:
+        assert set(report.stages) == {
+            "probe",
+            "download",
+            "parse",
+            "obfuscate",
+            "serialise",
+        }
+        assert report.rows == 1
+        assert report.succeeded
+
+
+def test_process_s3_file_passes_files_without_pii_through(mock_s3_bucket):
+    """Test that files without PII fields are returned unchanged."""
+    _, bucket_name = mock_s3_bucket
+    json_input = json.dumps(
+        {
+            "file_to_obfuscate": f"s3://{bucket_name}/daily/file1.csv",
+            "pii_fields": ["email"],
+        }
+    )
+
+    output = asyncio.run(process_s3_file_async(json_input))
+
+    assert output.getvalue() == b"id,name\n1,Person 1\n"
+
+
+def test_process_s3_files_errors(mock_s3_bucket):
+    """Test that failed files raise like the blocking API without stopping others."""
+    _, bucket_name = mock_s3_bucket
+    reports = []
+    inputs = [
+        _input(bucket_name, "daily/missing.csv"),
+        "not json",
+        _input(bucket_name, "daily/file0.csv"),
+    ]
+
+    async def run():
+        async with AsyncObfuscator() as obfuscator:
+            return await obfuscator.process_s3_files(inputs, reports.append)
+
+    missing, invalid, result = asyncio.run(run())
+
+    assert isinstance(missing, RuntimeError)
+    assert "S3 Client Error" in str(missing)
+    assert isinstance(invalid, ValueError)
+    assert result.getvalue() == b"id,name\n0,***\n"
+    assert sorted(report.succeeded for report in reports) == [False, True]
+
+
+def test_max_concurrency_bounds_jobs_in_flight(mock_s3_bucket, monkeypatch):
+    """Test that no more than max_concurrency jobs run at once."""
+    _, bucket_name = mock_s3_bucket
+    lock = threading.Lock()
+    running = []
+    peak = []
+    download_job = async_process._download_job
+
+    def counting_download(job):
+        with lock:
+            running.append(job)
+            peak.append(len(running))
+        try:
+            return download_job(job)
+        finally:
+            with lock:
+                running.remove(job)
+
+    monkeypatch.setattr(async_process, "_download_job", counting_download)
+
+    async def run():
+        async with AsyncObfuscator(max_concurrency=3) as obfuscator:
+            return await obfuscator.process_s3_files(
+                [_input(bucket_name, f"daily/file{i}.csv") for i in range(20)]
+            )
+
+    results = asyncio.run(run())
+
+    assert all(not isinstance(result, Exception) for result in results)
+    assert max(peak) <= 3
+
+
+def test_event_loop_is_not_blocked(mock_s3_bucket, monkeypatch):
+    """Test that the event loop keeps running while jobs block on I/O."""
+    _, bucket_name = mock_s3_bucket
+    release = threading.Event()
+    download_job = async_process._download_job
+
+    def slow_download(job):
+        release.wait(5)
+        return download_job(job)
+
+    monkeypatch.setattr(async_process, "_download_job", slow_download)
+
+    async def run():
+        async with AsyncObfuscator() as obfuscator:
+            job = asyncio.ensure_future(
+                obfuscator.process_s3_file(_input(bucket_name, "daily/file0.csv"))
+            )
+            ticks = 0
+            while ticks < 10:
+                await asyncio.sleep(0.001)
+                ticks += 1
+            assert not job.done()
+            release.set()
+            return await job
+
+    assert asyncio.run(run()).getvalue() == b"id,name\n0,***\n"
+
+
+def test_async_obfuscator_exit_does_not_block_event_loop():
+    """Test that leaving the context waits for running steps without
+    blocking the event loop."""
+    release = threading.Event()
+
+    async def run():
+        ticks = 0
+
+        async def tick():
+            nonlocal ticks
+            while not release.is_set():
+                await asyncio.sleep(0.001)
+                ticks += 1
+                if ticks == 10:
+                    release.set()
+
+        async with AsyncObfuscator(cpu_workers=1) as obfuscator:
+            step = obfuscator._cpu_executor.submit(release.wait, 5)
+            ticker = asyncio.ensure_future(tick())
+        # A blocked loop would only get here once the step timed out.
+        return step.done(), step.result(), ticks, ticker.done()
+
+    assert asyncio.run(run()) == (True, True, 10, True)
+
+
+@pytest.mark.parametrize(
+    "options, message",
+    [
+        ({"max_concurrency": 0}, "max_concurrency must be a positive integer"),
+        ({"cpu_workers": -1}, "cpu_workers must be a positive integer"),
+    ],
+)
+def test_async_obfuscator_invalid_options(options, message):
+    """Test validation of the concurrency bounds."""
+    with pytest.raises(ValueError, match=message):
+        AsyncObfuscator(**options)
@@ -0,0 +1,167 @@
+import pytest
+import json
+import boto3
+from moto import mock_aws
+from obfuscator.batch import process_s3_batch, list_s3_uris
+
+
+@pytest.fixture(scope="function")
+def mock_s3_bucket():
+    """Fixture to create a mock S3 bucket holding a few files."""
+    with mock_aws():
+        s3 = boto3.client("s3", region_name="eu-west-2")
+        bucket_name = "mock-bucket"
+        s3.create_bucket(
+            Bucket=bucket_name,
+            CreateBucketConfiguration={"LocationConstraint": "eu-west-2"},
+        )
+        for i in range(5):
+            s3.put_object(
+                Bucket=bucket_name,
+                Key=f"daily/file{i}.csv",
+                Body=f"id,name\n{i},Person {i}\n",
+            )
+        s3.put_object(Bucket=bucket_name, Key="daily/readme.txt", Body="notes")
+        s3.put_object(Bucket=bucket_name, Key="other/file.csv", Body="id\n1\n")
+        yield s3, bucket_name
+
+
+def test_list_s3_uris(mock_s3_bucket):
+    """Test that listing a prefix returns supported files only."""
+    _, bucket_name = mock_s3_bucket
+
+    uris = list_s3_uris(f"s3://{bucket_name}/daily/")
+
+    assert uris == [f"s3://{bucket_name}/daily/file{i}.csv" for i in range(5)]
+
+
+def test_list_s3_uris_includes_compressed_files(mock_s3_bucket):
+    """Test that compressed files of a supported format are listed."""
+    s3, bucket_name = mock_s3_bucket
+    s3.put_object(Bucket=bucket_name, Key="gz/file.csv.gz", Body=b"")
+    s3.put_object(Bucket=bucket_name, Key="gz/file.txt.gz", Body=b"")
+
+    uris = list_s3_uris(f"s3://{bucket_name}/gz/")
+
+    assert uris == [f"s3://{bucket_name}/gz/file.csv.gz"]
+
+
+def test_list_s3_uris_paginates(mock_s3_bucket):
+    """Test that listing follows continuation tokens past one page."""
+    s3, bucket_name = mock_s3_bucket
+    for i in range(1005):
+        s3.put_object(Bucket=bucket_name, Key=f"bulk/file{i:04}.csv", Body="id\n1\n")
+
+    uris = list_s3_uris(f"s3://{bucket_name}/bulk/")
+
+    assert len(uris) == 1005
+
+
+def test_process_s3_batch_prefix(mock_s3_bucket):
+    """Test obfuscating every file under a prefix."""
+    _, bucket_name = mock_s3_bucket
+    json_input = json.dumps(
+        {
+            "files_to_obfuscate": f"s3://{bucket_name}/daily/",
+            "pii_fields": ["name"],
+            "max_workers": 3,
+        }
+    )
+
+    results = process_s3_batch(json_input)
+
+    assert len(results) == 5
+    for i, result in enumerate(results):
+        assert result.succeeded
+        assert result.s3_uri == f"s3://{bucket_name}/daily/file{i}.csv"
+        assert result.output.getvalue() == f"id,name\n{i},***\n".encode()
+
+
+def test_process_s3_batch_failures_do_not_stop_batch(mock_s3_bucket):
+    """Test that one failing object is reported without stopping the rest."""
+    _, bucket_name = mock_s3_bucket
+    json_input = json.dumps(
+        {
+            "files_to_obfuscate": [
+                f"s3://{bucket_name}/daily/file0.csv",
+                f"s3://{bucket_name}/daily/missing.csv",
+                f"s3://{bucket_name}/daily/file1.csv",
+            ],
+            "pii_fields": ["name"],
+        }
+    )
+
+    results = process_s3_batch(json_input)
+
+    assert [result.succeeded for result in results] == [True, False, True]
+    assert isinstance(results[1].error, RuntimeError)
+    assert results[1].output is None
+
+
+def test_process_s3_batch_passes_job_options(mock_s3_bucket):
+    """Test that job options apply to every object in the batch."""
+    _, bucket_name = mock_s3_bucket
+    json_input = json.dumps(
+        {
+            "files_to_obfuscate": [f"s3://{bucket_name}/daily/file0.csv"],
+            "pii_fields": ["name"],
+            "engine": "raw",
+        }
+    )
+
+    results = process_s3_batch(json_input)
+
+    assert results[0].output.getvalue() == b"id,name\n0,***\n"
+
+
+def test_process_s3_batch_missing_files():
+    """Test handling of JSON input without files."""
+    with pytest.raises(ValueError, match="Missing required S3 file locations"):
+        process_s3_batch(json.dumps({"pii_fields": ["name"]}))
+
+
+def test_process_s3_batch_prefix_without_slash():
+    """Test that a single URI that is not a prefix is rejected."""
+    json_input = json.dumps({"files_to_obfuscate": "s3://bucket/file.csv"})
+    with pytest.raises(ValueError, match="must end with '/'"):
+        process_s3_batch(json_input)
+
+
+def test_process_s3_batch_output_prefix(mock_s3_bucket):
+    """Test that outputs are uploaded under the output prefix."""
+    s3, bucket_name = mock_s3_bucket
+    json_input = json.dumps(
+        {
+            "files_to_obfuscate": f"s3://{bucket_name}/daily/",
+            "pii_fields": ["name"],
+            "output_prefix": f"s3://{bucket_name}/masked/",
+        }
+    )
+
+    results = process_s3_batch(json_input)
+
+    assert results[0].output == f"s3://{bucket_name}/masked/daily/file0.csv"
+    body = s3.get_object(Bucket=bucket_name, Key="masked/daily/file0.csv")["Body"]
+    assert body.read() == b"id,name\n0,***\n"
+
+
+def test_process_s3_batch_metrics(mock_s3_bucket):
+    """Test that each result carries its metrics and the hook sees them all."""
+    _, bucket_name = mock_s3_bucket
+    reports = []
+    json_input = json.dumps(
+        {
+            "files_to_obfuscate": [
+                f"s3://{bucket_name}/daily/file0.csv",
+                f"s3://{bucket_name}/daily/missing.csv",
+            ],
+            "pii_fields": ["name"],
+        }
+    )
+
+    results = process_s3_batch(json_input, metrics_hook=reports.append)
+
+    assert results[0].metrics.rows == 1
+    assert results[0].metrics.s3_uri == f"s3://{bucket_name}/daily/file0.csv"
+    assert not results[1].metrics.succeeded
+    assert len(reports) == 2
@@ -0,0 +1,118 @@
+import pytest
+import bz2
+import gzip
+from obfuscator.compression import (
+    split_compression,
+    compress_chunks,
+    decompress_chunks,
+    decompress_bytes,
+)
+
+DATA = b"".join(b"%d,Name %d,user%d@example.com\n" % (i, i, i) for i in range(20000))
+
+
+def chunked(data: bytes, size: int):
+    return [data[i : i + size] for i in range(0, len(data), size)]
+
+
+@pytest.mark.parametrize(
+    "key, expected",
+    [
+        ("data.csv", ("csv", None)),
+        ("path/data.csv.gz", ("csv", "gzip")),
+        ("data.json.bz2", ("json", "bz2")),
+        ("data.csv.zst", ("csv", "zstd")),
+        ("data.gz", ("", "gzip")),
+    ],
+)
+def test_split_compression(key, expected):
+    """Test that the format is found behind a compression extension."""
+    assert split_compression(key) == expected
+
+
+@pytest.mark.parametrize(
+    "compression, compress",
+    [("gzip", gzip.compress), ("bz2", bz2.compress)],
+)
+@pytest.mark.parametrize("chunk_size", [1, 1000, 10_000_000])
+def test_decompress_chunks(compression, compress, chunk_size):
+    """Test that streams split anywhere are decompressed incrementally."""
+    compressed = compress(DATA)
+
+    output = b"".join(decompress_chunks(chunked(compressed, chunk_size), compression))
+
+    assert output == DATA
+
+
+@pytest.mark.parametrize(
+    "compression, compress",
+    [("gzip", gzip.compress), ("bz2", bz2.compress)],
+)
+def test_decompress_concatenated_members(compression, compress):
+    """Test that multi-member files decompress as one stream."""
+    compressed = compress(b"first\n") + compress(b"second\n")
+
+    assert decompress_bytes(compressed, compression) == b"first\nsecond\n"
+
+
+def test_decompress_truncated():
+    """Test that a stream cut off mid-member is an error."""
+    compressed = gzip.compress(DATA)
+
+    with pytest.raises(ValueError, match="Truncated gzip data"):
+        decompress_bytes(compressed[:-10], "gzip")
+
+
+def test_decompress_invalid():
+    """Test that corrupt data is an error."""
+    with pytest.raises(ValueError, match="Invalid gzip data"):
+        decompress_bytes(b"not gzip at all", "gzip")
+
+
+@pytest.mark.parametrize(
+    "compression, decompress",
+    [("gzip", gzip.decompress), ("bz2", bz2.decompress)],
+)
+@pytest.mark.parametrize("max_workers", [1, 3])
+def test_compress_chunks_in_blocks(compression, decompress, max_workers):
+    """Test that block-compressed output is readable by standard tools."""
+    chunks = list(
+        compress_chunks(
+            chunked(DATA, 777), compression, block_size=65536, max_workers=max_workers
+        )
+    )
+
+    assert len(chunks) == -(-len(DATA) // 65536)
+    assert decompress(b"".join(chunks)) == DATA
+
+
+def test_compress_empty_stream():
+    """Test that empty output is still a valid compressed file."""
+    output = b"".join(compress_chunks([], "gzip"))
+
+    assert gzip.decompress(output) == b""
+
+
+def test_compress_unsupported():
+    """Test that unknown codecs are rejected."""
+    with pytest.raises(ValueError, match="Unsupported compression: lz4"):
+        list(compress_chunks([b"x"], "lz4"))
+
+
+def test_zstd_round_trip():
+    """Test zstd compression when the optional zstandard package is present."""
+    pytest.importorskip("zstandard")
+
+    compressed = b"".join(compress_chunks(chunked(DATA, 4096), "zstd"))
+
+    assert decompress_bytes(compressed, "zstd") == DATA
+
+
+def test_zstd_without_zstandard(monkeypatch):
+    """Test the error raised when zstandard is not installed."""
+    import sys
+
+    monkeypatch.setitem(sys.modules, "zstandard", None)
+
+    with pytest.raises(RuntimeError, match="requires the zstandard package"):
+        list(compress_chunks([b"x"], "zstd"))
@@ -0,0 +1,120 @@
+import pytest
+import io
+import pandas as pd
+from obfuscator.csv_rewriter import rewrite_csv
+from obfuscator.tokenise import HmacTokeniser
+
+
+def _rewrite(content: bytes, pii_fields: list, chunk_size: int = 4) -> bytes:
+    """Rewrite CSV content fed in chunks of ``chunk_size`` bytes."""
+    chunks = [content[i : i + chunk_size] for i in range(0, len(content), chunk_size)]
+    return b"".join(rewrite_csv(chunks, pii_fields))
+
+
+def test_rewrite_csv_replaces_pii_fields():
+    """Test that only PII fields are replaced."""
+    content = b"id,name,email\n1,John Doe,john@example.com\n2,Jane,jane@example.com\n"
+
+    output = _rewrite(content, ["name", "email"])
+
+    assert output == b"id,name,email\n1,***,***\n2,***,***\n"
+
+
+@pytest.mark.parametrize("chunk_size", [1, 4, 1024])
+def test_rewrite_csv_bom_and_quoted_header(chunk_size):
+    """Test that a byte order mark does not hide a quoted first PII column."""
+    content = b'\xef\xbb\xbf"name","email",id\r\nBob,bob@example.com,1\r\n'
+
+    output = _rewrite(content, ["name", "email"], chunk_size)
+
+    assert output == b'\xef\xbb\xbf"name","email",id\r\n***,***,1\r\n'
+
+
+def test_rewrite_csv_preserves_non_pii_bytes():
+    """Test that non-PII values are passed through byte for byte."""
+    content = b"account,name,balance,joined\n00123,Alice,1.10000,2024-03-31\r\n"
+
+    output = _rewrite(content, ["name"])
+
+    assert output == b"account,name,balance,joined\n00123,***,1.10000,2024-03-31\r\n"
+
+
+@pytest.mark.parametrize("chunk_size", [1, 3, 7, 1024])
+def test_rewrite_csv_quoted_fields(chunk_size):
+    """Test quoted delimiters, escaped quotes and newlines inside quotes."""
+    content = (
+        b'id,"name",notes,email\n'
+        b'1,"Doe, John","said ""hi""\nthen left",john@example.com\n'
+        b'2,Jane,"a,b",jane@example.com\n'
+    )
+
+    output = _rewrite(content, ["name", "email"], chunk_size)
+
+    assert output == (
+        b'id,"name",notes,email\n'
+        b'1,***,"said ""hi""\nthen left",***\n'
+        b'2,***,"a,b",***\n'
+    )
+    df = pd.read_csv(io.BytesIO(output))
+    assert df.iloc[0]["notes"] == 'said "hi"\nthen left'
+
+
+def test_rewrite_csv_without_trailing_newline():
+    """Test that a final record without a newline is rewritten."""
+    output = _rewrite(b"id,name\n1,Alice", ["name"])
+
+    assert output == b"id,name\n1,***"
+
+
+def test_rewrite_csv_short_rows_and_blank_lines():
+    """Test rows missing PII fields and blank lines are left intact."""
+    content = b"\nid,name,email\n1\n\n2,Bob,bob@example.com\n"
+
+    output = _rewrite(content, ["email"])
+
+    assert output == b"\nid,name,email\n1\n\n2,Bob,***\n"
+
+
+def test_rewrite_csv_no_pii_fields():
+    """Test that a file without PII fields is unchanged."""
+    content = b"id,name\n1,Alice\n"
+
+    assert _rewrite(content, ["non_existent_column"]) == content
+
+
+def test_rewrite_csv_empty():
+    """Test rewriting an empty file."""
+    assert _rewrite(b"", ["name"]) == b""
+
+
+def test_rewrite_csv_short_rows_keep_earlier_pii_fields_obfuscated():
+    """Test that a short row still has the PII fields it does contain replaced."""
+    content = b"id,name,email\n1,Alice,alice@example.com\n2,Bob\n"
+
+    output = _rewrite(content, ["name", "email"], chunk_size=1024)
+
+    assert output == b"id,name,email\n1,***,***\n2,***\n"
+
+
+def test_rewrite_csv_with_strategies():
+    """Test that tokenised fields are replaced with the token of their text."""
+    tokeniser = HmacTokeniser("secret")
+    content = b'id,name,email\n1,"Doe, J",j@example.com\n2,,k@example.com\n'
+    chunks = [content[i : i + 4] for i in range(0, len(content), 4)]
+    strategies = {"name": tokeniser, "email": tokeniser}
+
+    output = b"".join(rewrite_csv(chunks, ["name", "email"], strategies))
+
+    name, j, k = map(tokeniser.token, ["Doe, J", "j@example.com", "k@example.com"])
+    assert output == f"id,name,email\n1,{name},{j}\n2,,{k}\n".encode()
+
+
+def test_rewrite_csv_plain_lines_with_strategies():
+    """Test the unquoted fast path with a tokenised field."""
+    tokeniser = HmacTokeniser("secret")
+    content = b"id,name,email\n1,Alice,a@example.com\n"
+
+    output = b"".join(rewrite_csv([content], ["name", "email"], {"email": tokeniser}))
+
+    token = tokeniser.token("a@example.com").encode()
+    assert output == b"id,name,email\n1,***," + token + b"\n"
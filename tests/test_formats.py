@@ -0,0 +1,197 @@
+import pytest
+import io
+import json
+import pandas as pd
+from obfuscator.formats import (
+    FORMATS,
+    ArrowCsvFormat,
+    ArrowJsonFormat,
+    CsvFormat,
+    FileFormat,
+    JsonFormat,
+    ParquetFormat,
+    get_format,
+    is_compressible,
+    register_format,
+)
+from obfuscator.process_file import process_s3_file
+
+CSV_BODY = b"id,name,joined,note\n1,Alice,2024-01-01,\n2,Bob,2024-02-01,vip\n"
+
+
+def test_get_format():
+    """Test that readers are looked up by format and engine."""
+    assert get_format("csv") is CsvFormat
+    assert get_format("csv", "pyarrow") is ArrowCsvFormat
+    assert get_format("json", "pyarrow") is ArrowJsonFormat
+    assert get_format("parquet", "pyarrow") is ParquetFormat
+    assert is_compressible("json")
+    assert not is_compressible("parquet")
+
+
+@pytest.mark.parametrize(
+    "name, engine, message",
+    [
+        ("xml", "pandas", "Unsupported file format: xml"),
+        ("csv", "polars", "The polars engine does not support csv files"),
+    ],
+)
+def test_get_format_unsupported(name, engine, message):
+    """Test that unknown formats and engines raise a ValueError."""
+    with pytest.raises(ValueError, match=message):
+        get_format(name, engine)
+
+
+def test_arrow_csv_reads_like_pandas():
+    """Test that the pyarrow CSV reader gives the values pandas reads."""
+    arrow = ArrowCsvFormat().read(CSV_BODY)
+    expected = CsvFormat().read(CSV_BODY)
+
+    assert arrow.to_csv(index=False) == expected.to_csv(index=False)
+    assert arrow["note"].isna().tolist() == [True, False]
+
+
+@pytest.mark.parametrize("reader", [CsvFormat, ArrowCsvFormat])
+def test_csv_text_fields(reader):
+    """Test that text fields are read as strings, and other fields typed."""
+    df = reader().read(b"id,account\n1,007\n2,\n", text_fields=["account"])
+
+    assert df["id"].tolist() == [1, 2]
+    assert df["account"].tolist()[0] == "007"
+    assert df["account"].isna().tolist() == [False, True]
+
+
+@pytest.mark.parametrize("reader", [JsonFormat, ArrowJsonFormat])
+def test_json_text_fields(reader):
+    """Test that text fields keep the text of their JSON values."""
+    body = b'{"id": 1, "account": 7}\n{"id": 2, "account": null}\n'
+
+    df = reader().read(body, text_fields=["account", "missing"])
+
+    assert df["id"].tolist() == [1, 2]
+    assert df["account"].tolist() == ["7", None]
+
+
+@pytest.mark.parametrize("layout", ["array", "lines"])
+def test_arrow_json_reads_arrays_and_lines(layout):
+    """Test that JSON Lines are read with pyarrow and arrays with pandas."""
+    records = [{"id": 1, "name": "Alice"}, {"id": 2, "name": "Bob"}]
+    if layout == "array":
+        body = json.dumps(records).encode()
+    else:
+        body = b"\n".join(json.dumps(record).encode() for record in records)
+
+    df = ArrowJsonFormat().read(body)
+
+    assert df.to_dict("records") == records
+
+
+def test_arrow_csv_empty():
+    """Test that empty files raise a ValueError, as pandas does."""
+    with pytest.raises(ValueError):
+        ArrowCsvFormat().read(b"")
+
+
+@pytest.mark.parametrize("body", [CSV_BODY, CSV_BODY.replace(b"\n", b"\r\n")])
+def test_process_s3_file_pyarrow_engine(tmp_path, body):
+    """Test that the pyarrow engine gives the output of the pandas engine."""
+    path = tmp_path / "test.csv"
+    path.write_bytes(body)
+    job = {"file_to_obfuscate": str(path), "pii_fields": ["name"]}
+
+    arrow = process_s3_file(json.dumps({**job, "engine": "pyarrow"}))
+    expected = process_s3_file(json.dumps(job))
+
+    assert arrow.getvalue() == expected.getvalue()
+
+
+@pytest.mark.parametrize("output_format", ["json", "parquet"])
+def test_process_s3_file_pyarrow_engine_conversion(tmp_path, output_format):
+    """Test that dates and times convert as they do with the pandas engine."""
+    path = tmp_path / "test.csv"
+    path.write_bytes(b"id,name,joined,at\n1,Alice,2024-03-31,12:30:00\n2,Bob,,\n")
+    job = {
+        "file_to_obfuscate": str(path),
+        "pii_fields": ["name"],
+        "output_format": output_format,
+    }
+
+    arrow = process_s3_file(json.dumps({**job, "engine": "pyarrow"}))
+    expected = process_s3_file(json.dumps(job))
+
+    assert arrow.getvalue() == expected.getvalue()
+    if output_format == "json":
+        assert b'"joined":"2024-03-31","at":"12:30:00"' in arrow.getvalue()
+
+
+@pytest.mark.parametrize(
+    "options, message",
+    [
+        ({"mode": "stream"}, "The pyarrow engine reads whole csv files"),
+        ({"mode": "parallel"}, "The pyarrow engine reads whole csv files"),
+    ],
+)
+def test_process_s3_file_pyarrow_engine_invalid(options, message):
+    """Test that the pyarrow engine is only used where it applies."""
+    json_input = json.dumps(
+        {
+            "file_to_obfuscate": "s3://bucket/test.csv",
+            "pii_fields": ["name"],
+            "engine": "pyarrow",
+            **options,
+        }
+    )
+
+    with pytest.raises(ValueError, match=message):
+        process_s3_file(json_input)
+
+
+class TsvFormat(CsvFormat):
+    """Tab-separated values, to test registering a format."""
+
+    def read(self, source, pii_fields=None, text_fields=None):
+        return pd.read_csv(io.BytesIO(bytes(source)), sep="\t")
+
+    def write(self, dataframe, buffer):
+        dataframe.to_csv(buffer, sep="\t", index=False)
+
+
+def test_register_format(tmp_path, monkeypatch):
+    """Test that a registered format is read, converted and written."""
+    monkeypatch.setitem(FORMATS, "tsv", {})
+    register_format("tsv", "pandas", TsvFormat)
+    path = tmp_path / "test.tsv"
+    path.write_bytes(b"id\tname\n1\tAlice\n")
+
+    tsv = process_s3_file(
+        json.dumps({"file_to_obfuscate": str(path), "pii_fields": ["name"]})
+    )
+    csv = process_s3_file(
+        json.dumps(
+            {
+                "file_to_obfuscate": str(path),
+                "pii_fields": ["name"],
+                "output_format": "csv",
+            }
+        )
+    )
+
+    assert tsv.getvalue() == b"id\tname\n1\t***\n"
+    assert csv.getvalue() == b"id,name\n1,***\n"
+
+
+def test_format_without_write_cannot_be_created():
+    """Test that a format missing a method fails when it is created."""
+
+    class ReadOnlyFormat(FileFormat):
+        def read(self, source, pii_fields=None, text_fields=None):
+            return pd.DataFrame()
+
+    with pytest.raises(TypeError, match="abstract method '?write"):
+        ReadOnlyFormat()
+
+
+def test_register_format_raw_engine():
+    """Test that formats cannot be given to the raw engine."""
+    with pytest.raises(ValueError, match="raw engine cannot be given formats"):
+        register_format("tsv", "raw", TsvFormat)
@@ -0,0 +1,74 @@
+import json
+import subprocess
+import sys
+import pytest
+
+
+def _loaded_modules(code: str, modules: list) -> list:
+    """Run code in a fresh interpreter and return which modules it loaded."""
+    script = (
+        f"{code}\n"
+        "import json, sys\n"
+        f"print(json.dumps([m for m in {modules!r} if m in sys.modules]))\n"
+    )
+    result = subprocess.run(
+        [sys.executable, "-c", script], capture_output=True, text=True, check=True
+    )
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+@pytest.mark.parametrize(
+    "module", ["obfuscator.main", "obfuscator.process_file", "obfuscator.batch"]
+)
+def test_import_does_not_load_heavy_dependencies(module):
+    """Test that importing the package defers pandas, pyarrow and boto3."""
+    loaded = _loaded_modules(f"import {module}", ["pandas", "pyarrow", "boto3"])
+
+    assert loaded == []
+
+
+def _run_job(job: dict, body: bytes) -> str:
+    """Build a script that runs a streaming job against a mocked bucket."""
+    key = job["file_to_obfuscate"].rsplit("/", 1)[1]
+    return (
+        "import boto3\n"
+        "from moto import mock_aws\n"
+        "from obfuscator.process_file import stream_s3_file\n"
+        "with mock_aws():\n"
+        "    s3 = boto3.client('s3', region_name='us-east-1')\n"
+        "    s3.create_bucket(Bucket='import-bucket')\n"
+        f"    s3.put_object(Bucket='import-bucket', Key={key!r}, Body={body!r})\n"
+        f"    b''.join(stream_s3_file({json.dumps(job)!r}))\n"
+    )
+
+
+@pytest.mark.parametrize(
+    "file_format, body",
+    [("csv", b"id,name\n1,Ann\n"), ("json", b'{"id": 1, "name": "Ann"}\n')],
+)
+def test_raw_job_does_not_load_pandas(file_format, body):
+    """Test that the raw engine runs without pandas or pyarrow."""
+    job = {
+        "file_to_obfuscate": f"s3://import-bucket/data.{file_format}",
+        "pii_fields": ["name"],
+        "engine": "raw",
+    }
+
+    loaded = _loaded_modules(_run_job(job, body), ["pandas", "pyarrow"])
+
+    assert loaded == []
+
+
+def test_csv_job_does_not_load_parquet():
+    """Test that a pandas CSV job does not load the Parquet reader."""
+    job = {
+        "file_to_obfuscate": "s3://import-bucket/data.csv",
+        "pii_fields": ["name"],
+        "mode": "stream",
+    }
+
+    loaded = _loaded_modules(
+        _run_job(job, b"id,name\n1,Ann\n"), ["pandas", "pyarrow.parquet"]
+    )
+
+    assert loaded == ["pandas"]
@@ -0,0 +1,158 @@
+import pytest
+import json
+from obfuscator.json_rewriter import (
+    ANY_INDEX,
+    JsonRewriter,
+    parse_field_path,
+    rewrite_json,
+)
+from obfuscator.strategies import KeepLast
+from obfuscator.tokenise import HmacTokeniser
+
+
+def _chunks(content: bytes, chunk_size: int):
+    """Split content into chunks of ``chunk_size`` bytes."""
+    return [content[i : i + chunk_size] for i in range(0, len(content), chunk_size)]
+
+
+DOCUMENT = """[
+  {"id": 1, "name": "Zoë", "price": 1.50,
+   "customer": {"email": "a@example.com",
+                "address": {"postcode": "LS1 4AP", "city": "Leeds"}},
+   "orders": [{"sku": "A1", "card": "4111-1111-1111-1111"},
+              {"sku": "B2", "card": null}],
+   "phones": ["07700 900123", "07700 900456"]},
+  {"id": 2, "name": "Bob \\"Bobby\\"", "price": 2.0, "customer": null,
+   "orders": [], "phones": []}
+]
+""".encode("utf-8")
+
+PII_FIELDS = [
+    "name",
+    "customer.email",
+    "customer.address.postcode",
+    "orders[].card",
+    "phones[0]",
+]
+
+
+@pytest.mark.parametrize("chunk_size", [1, 5, 1024])
+def test_rewrite_json_nested_paths(chunk_size):
+    """Test that only the values at the PII paths change, at any chunking."""
+    result = b"".join(rewrite_json(_chunks(DOCUMENT, chunk_size), PII_FIELDS))
+
+    expected = (
+        DOCUMENT.decode("utf-8")
+        .replace('"Zoë"', '"***"')
+        .replace('"a@example.com"', '"***"')
+        .replace('"LS1 4AP"', '"***"')
+        .replace('"4111-1111-1111-1111"', '"***"')
+        .replace('"card": null', '"card": "***"')
+        .replace('"07700 900123"', '"***"')
+        .replace('"Bob \\"Bobby\\""', '"***"')
+    )
+    assert result.decode("utf-8") == expected
+
+
+def test_rewrite_json_preserves_untouched_text():
+    """Test that number formatting, escapes and spacing are kept as written."""
+    content = b'{"id":7.0e0, "note": "caf\\u00e9",  "n": 1.10, "name": "Ann"}\n'
+
+    result = b"".join(rewrite_json([content], ["name"]))
+
+    assert result == content.replace(b'"Ann"', b'"***"')
+
+
+@pytest.mark.parametrize("chunk_size", [1, 2, 1024])
+def test_rewrite_json_keeps_bom(chunk_size):
+    """Test that a leading byte order mark is written back, at any chunking."""
+    content = b'\xef\xbb\xbf[{"name": "Ann", "id": 1}]\n'
+
+    result = b"".join(rewrite_json(_chunks(content, chunk_size), ["name"]))
+
+    assert result == b'\xef\xbb\xbf[{"name": "***", "id": 1}]\n'
+
+
+def test_rewrite_json_lines_implicit_arrays():
+    """Test that key steps apply to every element of the arrays they meet."""
+    content = b'{"a": {"b": 1}}\n{"a": [{"b": "x"}, {"c": 2}, 3]}\n{"a": "b"}\n'
+
+    result = b"".join(rewrite_json(_chunks(content, 3), ["a.b"]))
+
+    assert result == (
+        b'{"a": {"b": "***"}}\n{"a": [{"b": "***"}, {"c": 2}, 3]}\n{"a": "b"}\n'
+    )
+
+
+def test_rewrite_json_masks_whole_subtrees():
+    """Test that a path ending at an object or array masks all of it."""
+    content = b'{"address": {"city": "Leeds"}, "tags": [1, [2]], "id": 1}'
+
+    result = b"".join(rewrite_json([content], ["address", "tags"]))
+
+    assert result == b'{"address": "***", "tags": "***", "id": 1}'
+
+
+def test_rewrite_json_nested_array_indices():
+    """Test explicit indices inside nested arrays."""
+    content = b'{"matrix": [[1, 2], [3, 4]]}'
+
+    result = b"".join(rewrite_json([content], ["matrix[][1]"]))
+
+    assert result == b'{"matrix": [[1, "***"], [3, "***"]]}'
+
+
+def test_rewrite_json_with_strategies():
+    """Test that strategies obfuscate the text of each value."""
+    tokeniser = HmacTokeniser("secret")
+    content = b'{"card": "4111-1111-1111-1111", "user": {"id": 12345, "ref": null}}'
+
+    result = json.loads(
+        b"".join(
+            rewrite_json(
+                [content],
+                ["card", "user.id", "user.ref"],
+                {"card": KeepLast(4), "user.id": tokeniser, "user.ref": tokeniser},
+            )
+        )
+    )
+
+    assert result == {
+        "card": "****-****-****-1111",
+        "user": {"id": tokeniser.token("12345"), "ref": None},
+    }
+
+
+@pytest.mark.parametrize(
+    "content",
+    [b'[{"name": "Ann"}', b'{"name": "Ann"', b'{"name" "Ann"}', b'{"a": [1 2]}'],
+)
+def test_rewrite_json_invalid(content):
+    """Test that truncated or invalid JSON is rejected."""
+    rewriter = JsonRewriter(["name", "a[]"])
+    rewriter.feed(content)
+    with pytest.raises(ValueError):
+        rewriter.close()
+
+
+@pytest.mark.parametrize(
+    "path, steps",
+    [
+        ("name", ["name"]),
+        ("customer.address.postcode", ["customer", "address", "postcode"]),
+        ("orders[].card", ["orders", ANY_INDEX, "card"]),
+        ("orders[*].card", ["orders", ANY_INDEX, "card"]),
+        ("phones[0]", ["phones", 0]),
+        ("matrix[][2]", ["matrix", ANY_INDEX, 2]),
+    ],
+)
+def test_parse_field_path(path, steps):
+    """Test that dotted and array paths are split into steps."""
+    assert parse_field_path(path) == steps
+
+
+@pytest.mark.parametrize("path", ["", "a..b", "a.", "a[x]", "a[1"])
+def test_parse_field_path_invalid(path):
+    """Test that malformed paths are rejected."""
+    with pytest.raises(ValueError, match="Invalid field path"):
+        parse_field_path(path)
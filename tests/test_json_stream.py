@@ -0,0 +1,67 @@
+import pytest
+import json
+from obfuscator.json_stream import JsonRecordParser, iter_json_batches
+
+
+def _chunks(content: bytes, chunk_size: int):
+    """Split content into chunks of ``chunk_size`` bytes."""
+    return [content[i : i + chunk_size] for i in range(0, len(content), chunk_size)]
+
+
+RECORDS = [
+    {"id": 1, "name": "Zoë", "tags": ["a", "b"], "address": {"city": "Leeds"}},
+    {"id": 2, "name": "Bob, \"Bobby\"", "tags": [], "address": None},
+    {"id": 3, "name": "Carol\n", "tags": ["]"], "address": {"city": "{York}"}},
+]
+
+
+@pytest.mark.parametrize("chunk_size", [1, 5, 1024])
+def test_iter_json_batches_array(chunk_size):
+    """Test parsing a top-level array split at every possible point."""
+    content = json.dumps(RECORDS, indent=2, ensure_ascii=False).encode("utf-8")
+
+    batches = list(iter_json_batches(_chunks(content, chunk_size), batch_size=2))
+
+    assert batches == [RECORDS[:2], RECORDS[2:]]
+
+
+@pytest.mark.parametrize("chunk_size", [1, 7, 1024])
+def test_iter_json_batches_json_lines(chunk_size):
+    """Test parsing JSON Lines input."""
+    content = "\n".join(json.dumps(record) for record in RECORDS).encode("utf-8")
+
+    batches = list(iter_json_batches(_chunks(content, chunk_size), batch_size=10))
+
+    assert batches == [RECORDS]
+
+
+def test_iter_json_batches_numbers_at_chunk_boundary():
+    """Test that a number split across chunks is not cut short."""
+    batches = list(iter_json_batches([b"[12", b"34, 5", b"6]"], batch_size=10))
+
+    assert batches == [[1234, 56]]
+
+
+def test_iter_json_batches_empty():
+    """Test parsing empty input and an empty array."""
+    assert list(iter_json_batches([b""], batch_size=10)) == []
+    assert list(iter_json_batches([b" [ ] "], batch_size=10)) == []
+
+
+def test_json_record_parser_keeps_only_partial_record():
+    """Test that completed records are not kept in the parser's buffer."""
+    parser = JsonRecordParser()
+
+    assert parser.feed(b'[{"id": 1}, {"id"') == [{"id": 1}]
+    assert parser.feed(b": 2}]") == [{"id": 2}]
+    assert parser.close() == []
+
+
+@pytest.mark.parametrize(
+    "content",
+    [b'[{"id": 1}', b'[{"id": 1} {"id": 2}]', b'{"id": 1', b'[{"id": 1}] 1'],
+)
+def test_iter_json_batches_invalid(content):
+    """Test that malformed documents are rejected."""
+    with pytest.raises(ValueError):
+        list(iter_json_batches([content], batch_size=10))
@@ -0,0 +1,169 @@
+import pytest
+import io
+import json
+import time
+import logging
+import threading
+from obfuscator.metrics import (
+    JobMetrics,
+    MetricsRecorder,
+    MeteredReader,
+    EmfEmitter,
+    emf_document,
+    metered,
+    stage,
+)
+
+
+def new_recorder():
+    report = JobMetrics("s3://bucket/file.csv", "csv", "memory", "pandas")
+    return MetricsRecorder(report)
+
+
+def test_nested_stages_exclude_inner_time():
+    """Test that a stage's time excludes the stages nested in it."""
+    recorder = new_recorder()
+
+    with recorder.activate():
+        with stage("parse") as counts:
+            counts.rows += 3
+            with stage("download") as inner:
+                inner.bytes_in += 10
+                time.sleep(0.05)
+
+    stages = recorder.report.stages
+    assert stages["download"].wall_seconds >= 0.05
+    assert stages["parse"].wall_seconds < 0.05
+    assert stages["download"].bytes_in == 10
+    assert stages["parse"].rows == 3
+    assert stages["parse"].calls == 1
+
+
+def test_stage_outside_a_job_records_nothing():
+    """Test that stages are no-ops when no job is recording."""
+    with stage("parse") as counts:
+        counts.rows += 1
+
+    recorder = new_recorder()
+    assert recorder.report.stages == {}
+
+
+def test_metered_counts_items():
+    """Test that metered iterators time each item and count its length."""
+    recorder = new_recorder()
+
+    with recorder.activate():
+        chunks = list(metered([b"abc", b"de"], "download", "bytes_in"))
+
+    assert chunks == [b"abc", b"de"]
+    assert recorder.report.stages["download"].bytes_in == 5
+    assert recorder.report.stages["download"].calls == 3  # including exhaustion
+
+
+def test_metered_reader_counts_bytes():
+    """Test that reads through a MeteredReader are recorded as downloads."""
+    recorder = new_recorder()
+
+    with recorder.activate():
+        reader = MeteredReader(io.BytesIO(b"id,name\n1,a\n"))
+        assert reader.read(3) == b"id,"
+        assert reader.read() == b"name\n1,a\n"
+
+    assert recorder.report.stages["download"].bytes_in == 12
+
+
+def test_run_records_worker_thread_steps():
+    """Test that steps run on other threads report their stages and CPU time."""
+    recorder = new_recorder()
+
+    def step(n):
+        with stage("obfuscate") as counts:
+            counts.rows += n
+            sum(range(200_000))
+
+    workers = [threading.Thread(target=recorder.run, args=(step, 2)) for _ in range(2)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    report = recorder.finish()
+
+    assert report.stages["obfuscate"].calls == 2
+    assert report.rows == 4
+    assert report.cpu_seconds >= report.stages["obfuscate"].cpu_seconds > 0
+
+
+def test_finish_totals_and_hook():
+    """Test that finishing a job fills in totals and calls the hook."""
+    recorder = new_recorder()
+    reports = []
+    with recorder.activate():
+        with stage("download") as counts:
+            counts.bytes_in += 100
+        with stage("parse") as counts:
+            counts.rows += 7
+
+    report = recorder.finish(hook=reports.append)
+
+    assert reports == [report]
+    assert report.bytes_in == 100
+    assert report.rows == 7
+    assert report.wall_seconds > 0
+    assert report.process_peak_memory_bytes > 0
+    assert report.succeeded
+    assert json.dumps(report.to_dict())
+
+
+def test_finish_records_error_and_survives_failing_hook(caplog):
+    """Test that a failing hook is logged instead of raised."""
+    recorder = new_recorder()
+
+    def hook(report):
+        raise OSError("disk full")
+
+    with caplog.at_level(logging.WARNING):
+        report = recorder.finish(RuntimeError("boom"), hook)
+
+    assert report.error == "boom"
+    assert not report.succeeded
+    assert "Metrics hook failed: disk full" in caplog.text
+
+
+def test_emf_document():
+    """Test the CloudWatch Embedded Metric Format layout."""
+    recorder = new_recorder()
+    with recorder.activate():
+        with stage("parse"):
+            pass
+    report = recorder.finish()
+
+    document = emf_document(report, namespace="Test")
+
+    directive = document["_aws"]["CloudWatchMetrics"][0]
+    assert directive["Namespace"] == "Test"
+    assert directive["Dimensions"] == [["FileFormat", "Mode", "Engine"]]
+    names = [metric["Name"] for metric in directive["Metrics"]]
+    assert "ParseSeconds" in names and "BytesIn" in names
+    for name in names:
+        assert name in document
+    assert isinstance(document["_aws"]["Timestamp"], int)
+    assert (document["FileFormat"], document["Mode"], document["Engine"]) == (
+        "csv",
+        "memory",
+        "pandas",
+    )
+    assert document["Failed"] == 0
+
+
+def test_emf_emitter_writes_one_line():
+    """Test that the EMF emitter writes one JSON document per report."""
+    stream = io.StringIO()
+    emitter = EmfEmitter(stream=stream)
+
+    emitter(new_recorder().finish(RuntimeError("boom")))
+
+    lines = stream.getvalue().splitlines()
+    assert len(lines) == 1
+    document = json.loads(lines[0])
+    assert document["Failed"] == 1
+    assert document["Error"] == "boom"
@@ -1,6 +1,14 @@
 import pytest
+import numpy as np
 import pandas as pd
-from obfuscator.obfuscate_pii import obfuscate_pii
+import pyarrow as pa
+from obfuscator.obfuscate_pii import (
+    obfuscate_pii,
+    obfuscate_pii_arrow,
+    insert_obfuscated_columns,
+    masked_fields,
+)
+from obfuscator.tokenise import HmacTokeniser
 
 
 @pytest.fixture
@@ -35,3 +43,120 @@ def test_obfuscate_pii_with_missing_columns(sample_dataframe):
     # Assertions
     # DataFrame should remain unchanged
     assert obfuscated_df.equals(sample_dataframe)
+
+
+def test_obfuscate_pii_without_copy(sample_dataframe):
+    """Test that the copy-free variant shares the non-PII columns."""
+    obfuscated_df = obfuscate_pii(sample_dataframe, ["name"], copy=False)
+
+    assert all(obfuscated_df["name"] == "***")
+    assert np.shares_memory(
+        obfuscated_df["student_id"].values, sample_dataframe["student_id"].values
+    )
+    # The input DataFrame should not be modified
+    assert list(sample_dataframe["name"]) == ["John Smith", "Jane Doe"]
+
+
+def test_obfuscate_pii_without_copy_shares_masked_codes(sample_dataframe):
+    """Test that masked columns share one codes array and keep their order."""
+    obfuscated_df = obfuscate_pii(
+        sample_dataframe, ["name", "email_address"], copy=False
+    )
+
+    assert list(obfuscated_df.columns) == list(sample_dataframe.columns)
+    assert obfuscated_df.index.equals(sample_dataframe.index)
+    assert np.shares_memory(
+        obfuscated_df["name"].cat.codes.values,
+        obfuscated_df["email_address"].cat.codes.values,
+    )
+    assert obfuscated_df["email_address"].tolist() == ["***", "***"]
+
+
+def test_obfuscate_pii_arrow_table(sample_dataframe):
+    """Test obfuscation of PII fields in an Arrow table."""
+    table = pa.Table.from_pandas(sample_dataframe)
+    obfuscated_table = obfuscate_pii_arrow(table, ["name", "email_address"])
+
+    assert obfuscated_table.column("name").to_pylist() == ["***", "***"]
+    assert obfuscated_table.column("email_address").to_pylist() == ["***", "***"]
+    # Non-PII columns should be the very same arrays
+    assert (
+        obfuscated_table.column("student_id").chunk(0).buffers()[1].address
+        == table.column("student_id").chunk(0).buffers()[1].address
+    )
+
+
+def test_obfuscate_pii_arrow_record_batch():
+    """Test obfuscation of PII fields in an Arrow record batch."""
+    batch = pa.record_batch({"id": [1, 2], "phone": [7700900123, 7700900456]})
+    obfuscated_batch = obfuscate_pii_arrow(batch, ["phone", "non_existent_column"])
+
+    assert isinstance(obfuscated_batch, pa.RecordBatch)
+    assert obfuscated_batch.column(1).to_pylist() == ["***", "***"]
+    assert obfuscated_batch.schema.names == ["id", "phone"]
+
+
+def test_obfuscate_pii_arrow_with_missing_columns(sample_dataframe):
+    """Test Arrow obfuscation when specified PII fields are missing."""
+    table = pa.Table.from_pandas(sample_dataframe)
+
+    assert obfuscate_pii_arrow(table, ["non_existent_column"]).equals(table)
+
+
+def test_insert_obfuscated_columns():
+    """Test that projected-out PII columns are restored in position."""
+    schema = pa.schema(
+        [("name", pa.string()), ("id", pa.int64()), ("email", pa.string())]
+    )
+    projected = pa.table({"id": [1, 2]})
+
+    table = insert_obfuscated_columns(projected, schema, ["name", "email"])
+
+    assert table.schema.names == ["name", "id", "email"]
+    assert table.column("name").to_pylist() == ["***", "***"]
+    assert table.column("email").to_pylist() == ["***", "***"]
+    assert table.column("id").to_pylist() == [1, 2]
+
+
+@pytest.mark.parametrize("copy", [True, False])
+def test_obfuscate_pii_with_strategies(sample_dataframe, copy):
+    """Test that fields with a tokeniser are tokenised instead of masked."""
+    tokeniser = HmacTokeniser("secret")
+
+    obfuscated_df = obfuscate_pii(
+        sample_dataframe,
+        ["name", "email_address"],
+        copy=copy,
+        strategies={"email_address": tokeniser},
+    )
+
+    assert all(obfuscated_df["name"] == "***")
+    assert obfuscated_df["email_address"].tolist() == [
+        tokeniser.token("j.smith@example.com"),
+        tokeniser.token("j.doe@example.com"),
+    ]
+    assert list(sample_dataframe["name"]) == ["John Smith", "Jane Doe"]
+
+
+def test_obfuscate_pii_arrow_with_strategies(sample_dataframe):
+    """Test that Arrow columns with a tokeniser are tokenised."""
+    tokeniser = HmacTokeniser("secret")
+    table = pa.Table.from_pandas(sample_dataframe)
+
+    obfuscated_table = obfuscate_pii_arrow(
+        table, ["name", "email_address"], {"name": tokeniser}
+    )
+
+    assert obfuscated_table.column("name").to_pylist() == [
+        tokeniser.token("John Smith"),
+        tokeniser.token("Jane Doe"),
+    ]
+    assert obfuscated_table.column("email_address").to_pylist() == ["***", "***"]
+
+
+def test_masked_fields():
+    """Test that tokenised fields are not masked."""
+    tokeniser = HmacTokeniser("secret")
+
+    assert masked_fields(["a", "b"]) == ["a", "b"]
+    assert masked_fields(["a", "b"], {"b": tokeniser}) == ["a"]
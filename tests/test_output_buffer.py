@@ -0,0 +1,70 @@
+import pytest
+import io
+import os
+from obfuscator.output_buffer import SpooledBuffer, new_output_buffer
+
+
+def test_spooled_buffer_stays_in_memory_below_threshold():
+    """Test that small outputs behave like io.BytesIO."""
+    buffer = SpooledBuffer(16)
+    buffer.write(b"id,name\n")
+    buffer.write(b"1,***\n")
+
+    assert not buffer.spilled
+    assert buffer.getvalue() == b"id,name\n1,***\n"
+    assert buffer.getbuffer().nbytes == 14
+    buffer.seek(0)
+    assert buffer.read(3) == b"id,"
+
+
+def test_spooled_buffer_spills_to_disk(tmp_path):
+    """Test that output past the threshold moves to a file in spill_dir."""
+    buffer = SpooledBuffer(8, spill_dir=str(tmp_path))
+    buffer.write(b"id,name\n")
+    assert not buffer.spilled
+
+    buffer.write(b"1,***\n")
+    buffer.write(b"2,***\n")
+
+    assert buffer.spilled
+    assert buffer.tell() == 20
+    assert buffer.getvalue() == b"id,name\n1,***\n2,***\n"
+    view = buffer.getbuffer()
+    assert bytes(view[-6:]) == b"2,***\n"
+    buffer.seek(8)
+    assert buffer.read() == b"1,***\n2,***\n"
+    # Anonymous temporary files have no name in the directory
+    assert os.listdir(tmp_path) == []
+    view.release()
+    buffer.close()
+    assert buffer.closed
+
+
+def test_spooled_buffer_is_a_binary_file_for_readers(tmp_path):
+    """Test that pandas and pyarrow read and write it as a binary file."""
+    import pandas as pd
+
+    df = pd.DataFrame({"id": range(1000), "name": ["***"] * 1000})
+    buffer = SpooledBuffer(100, spill_dir=str(tmp_path))
+
+    df.to_parquet(buffer, index=False)
+    buffer.seek(0)
+
+    assert buffer.spilled
+    assert pd.read_parquet(buffer).equals(df)
+
+
+def test_new_output_buffer():
+    """Test that outputs only spool when given a threshold."""
+    assert isinstance(new_output_buffer(), io.BytesIO)
+    assert isinstance(new_output_buffer(0), SpooledBuffer)
+
+
+@pytest.mark.parametrize("size", [0, 1])
+def test_spooled_buffer_getbuffer_after_truncate(size):
+    """Test views of spilled files that shrink, including to nothing."""
+    buffer = SpooledBuffer(0)
+    buffer.write(b"abc")
+    buffer.truncate(size)
+
+    assert bytes(buffer.getbuffer()) == b"abc"[:size]
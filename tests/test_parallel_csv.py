@@ -0,0 +1,167 @@
+import pytest
+import io
+import boto3
+import pandas as pd
+from moto import mock_aws
+from obfuscator.parallel_csv import split_csv_records, stream_csv_parallel
+from obfuscator.process_file import process_s3_file
+from obfuscator.stream_file import stream_csv, stream_csv_raw
+
+
+@pytest.fixture(scope="function")
+def mock_s3_bucket():
+    """Fixture to create and return a mock S3 bucket."""
+    with mock_aws():
+        s3 = boto3.client("s3", region_name="eu-west-2")
+        bucket_name = "mock-bucket"
+        s3.create_bucket(
+            Bucket=bucket_name,
+            CreateBucketConfiguration={"LocationConstraint": "eu-west-2"},
+        )
+        yield s3, bucket_name
+
+
+QUOTED_CSV = (
+    b'id,name,notes\n'
+    + b"".join(
+        f'{i},"Name {i}","line one\nline ""{i}"" two\nthree"\n'.encode()
+        for i in range(200)
+    )
+)
+
+
+def _chunked(data: bytes, size: int):
+    return [data[i : i + size] for i in range(0, len(data), size)]
+
+
+@pytest.mark.parametrize("chunk_size", [1, 7, 64, 100_000])
+def test_split_csv_records_keeps_quoted_newlines(chunk_size):
+    """Test that parts never split a quoted field, however input is chunked."""
+    parts = list(split_csv_records(_chunked(QUOTED_CSV, chunk_size), 256))
+
+    assert b"".join(parts) == QUOTED_CSV
+    assert parts[0] == b"id,name,notes\n"
+    assert len(parts) > 3
+    for part in parts[1:]:
+        records = pd.read_csv(io.BytesIO(parts[0] + part))
+        assert list(records["notes"].str.count("\n").unique()) == [2]
+
+
+def test_split_csv_records_without_trailing_newline():
+    """Test that a final record without a newline is kept."""
+    data = b"id,name\n1,a\n2,b"
+
+    assert list(split_csv_records([data], 4)) == [b"id,name\n", b"1,a\n", b"2,b"]
+
+
+def test_split_csv_records_empty():
+    """Test that an empty stream yields nothing."""
+    assert list(split_csv_records([], 4)) == []
+
+
+@pytest.mark.parametrize(
+    "engine, serial", [("pandas", stream_csv), ("raw", stream_csv_raw)]
+)
+def test_stream_csv_parallel_matches_serial(mock_s3_bucket, engine, serial):
+    """Test that parallel output equals single-core output, in order."""
+    s3, bucket_name = mock_s3_bucket
+    s3.put_object(Bucket=bucket_name, Key="test.csv", Body=QUOTED_CSV)
+
+    chunks = list(
+        stream_csv_parallel(
+            bucket_name,
+            "test.csv",
+            ["name"],
+            engine=engine,
+            processes=2,
+            part_size=1024,
+        )
+    )
+
+    assert len(chunks) > 2
+    expected = b"".join(serial(bucket_name, "test.csv", ["name"]))
+    assert b"".join(chunks) == expected
+    assert b"".join(chunks).count(b"id,name,notes") == 1
+
+
+def test_stream_csv_parallel_small_file_runs_inline(mock_s3_bucket):
+    """Test that a file that fits in one part is processed without a pool."""
+    s3, bucket_name = mock_s3_bucket
+    s3.put_object(Bucket=bucket_name, Key="test.csv", Body=b"id,name\n1,Ann\n")
+
+    chunks = list(stream_csv_parallel(bucket_name, "test.csv", ["name"]))
+
+    assert chunks == [b"id,name\n1,***\n"]
+
+
+@pytest.mark.parametrize("engine", ["pandas", "raw"])
+def test_stream_csv_parallel_header_only(mock_s3_bucket, engine):
+    """Test a CSV file with a header and no records."""
+    s3, bucket_name = mock_s3_bucket
+    s3.put_object(Bucket=bucket_name, Key="test.csv", Body=b"id,name\n")
+
+    output = b"".join(
+        stream_csv_parallel(bucket_name, "test.csv", ["name"], engine=engine)
+    )
+
+    assert output == b"id,name\n"
+
+
+def test_stream_csv_parallel_missing_file(mock_s3_bucket):
+    """Test that a missing object raises a RuntimeError."""
+    _, bucket_name = mock_s3_bucket
+
+    with pytest.raises(RuntimeError, match="S3 Client Error"):
+        list(stream_csv_parallel(bucket_name, "missing.csv", ["name"]))
+
+
+def test_stream_csv_parallel_single_process(mock_s3_bucket):
+    """Test that a single process handles every part in order."""
+    s3, bucket_name = mock_s3_bucket
+    s3.put_object(Bucket=bucket_name, Key="test.csv", Body=QUOTED_CSV)
+
+    chunks = list(
+        stream_csv_parallel(
+            bucket_name, "test.csv", ["name"], processes=1, part_size=1024
+        )
+    )
+
+    assert len(chunks) > 2
+    assert b"".join(chunks) == b"".join(stream_csv(bucket_name, "test.csv", ["name"]))
+
+
+def test_stream_csv_parallel_matches_memory_mode(mock_s3_bucket):
+    """Test that parts do not infer their own types: codes with leading zeros
+    stay as written even in parts without any letters."""
+    s3, bucket_name = mock_s3_bucket
+    rows = [f"{i},Name {i},{i:03d}\n".encode() for i in range(300)]
+    body = b"id,name,code\n" + b"".join(rows) + b"300,Name 300,A12\n"
+    s3.put_object(Bucket=bucket_name, Key="test.csv", Body=body)
+
+    chunks = list(
+        stream_csv_parallel(
+            bucket_name, "test.csv", ["name"], processes=2, part_size=1024
+        )
+    )
+    memory = process_s3_file(
+        f'{{"file_to_obfuscate": "s3://{bucket_name}/test.csv", '
+        f'"pii_fields": ["name"]}}'
+    )
+
+    assert len(chunks) > 2
+    assert b"".join(chunks) == memory.getvalue()
+    assert b"\n7,***,007\n" in memory.getvalue()
+
+
+def test_stream_csv_parallel_cancels_pending_parts(mock_s3_bucket):
+    """Test that closing the stream early shuts the pool down."""
+    s3, bucket_name = mock_s3_bucket
+    s3.put_object(Bucket=bucket_name, Key="test.csv", Body=QUOTED_CSV)
+
+    chunks = stream_csv_parallel(
+        bucket_name, "test.csv", ["name"], processes=2, part_size=256
+    )
+    first = next(chunks)
+    chunks.close()
+
+    assert first.startswith(b"id,name,notes\n")
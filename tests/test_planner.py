@@ -0,0 +1,72 @@
+import pytest
+from obfuscator.planner import (
+    COMPRESSED_EXPANSION,
+    default_memory_budget,
+    estimate_memory,
+    plan_job,
+)
+
+MB = 1024 * 1024
+
+
+def test_default_memory_budget_is_lambda_limit(monkeypatch):
+    """Test that the budget defaults to the Lambda function's memory."""
+    monkeypatch.setenv("AWS_LAMBDA_FUNCTION_MEMORY_SIZE", "1024")
+
+    assert default_memory_budget() == 1024 * MB
+
+
+def test_default_memory_budget_outside_lambda(monkeypatch):
+    """Test that the physical memory is used outside Lambda."""
+    monkeypatch.delenv("AWS_LAMBDA_FUNCTION_MEMORY_SIZE", raising=False)
+
+    assert default_memory_budget() > 0
+
+
+def test_estimate_memory():
+    """Test that estimates grow with the format's and compression's expansion."""
+    csv = estimate_memory(MB, "csv")
+    gzip_csv = estimate_memory(MB, "csv", "gzip")
+
+    assert estimate_memory(MB, "parquet") > csv > MB
+    assert gzip_csv == csv * COMPRESSED_EXPANSION
+    assert estimate_memory(MB, "csv", engine="raw") == csv
+
+
+def test_plan_job_small_file_in_memory():
+    """Test that files that fit in the budget stay on the in-memory path."""
+    plan = plan_job(MB, "csv", engine="pyarrow", memory_budget=1024 * MB)
+
+    assert plan.mode == "memory"
+    assert plan.engine == "pyarrow"
+    assert plan.spill_threshold is None
+
+
+def test_plan_job_large_file_streams_and_spills():
+    """Test that large returned outputs are streamed and spilled."""
+    plan = plan_job(400 * MB, "csv", engine="pyarrow", memory_budget=1024 * MB)
+
+    assert plan.mode == "stream"
+    assert plan.engine == "pandas"
+    assert plan.spill_threshold == 384 * MB
+
+
+@pytest.mark.parametrize(
+    "size, returns_output",
+    [(100 * MB, True), (400 * MB, False)],
+)
+def test_plan_job_streams_without_spilling(size, returns_output):
+    """Test that outputs are kept in memory if small or uploaded."""
+    plan = plan_job(
+        size, "parquet", returns_output=returns_output, memory_budget=1024 * MB
+    )
+
+    assert plan.mode == "stream"
+    assert plan.spill_threshold is None
+
+
+def test_plan_job_unstreamable_format():
+    """Test that formats that cannot stream are processed in memory."""
+    plan = plan_job(400 * MB, "csv", streamable=False, memory_budget=1024 * MB)
+
+    assert plan.mode == "memory"
@@ -0,0 +1,129 @@
+import pytest
+import io
+import gzip
+import boto3
+import pandas as pd
+from moto import mock_aws
+from obfuscator import probe
+from obfuscator.probe import read_field_names, _csv_header
+from obfuscator.s3_client import get_s3_client
+
+
+@pytest.fixture(scope="function")
+def mock_s3_bucket():
+    """Fixture to create and return a mock S3 bucket."""
+    with mock_aws():
+        s3 = boto3.client("s3", region_name="eu-west-2")
+        bucket_name = "mock-bucket"
+        s3.create_bucket(
+            Bucket=bucket_name,
+            CreateBucketConfiguration={"LocationConstraint": "eu-west-2"},
+        )
+        yield s3, bucket_name
+
+
+def _ranges(s3_client):
+    """Record the Range of every GET made through a client."""
+    ranges = []
+    s3_client.meta.events.register(
+        "before-parameter-build.s3.GetObject",
+        lambda params, **kwargs: ranges.append(params.get("Range")),
+    )
+    return ranges
+
+
+@pytest.mark.parametrize(
+    "data, complete, expected",
+    [
+        (b"id,name\n1,Ann\n", False, {"id", "name"}),
+        (b"\r\n\nid,name\r\n", False, {"id", "name"}),
+        (b'"full\nname",id\n1,2\n', False, {"full\nname", "id"}),
+        (b'"full\nname",id', False, None),
+        (b'"full\nname",id', True, {"full\nname", "id"}),
+        (b"\xef\xbb\xbfid,name\n", False, {"id", "name"}),
+        (b'\xef\xbb\xbf"name","email"\r\n', False, {"name", "email"}),
+        (b"id,name,name\n", False, None),
+        (b"id,,name\n", False, None),
+        (b'id,"na"me\n', False, None),
+        (b"id,\xffname\n", False, None),
+    ],
+)
+def test_csv_header(data, complete, expected):
+    """Test reading the header of a CSV prefix."""
+    assert _csv_header(data, complete) == expected
+
+
+def test_read_field_names_csv_reads_only_the_header(mock_s3_bucket, monkeypatch):
+    """Test that a large CSV is probed with one small ranged GET."""
+    s3, bucket_name = mock_s3_bucket
+    monkeypatch.setattr(probe, "PROBE_SIZE", 1024)
+    body = b"id,email\n" + b"1,a@example.com\n" * 10_000
+    s3.put_object(Bucket=bucket_name, Key="data.csv", Body=body)
+    ranges = _ranges(get_s3_client())
+
+    names = read_field_names(bucket_name, "data.csv", "csv")
+
+    assert names == {"id", "email"}
+    assert ranges == ["bytes=0-1023"]
+
+
+def test_read_field_names_csv_long_header(mock_s3_bucket, monkeypatch):
+    """Test that headers longer than the first GET are read further."""
+    s3, bucket_name = mock_s3_bucket
+    monkeypatch.setattr(probe, "PROBE_SIZE", 16)
+    header = ",".join(f"column_{i}" for i in range(20))
+    s3.put_object(
+        Bucket=bucket_name, Key="data.csv", Body=f"{header}\n{'1,' * 19}1\n".encode()
+    )
+
+    names = read_field_names(bucket_name, "data.csv", "csv")
+
+    assert names == set(header.split(","))
+
+
+def test_read_field_names_compressed_csv(mock_s3_bucket, monkeypatch):
+    """Test that the header of a compressed CSV is read from its first bytes."""
+    s3, bucket_name = mock_s3_bucket
+    monkeypatch.setattr(probe, "PROBE_SIZE", 256)
+    body = gzip.compress(b"id,name\n" + b"".join(b"%d,x\n" % i for i in range(10**4)))
+    s3.put_object(Bucket=bucket_name, Key="data.csv.gz", Body=body)
+
+    assert read_field_names(bucket_name, "data.csv.gz", "csv", "gzip") == {
+        "id",
+        "name",
+    }
+
+
+def test_read_field_names_parquet(mock_s3_bucket):
+    """Test that Parquet names are read from the footer."""
+    s3, bucket_name = mock_s3_bucket
+    buffer = io.BytesIO()
+    pd.DataFrame({"id": [1], "city": ["Leeds"]}).to_parquet(buffer, index=False)
+    s3.put_object(Bucket=bucket_name, Key="data.parquet", Body=buffer.getvalue())
+
+    assert read_field_names(bucket_name, "data.parquet", "parquet") == {"id", "city"}
+
+
+def test_read_field_names_json(mock_s3_bucket, monkeypatch):
+    """Test that JSON names are the keys of every record of small objects."""
+    s3, bucket_name = mock_s3_bucket
+    body = b'{"id": 1}\n{"id": 2, "email": "a@example.com"}\n'
+    s3.put_object(Bucket=bucket_name, Key="data.json", Body=body)
+    s3.put_object(Bucket=bucket_name, Key="list.json", Body=b"[[1, 2]]")
+
+    assert read_field_names(bucket_name, "data.json", "json") == {"id", "email"}
+    assert read_field_names(bucket_name, "list.json", "json") is None
+
+    monkeypatch.setattr(probe, "PROBE_SIZE", 16)
+    assert read_field_names(bucket_name, "data.json", "json") is None
+
+
+def test_read_field_names_unreadable(mock_s3_bucket):
+    """Test that missing, empty or invalid objects cannot be probed."""
+    s3, bucket_name = mock_s3_bucket
+    s3.put_object(Bucket=bucket_name, Key="empty.csv", Body=b"")
+    s3.put_object(Bucket=bucket_name, Key="bad.parquet", Body=b"not parquet")
+
+    assert read_field_names(bucket_name, "missing.csv", "csv") is None
+    assert read_field_names(bucket_name, "empty.csv", "csv") is None
+    assert read_field_names(bucket_name, "bad.parquet", "parquet") is None
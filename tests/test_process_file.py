@@ -1,9 +1,15 @@
 import pytest
 import json
 import io
+import gzip
+import bz2
+import pandas as pd
+import pyarrow.parquet as pq
 import boto3
 from moto import mock_aws
 from obfuscator.main import process_s3_file
+from obfuscator.process_file import stream_s3_file, process_s3_file_with_metrics
+from obfuscator.s3_client import get_s3_client
 
 
 @pytest.fixture(scope="function")
@@ -181,3 +187,1290 @@ def test_process_s3_file_invalid_s3_uri(mock_s3_bucket):
 
     with pytest.raises(ValueError, match="Invalid S3 URI format"):
         process_s3_file(json_input)
+
+
+@mock_aws
+def test_process_s3_file_stream_mode(mock_s3_bucket):
+    """Test that stream mode produces the same output as memory mode."""
+    s3, bucket_name = mock_s3_bucket
+    object_key = "test.csv"
+    rows = "\n".join(f"{i},Name {i},user{i}@example.com" for i in range(25))
+    s3.put_object(Bucket=bucket_name, Key=object_key, Body=f"id,name,email\n{rows}\n")
+
+    job = {
+        "file_to_obfuscate": f"s3://{bucket_name}/{object_key}",
+        "pii_fields": ["name", "email"],
+    }
+    memory_output = process_s3_file(json.dumps(job)).getvalue()
+    stream_output = process_s3_file(
+        json.dumps({**job, "mode": "stream", "chunk_size": 4})
+    ).getvalue()
+
+    assert stream_output == memory_output
+
+
+@mock_aws
+def test_stream_s3_file_yields_chunks(mock_s3_bucket):
+    """Test that stream_s3_file yields the output incrementally."""
+    s3, bucket_name = mock_s3_bucket
+    object_key = "test.csv"
+    rows = "\n".join(f"{i},Name {i}" for i in range(10))
+    s3.put_object(Bucket=bucket_name, Key=object_key, Body=f"id,name\n{rows}\n")
+
+    json_input = json.dumps(
+        {
+            "file_to_obfuscate": f"s3://{bucket_name}/{object_key}",
+            "pii_fields": ["name"],
+            "chunk_size": 5,
+        }
+    )
+    chunks = list(stream_s3_file(json_input))
+
+    assert len(chunks) == 2
+    assert chunks[0].startswith(b"id,name\n")
+    assert not chunks[1].startswith(b"id,name")
+
+
+@mock_aws
+def test_process_s3_file_parallel_mode(mock_s3_bucket):
+    """Test that parallel mode produces the same output as memory mode."""
+    s3, bucket_name = mock_s3_bucket
+    object_key = "test.csv"
+    rows = "\n".join(f"{i},Name {i},user{i}@example.com" for i in range(25))
+    s3.put_object(Bucket=bucket_name, Key=object_key, Body=f"id,name,email\n{rows}\n")
+
+    job = {
+        "file_to_obfuscate": f"s3://{bucket_name}/{object_key}",
+        "pii_fields": ["name", "email"],
+    }
+    memory_output = process_s3_file(json.dumps(job)).getvalue()
+    parallel_output = process_s3_file(
+        json.dumps({**job, "mode": "parallel", "processes": 2})
+    ).getvalue()
+
+    assert parallel_output == memory_output
+
+
+@pytest.mark.parametrize(
+    "options, message",
+    [
+        ({"file_to_obfuscate": "s3://bucket/file.json", "mode": "parallel"},
+         "Parallel processing is not supported for json files"),
+        ({"file_to_obfuscate": "s3://bucket/file.csv", "mode": "parallel",
+          "processes": 0}, "processes must be a positive integer"),
+    ],
+)
+def test_process_s3_file_invalid_parallel_options(options, message):
+    """Test validation of parallel mode options."""
+    with pytest.raises(ValueError, match=message):
+        process_s3_file(json.dumps(options))
+
+
+def test_process_s3_file_invalid_mode():
+    """Test handling of an unsupported processing mode."""
+    json_input = json.dumps(
+        {"file_to_obfuscate": "s3://bucket/file.csv", "mode": "turbo"}
+    )
+    with pytest.raises(ValueError, match="Unsupported processing mode"):
+        process_s3_file(json_input)
+
+
+@mock_aws
+def test_process_s3_file_parquet_stream_mode(mock_s3_bucket):
+    """Test end-to-end streaming of a Parquet file from S3."""
+    s3, bucket_name = mock_s3_bucket
+    object_key = "test.parquet"
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    table = pa.table({"id": [1, 2, 3], "name": ["Alice", "Bob", "Carol"]})
+    with io.BytesIO() as f:
+        pq.write_table(table, f, row_group_size=2)
+        s3.put_object(Bucket=bucket_name, Key=object_key, Body=f.getvalue())
+
+    json_input = json.dumps(
+        {
+            "file_to_obfuscate": f"s3://{bucket_name}/{object_key}",
+            "pii_fields": ["name"],
+            "mode": "stream",
+        }
+    )
+
+    byte_stream = process_s3_file(json_input)
+    result = pq.read_table(io.BytesIO(byte_stream.getvalue()))
+
+    assert result.column("id").to_pylist() == [1, 2, 3]
+    assert result.column("name").to_pylist() == ["***"] * 3
+
+
+@mock_aws
+def test_process_s3_file_raw_engine(mock_s3_bucket):
+    """Test that the raw CSV engine leaves non-PII values untouched."""
+    s3, bucket_name = mock_s3_bucket
+    object_key = "test.csv"
+    csv_data = b"account,name,balance\n00123,Alice,1.10\n00456,Bob,2.50\n"
+    s3.put_object(Bucket=bucket_name, Key=object_key, Body=csv_data)
+
+    json_input = json.dumps(
+        {
+            "file_to_obfuscate": f"s3://{bucket_name}/{object_key}",
+            "pii_fields": ["name"],
+            "engine": "raw",
+        }
+    )
+
+    byte_stream = process_s3_file(json_input)
+
+    assert byte_stream.getvalue() == (
+        b"account,name,balance\n00123,***,1.10\n00456,***,2.50\n"
+    )
+
+
+def test_process_s3_file_raw_engine_unsupported_format():
+    """Test that the raw engine rejects Parquet files."""
+    json_input = json.dumps(
+        {"file_to_obfuscate": "s3://bucket/file.parquet", "engine": "raw"}
+    )
+    with pytest.raises(ValueError, match="raw engine does not support parquet"):
+        process_s3_file(json_input)
+
+
+@mock_aws
+def test_process_s3_file_raw_engine_nested_json(mock_s3_bucket):
+    """Test that the raw JSON engine rewrites values at nested field paths."""
+    s3, bucket_name = mock_s3_bucket
+    object_key = "test.json"
+    json_data = (
+        b'[{"id": 1, "customer": {"email": "a@example.com", "tier": 2},\n'
+        b'  "orders": [{"card": "4111-1111-1111-1111", "total": 9.50}]}]\n'
+    )
+    s3.put_object(Bucket=bucket_name, Key=object_key, Body=json_data)
+
+    json_input = json.dumps(
+        {
+            "file_to_obfuscate": f"s3://{bucket_name}/{object_key}",
+            "pii_fields": {
+                "customer.email": "email_domain",
+                "orders[].card": "mask",
+            },
+            "engine": "raw",
+        }
+    )
+
+    byte_stream = process_s3_file(json_input)
+
+    assert byte_stream.getvalue() == (
+        b'[{"id": 1, "customer": {"email": "***@example.com", "tier": 2},\n'
+        b'  "orders": [{"card": "***", "total": 9.50}]}]\n'
+    )
+
+
+def test_process_s3_file_raw_engine_invalid_field_path():
+    """Test that malformed JSON field paths are rejected up front."""
+    json_input = json.dumps(
+        {
+            "file_to_obfuscate": "s3://bucket/file.json",
+            "pii_fields": ["orders[x].card"],
+            "engine": "raw",
+        }
+    )
+    with pytest.raises(ValueError, match="Invalid field path: orders"):
+        process_s3_file(json_input)
+
+
+@mock_aws
+@pytest.mark.parametrize("mode", ["memory", "stream"])
+def test_process_s3_file_output_location(mock_s3_bucket, mode):
+    """Test that the output is uploaded to the output location."""
+    s3, bucket_name = mock_s3_bucket
+    csv_data = "id,name\n1,Alice\n2,Bob\n"
+    s3.put_object(Bucket=bucket_name, Key="test.csv", Body=csv_data)
+
+    json_input = json.dumps(
+        {
+            "file_to_obfuscate": f"s3://{bucket_name}/test.csv",
+            "pii_fields": ["name"],
+            "mode": mode,
+            "output_location": f"s3://{bucket_name}/masked/test.csv",
+        }
+    )
+
+    result = process_s3_file(json_input)
+
+    assert result == f"s3://{bucket_name}/masked/test.csv"
+    body = s3.get_object(Bucket=bucket_name, Key="masked/test.csv")["Body"].read()
+    assert body == b"id,name\n1,***\n2,***\n"
+
+
+@mock_aws
+def test_process_s3_file_output_location_not_written_on_error(mock_s3_bucket):
+    """Test that nothing is uploaded when processing fails."""
+    s3, bucket_name = mock_s3_bucket
+
+    json_input = json.dumps(
+        {
+            "file_to_obfuscate": f"s3://{bucket_name}/missing.csv",
+            "mode": "stream",
+            "output_location": f"s3://{bucket_name}/masked/missing.csv",
+        }
+    )
+
+    with pytest.raises(RuntimeError, match="Error processing S3 file:"):
+        process_s3_file(json_input)
+    assert "Contents" not in s3.list_objects_v2(Bucket=bucket_name)
+
+
+def test_process_s3_file_invalid_output_location():
+    """Test handling of an output location without a key."""
+    json_input = json.dumps(
+        {"file_to_obfuscate": "s3://bucket/file.csv", "output_location": "s3://out/"}
+    )
+    with pytest.raises(ValueError, match="Invalid output S3 URI format"):
+        process_s3_file(json_input)
+
+
+CSV_BODY = b"id,name,email\n1,Alice,alice@example.com\n2,Bob,bob@example.com\n"
+
+
+@pytest.mark.parametrize(
+    "options, stages",
+    [
+        ({}, {"probe", "download", "parse", "obfuscate", "serialise"}),
+        ({"mode": "stream"}, {"probe", "download", "parse", "obfuscate", "serialise"}),
+        ({"engine": "raw"}, {"probe", "download", "obfuscate"}),
+        ({"mode": "parallel"}, {"probe", "download", "obfuscate"}),
+    ],
+)
+def test_process_s3_file_with_metrics(mock_s3_bucket, options, stages):
+    """Test that each stage reports its time, bytes and rows."""
+    s3, bucket_name = mock_s3_bucket
+    s3.put_object(Bucket=bucket_name, Key="test.csv", Body=CSV_BODY)
+    json_input = json.dumps(
+        {
+            "file_to_obfuscate": f"s3://{bucket_name}/test.csv",
+            "pii_fields": ["name", "email"],
+            **options,
+        }
+    )
+
+    output, report = process_s3_file_with_metrics(json_input)
+
+    assert set(report.stages) == stages
+    assert report.bytes_in == len(CSV_BODY)
+    assert report.bytes_out == len(output.getvalue())
+    if options.get("engine") != "raw" and options.get("mode") != "parallel":
+        assert report.rows == 2
+        assert report.stages["obfuscate"].rows == 2
+        assert report.stages["serialise"].bytes_out == report.bytes_out
+    assert all(stage.wall_seconds >= 0 for stage in report.stages.values())
+    assert report.wall_seconds >= sum(
+        stage.wall_seconds for stage in report.stages.values()
+    )
+    assert report.process_peak_memory_bytes > 0
+    assert report.succeeded
+
+
+@pytest.mark.parametrize("mode", ["memory", "stream"])
+def test_process_s3_file_parquet_metrics(mock_s3_bucket, mode):
+    """Test that ranged Parquet reads are counted as downloads."""
+    s3, bucket_name = mock_s3_bucket
+    buffer = io.BytesIO()
+    pd.DataFrame({"id": range(100), "name": ["Alice"] * 100}).to_parquet(buffer)
+    s3.put_object(Bucket=bucket_name, Key="test.parquet", Body=buffer.getvalue())
+    json_input = json.dumps(
+        {
+            "file_to_obfuscate": f"s3://{bucket_name}/test.parquet",
+            "pii_fields": ["name"],
+            "mode": mode,
+        }
+    )
+
+    _, report = process_s3_file_with_metrics(json_input)
+
+    assert report.bytes_in > 0  # footers may be fetched more than once
+    assert report.rows == 100
+
+
+def test_process_s3_file_metrics_upload_stage(mock_s3_bucket):
+    """Test that uploads to an output location are reported."""
+    s3, bucket_name = mock_s3_bucket
+    s3.put_object(Bucket=bucket_name, Key="test.csv", Body=CSV_BODY)
+    reports = []
+    json_input = json.dumps(
+        {
+            "file_to_obfuscate": f"s3://{bucket_name}/test.csv",
+            "pii_fields": ["name"],
+            "output_location": f"s3://{bucket_name}/out.csv",
+        }
+    )
+
+    process_s3_file(json_input, metrics_hook=reports.append)
+
+    (report,) = reports
+    written = s3.get_object(Bucket=bucket_name, Key="out.csv")["Body"].read()
+    assert report.stages["upload"].bytes_out == len(written) == report.bytes_out
+
+
+def test_process_s3_file_metrics_hook_on_failure(mock_s3_bucket):
+    """Test that the hook receives a report for failed jobs."""
+    _, bucket_name = mock_s3_bucket
+    reports = []
+    json_input = json.dumps(
+        {"file_to_obfuscate": f"s3://{bucket_name}/missing.csv", "pii_fields": []}
+    )
+
+    with pytest.raises(RuntimeError):
+        process_s3_file(json_input, metrics_hook=reports.append)
+
+    assert len(reports) == 1
+    assert not reports[0].succeeded
+    assert "S3 Client Error" in reports[0].error
+
+
+def test_stream_s3_file_metrics_hook(mock_s3_bucket):
+    """Test that streams report their metrics once they are exhausted."""
+    s3, bucket_name = mock_s3_bucket
+    s3.put_object(Bucket=bucket_name, Key="test.csv", Body=CSV_BODY)
+    reports = []
+    json_input = json.dumps(
+        {
+            "file_to_obfuscate": f"s3://{bucket_name}/test.csv",
+            "pii_fields": ["name"],
+            "chunk_size": 1,
+        }
+    )
+
+    chunks = stream_s3_file(json_input, metrics_hook=reports.append)
+    first = next(chunks)
+    assert reports == []
+    rest = b"".join(chunks)
+
+    (report,) = reports
+    assert report.bytes_out == len(first + rest)
+    assert report.bytes_in == len(CSV_BODY)
+    assert report.stages["parse"].rows == 2
+
+
+@pytest.mark.parametrize(
+    "options",
+    [
+        {},
+        {"mode": "stream", "chunk_size": 1},
+        {"engine": "raw"},
+        {"mode": "parallel"},
+    ],
+)
+@pytest.mark.parametrize(
+    "extension, compress, decompress",
+    [("gz", gzip.compress, gzip.decompress), ("bz2", bz2.compress, bz2.decompress)],
+)
+def test_process_s3_file_compressed_csv(
+    mock_s3_bucket, options, extension, compress, decompress
+):
+    """Test that compressed CSV files are read and written compressed."""
+    s3, bucket_name = mock_s3_bucket
+    s3.put_object(Bucket=bucket_name, Key="plain.csv", Body=CSV_BODY)
+    s3.put_object(
+        Bucket=bucket_name, Key=f"test.csv.{extension}", Body=compress(CSV_BODY)
+    )
+    job = {"pii_fields": ["name", "email"], **options}
+
+    expected = process_s3_file(
+        json.dumps({**job, "file_to_obfuscate": f"s3://{bucket_name}/plain.csv"})
+    ).getvalue()
+    output, report = process_s3_file_with_metrics(
+        json.dumps(
+            {**job, "file_to_obfuscate": f"s3://{bucket_name}/test.csv.{extension}"}
+        )
+    )
+
+    assert decompress(output.getvalue()) == expected
+    assert report.file_format == "csv"
+    assert report.stages["decompress"].bytes_out == len(CSV_BODY)
+    assert report.stages["compress"].bytes_out == len(output.getvalue())
+
+
+@pytest.mark.parametrize("mode", ["memory", "stream"])
+def test_process_s3_file_csv_to_parquet(mock_s3_bucket, mode):
+    """Test that CSV files can be written out as Parquet."""
+    s3, bucket_name = mock_s3_bucket
+    s3.put_object(Bucket=bucket_name, Key="test.csv.gz", Body=gzip.compress(CSV_BODY))
+
+    output = process_s3_file(
+        json.dumps(
+            {
+                "file_to_obfuscate": f"s3://{bucket_name}/test.csv.gz",
+                "pii_fields": ["name", "email"],
+                "mode": mode,
+                "output_format": "parquet",
+                "parquet_compression": "gzip",
+                "row_group_size": 1,
+            }
+        )
+    )
+
+    parquet_file = pq.ParquetFile(output)
+    # Stream mode reads every field as text
+    dtype = str if mode == "stream" else None
+    expected = pd.read_csv(io.BytesIO(CSV_BODY), dtype=dtype)
+    assert parquet_file.metadata.num_row_groups == len(expected)
+    assert parquet_file.metadata.row_group(0).column(0).compression == "GZIP"
+    df = parquet_file.read().to_pandas()
+    assert list(df.columns) == list(expected.columns)
+    assert (df["name"] == "***").all()
+    assert df["id"].tolist() == expected["id"].tolist()
+
+
+@pytest.mark.parametrize("mode", ["memory", "stream"])
+def test_process_s3_file_parquet_to_csv_without_pii(mock_s3_bucket, mode):
+    """Test that files without PII fields are still converted."""
+    s3, bucket_name = mock_s3_bucket
+    buffer = io.BytesIO()
+    pd.DataFrame({"id": [1, 2], "name": ["Alice", "Bob"]}).to_parquet(
+        buffer, index=False
+    )
+    s3.put_object(Bucket=bucket_name, Key="test.parquet", Body=buffer.getvalue())
+
+    output = process_s3_file(
+        json.dumps(
+            {
+                "file_to_obfuscate": f"s3://{bucket_name}/test.parquet",
+                "pii_fields": ["email"],
+                "mode": mode,
+                "output_format": "csv",
+            }
+        )
+    )
+
+    assert output.getvalue() == b"id,name\n1,Alice\n2,Bob\n"
+
+
+@pytest.mark.parametrize(
+    "options, message",
+    [
+        ({"output_format": "xml"}, "Unsupported output format: xml"),
+        ({"output_format": "parquet", "engine": "raw"}, "needs the pandas engine"),
+        ({"output_format": "json", "mode": "parallel"}, "needs the pandas engine"),
+        ({"row_group_size": "many"}, "row_group_size must be a positive integer"),
+    ],
+)
+def test_process_s3_file_invalid_output_format(options, message):
+    """Test validation of the output format and writer options."""
+    json_input = json.dumps(
+        {
+            "file_to_obfuscate": "s3://bucket/test.csv",
+            "pii_fields": ["name"],
+            **options,
+        }
+    )
+
+    with pytest.raises(ValueError, match=message):
+        process_s3_file(json_input)
+
+
+@pytest.mark.parametrize("mode", ["memory", "stream"])
+def test_process_s3_file_gzip_json(mock_s3_bucket, mode):
+    """Test that gzip-compressed JSON is obfuscated and recompressed."""
+    s3, bucket_name = mock_s3_bucket
+    records = [{"id": 1, "name": "Alice"}, {"id": 2, "name": "Bob"}]
+    s3.put_object(
+        Bucket=bucket_name,
+        Key="test.json.gz",
+        Body=gzip.compress(json.dumps(records).encode()),
+    )
+    json_input = json.dumps(
+        {
+            "file_to_obfuscate": f"s3://{bucket_name}/test.json.gz",
+            "pii_fields": ["name"],
+            "mode": mode,
+        }
+    )
+
+    output = process_s3_file(json_input)
+
+    lines = gzip.decompress(output.getvalue()).decode().splitlines()
+    assert [json.loads(line) for line in lines] == [
+        {"id": 1, "name": "***"},
+        {"id": 2, "name": "***"},
+    ]
+
+
+def test_process_s3_file_gzip_to_output_location(mock_s3_bucket):
+    """Test that uploaded output keeps the input compression."""
+    s3, bucket_name = mock_s3_bucket
+    s3.put_object(Bucket=bucket_name, Key="test.csv.gz", Body=gzip.compress(CSV_BODY))
+    json_input = json.dumps(
+        {
+            "file_to_obfuscate": f"s3://{bucket_name}/test.csv.gz",
+            "pii_fields": ["name"],
+            "engine": "raw",
+            "output_location": f"s3://{bucket_name}/out/test.csv.gz",
+        }
+    )
+
+    process_s3_file(json_input)
+
+    body = s3.get_object(Bucket=bucket_name, Key="out/test.csv.gz")["Body"].read()
+    assert gzip.decompress(body) == (
+        b"id,name,email\n1,***,alice@example.com\n2,***,bob@example.com\n"
+    )
+
+
+@pytest.mark.parametrize(
+    "source_key, output_key, pii_fields",
+    [
+        ("test.csv.gz", "out/test.csv", ["name"]),
+        ("test.csv", "out/test.csv.gz", ["name"]),
+        ("test.csv.gz", "out/test.csv.bz2", ["name"]),
+        # Files without PII fields are recompressed rather than copied
+        ("test.csv.gz", "out/test.csv", ["missing"]),
+    ],
+)
+@pytest.mark.parametrize("options", [{}, {"mode": "stream"}, {"engine": "raw"}])
+def test_process_s3_file_output_compression_from_location(
+    mock_s3_bucket, source_key, output_key, pii_fields, options
+):
+    """Test that an uploaded output is compressed as its own key says."""
+    s3, bucket_name = mock_s3_bucket
+    body = gzip.compress(CSV_BODY) if source_key.endswith(".gz") else CSV_BODY
+    s3.put_object(Bucket=bucket_name, Key=source_key, Body=body)
+    json_input = json.dumps(
+        {
+            "file_to_obfuscate": f"s3://{bucket_name}/{source_key}",
+            "pii_fields": pii_fields,
+            "output_location": f"s3://{bucket_name}/{output_key}",
+            **options,
+        }
+    )
+
+    process_s3_file(json_input)
+
+    result = s3.get_object(Bucket=bucket_name, Key=output_key)["Body"].read()
+    if output_key.endswith(".gz"):
+        result = gzip.decompress(result)
+    elif output_key.endswith(".bz2"):
+        result = bz2.decompress(result)
+    expected = pd.read_csv(io.BytesIO(CSV_BODY))
+    if pii_fields == ["name"]:
+        expected["name"] = "***"
+    pd.testing.assert_frame_equal(pd.read_csv(io.BytesIO(result)), expected)
+
+
+def test_process_s3_file_compressed_parquet_output_unsupported():
+    """Test that Parquet outputs cannot have a compression extension."""
+    json_input = json.dumps(
+        {
+            "file_to_obfuscate": "s3://bucket/file.csv",
+            "output_format": "parquet",
+            "output_location": "s3://bucket/out/file.parquet.gz",
+        }
+    )
+
+    with pytest.raises(ValueError, match="Compressed parquet files are not supported"):
+        process_s3_file(json_input)
+
+
+def test_process_s3_file_corrupt_gzip(mock_s3_bucket):
+    """Test that a corrupt compressed file fails cleanly."""
+    s3, bucket_name = mock_s3_bucket
+    s3.put_object(Bucket=bucket_name, Key="test.csv.gz", Body=b"not gzip")
+    json_input = json.dumps(
+        {
+            "file_to_obfuscate": f"s3://{bucket_name}/test.csv.gz",
+            "pii_fields": ["name"],
+            "mode": "stream",
+        }
+    )
+
+    with pytest.raises(RuntimeError, match="Invalid gzip data"):
+        process_s3_file(json_input)
+
+
+def test_process_s3_file_compressed_parquet_unsupported():
+    """Test that compressed Parquet files are rejected."""
+    json_input = json.dumps({"file_to_obfuscate": "s3://bucket/file.parquet.gz"})
+
+    with pytest.raises(ValueError, match="Compressed parquet files are not supported"):
+        process_s3_file(json_input)
+
+
+def _token(value: str) -> str:
+    """Return the HMAC token of a value under the test key."""
+    import hashlib
+    import hmac
+
+    return hmac.new(b"secret", value.encode(), hashlib.sha256).hexdigest()[:32]
+
+
+@pytest.mark.parametrize(
+    "options",
+    [
+        {},
+        {"mode": "stream", "chunk_size": 1},
+        {"engine": "raw"},
+        {"mode": "parallel", "processes": 2},
+    ],
+)
+def test_process_s3_file_hmac_csv(mock_s3_bucket, options):
+    """Test that hmac fields get the same tokens in every mode and engine."""
+    s3, bucket_name = mock_s3_bucket
+    s3.put_object(Bucket=bucket_name, Key="test.csv", Body=CSV_BODY)
+    json_input = json.dumps(
+        {
+            "file_to_obfuscate": f"s3://{bucket_name}/test.csv",
+            "pii_fields": {"name": "mask", "email": "hmac"},
+            "hmac_key": "secret",
+            **options,
+        }
+    )
+
+    df = pd.read_csv(io.BytesIO(process_s3_file(json_input).getvalue()))
+
+    assert df["name"].tolist() == ["***", "***"]
+    assert df["email"].tolist() == [
+        _token("alice@example.com"),
+        _token("bob@example.com"),
+    ]
+
+
+TOKEN_OPTIONS = [
+    {},
+    {"mode": "stream", "chunk_size": 1},
+    {"engine": "raw"},
+    {"engine": "pyarrow"},
+]
+
+
+@pytest.mark.parametrize(
+    "options", TOKEN_OPTIONS + [{"mode": "parallel", "processes": 2}]
+)
+def test_process_s3_file_hmac_csv_numbers(mock_s3_bucket, options):
+    """Test that numeric fields are tokenised from their text in every mode
+    and engine, rather than from a type inferred per file or chunk."""
+    s3, bucket_name = mock_s3_bucket
+    body = b"id,account\n1,007\n2,\n3,1.50\n"
+    s3.put_object(Bucket=bucket_name, Key="test.csv", Body=body)
+    json_input = json.dumps(
+        {
+            "file_to_obfuscate": f"s3://{bucket_name}/test.csv",
+            "pii_fields": {"account": "hmac"},
+            "hmac_key": "secret",
+            **options,
+        }
+    )
+
+    output = process_s3_file(json_input).getvalue()
+    df = pd.read_csv(io.BytesIO(output), dtype=str)
+
+    assert df["id"].tolist() == ["1", "2", "3"]
+    assert df["account"].fillna("").tolist() == [_token("007"), "", _token("1.50")]
+
+
+@pytest.mark.parametrize("options", TOKEN_OPTIONS)
+def test_process_s3_file_hmac_json_numbers(mock_s3_bucket, options):
+    """Test that JSON values other than strings are tokenised from the same
+    text in every mode and engine."""
+    s3, bucket_name = mock_s3_bucket
+    records = [
+        {"id": 1, "account": 123},
+        {"id": 2, "account": None},
+        {"id": 3, "account": True},
+        {"id": 4, "account": {"a": [1, 2]}},
+    ]
+    s3.put_object(Bucket=bucket_name, Key="test.json", Body=json.dumps(records))
+    json_input = json.dumps(
+        {
+            "file_to_obfuscate": f"s3://{bucket_name}/test.json",
+            "pii_fields": {"account": "hmac"},
+            "hmac_key": "secret",
+            **options,
+        }
+    )
+
+    output = process_s3_file(json_input).getvalue().decode()
+    if output.startswith("["):
+        result = json.loads(output)
+    else:
+        result = [json.loads(line) for line in output.splitlines()]
+
+    assert [record["account"] for record in result] == [
+        _token("123"),
+        None,
+        _token("true"),
+        _token('{"a":[1,2]}'),
+    ]
+
+
+@pytest.mark.parametrize("mode", ["memory", "stream"])
+def test_process_s3_file_hmac_parquet(mock_s3_bucket, mode, monkeypatch):
+    """Test that tokenised Parquet columns are read and tokenised."""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    monkeypatch.setenv("OBFUSCATOR_HMAC_KEY", "secret")
+    s3, bucket_name = mock_s3_bucket
+    table = pa.table(
+        {"id": [1, 2, 3], "name": ["Alice", "Bob", "Alice"], "city": ["a", "b", None]}
+    )
+    with io.BytesIO() as f:
+        pq.write_table(table, f, row_group_size=2)
+        s3.put_object(Bucket=bucket_name, Key="test.parquet", Body=f.getvalue())
+    json_input = json.dumps(
+        {
+            "file_to_obfuscate": f"s3://{bucket_name}/test.parquet",
+            "pii_fields": {"name": "hmac", "city": "mask"},
+            "mode": mode,
+        }
+    )
+
+    result = pq.read_table(io.BytesIO(process_s3_file(json_input).getvalue()))
+
+    assert result.column("id").to_pylist() == [1, 2, 3]
+    assert result.column("name").to_pylist() == [
+        _token("Alice"),
+        _token("Bob"),
+        _token("Alice"),
+    ]
+    assert result.column("city").to_pylist() == ["***"] * 3
+
+
+@pytest.mark.parametrize("mode", ["memory", "stream"])
+def test_process_s3_file_hmac_json(mock_s3_bucket, mode):
+    """Test that hmac fields are tokenised in JSON files."""
+    s3, bucket_name = mock_s3_bucket
+    records = [{"id": 1, "email": "a@example.com"}, {"id": 2, "email": None}]
+    s3.put_object(Bucket=bucket_name, Key="test.json", Body=json.dumps(records))
+    json_input = json.dumps(
+        {
+            "file_to_obfuscate": f"s3://{bucket_name}/test.json",
+            "pii_fields": {"email": "hmac"},
+            "hmac_key": "secret",
+            "mode": mode,
+        }
+    )
+
+    output = process_s3_file(json_input).getvalue().decode()
+    result = [json.loads(line) for line in output.splitlines()]
+
+    assert result == [
+        {"id": 1, "email": _token("a@example.com")},
+        {"id": 2, "email": None},
+    ]
+
+
+@pytest.mark.parametrize(
+    "pii_fields, message",
+    [
+        ({"name": "scramble"}, "Unsupported obfuscation strategy for name"),
+        ({"name": "hmac"}, "HMAC tokenisation requires a key"),
+    ],
+)
+def test_process_s3_file_invalid_strategies(pii_fields, message, monkeypatch):
+    """Test validation of per-field obfuscation strategies."""
+    monkeypatch.delenv("OBFUSCATOR_HMAC_KEY", raising=False)
+    json_input = json.dumps(
+        {"file_to_obfuscate": "s3://bucket/file.csv", "pii_fields": pii_fields}
+    )
+    with pytest.raises(ValueError, match=message):
+        process_s3_file(json_input)
+
+
+@pytest.mark.parametrize(
+    "options",
+    [
+        {},
+        {"mode": "stream", "chunk_size": 1},
+        {"engine": "raw"},
+        {"mode": "parallel", "processes": 2},
+    ],
+)
+def test_process_s3_file_partial_masks_csv(mock_s3_bucket, options):
+    """Test that partial masks give the same output in every mode and engine."""
+    s3, bucket_name = mock_s3_bucket
+    body = b'id,phone,email\n1,0770-0900-1234,alice@example.com\n2,"12, 34",bob\n'
+    s3.put_object(Bucket=bucket_name, Key="test.csv", Body=body)
+    json_input = json.dumps(
+        {
+            "file_to_obfuscate": f"s3://{bucket_name}/test.csv",
+            "pii_fields": {
+                "phone": {"strategy": "keep_last", "n": 4},
+                "email": "email_domain",
+            },
+            **options,
+        }
+    )
+
+    output = process_s3_file(json_input).getvalue()
+
+    assert output == (
+        b'id,phone,email\n1,****-****-1234,***@example.com\n2,"**, 34",***\n'
+    )
+
+
+@pytest.mark.parametrize("mode", ["memory", "stream"])
+def test_process_s3_file_partial_masks_parquet(mock_s3_bucket, mode):
+    """Test that masked Parquet columns are read and masked."""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    s3, bucket_name = mock_s3_bucket
+    table = pa.table({"id": [1, 2], "phone": [7700900123, None]})
+    with io.BytesIO() as f:
+        pq.write_table(table, f, row_group_size=1)
+        s3.put_object(Bucket=bucket_name, Key="test.parquet", Body=f.getvalue())
+    json_input = json.dumps(
+        {
+            "file_to_obfuscate": f"s3://{bucket_name}/test.parquet",
+            "pii_fields": {"phone": "keep_last"},
+            "mode": mode,
+        }
+    )
+
+    result = pq.read_table(io.BytesIO(process_s3_file(json_input).getvalue()))
+
+    assert result.column("phone").to_pylist() == ["******0123", None]
+
+
+NO_PII_CSV = b"account,balance\n00123,1.10\n00456,2.50\n"
+
+
+@pytest.mark.parametrize(
+    "options", [{}, {"mode": "stream"}, {"engine": "raw"}, {"mode": "parallel"}]
+)
+def test_process_s3_file_without_pii_fields(mock_s3_bucket, options):
+    """Test that files without PII fields are returned untouched."""
+    s3, bucket_name = mock_s3_bucket
+    s3.put_object(Bucket=bucket_name, Key="test.csv", Body=NO_PII_CSV)
+    json_input = json.dumps(
+        {
+            "file_to_obfuscate": f"s3://{bucket_name}/test.csv",
+            "pii_fields": ["name", "email"],
+            **options,
+        }
+    )
+
+    output, report = process_s3_file_with_metrics(json_input)
+
+    # Parsing would have dropped the leading zeros
+    assert output.getvalue() == NO_PII_CSV
+    assert set(report.stages) == {"probe", "download"}
+    assert report.bytes_out == len(NO_PII_CSV)
+
+
+def test_process_s3_file_without_pii_fields_copies_to_output(mock_s3_bucket):
+    """Test that files without PII fields are copied within S3."""
+    s3, bucket_name = mock_s3_bucket
+    body = gzip.compress(NO_PII_CSV)
+    s3.put_object(Bucket=bucket_name, Key="test.csv.gz", Body=body)
+    copies = []
+    s3_client = get_s3_client()
+    s3_client.meta.events.register(
+        "before-parameter-build.s3.CopyObject", lambda **kwargs: copies.append(1)
+    )
+    json_input = json.dumps(
+        {
+            "file_to_obfuscate": f"s3://{bucket_name}/test.csv.gz",
+            "pii_fields": ["name"],
+            "output_location": f"s3://{bucket_name}/out/test.csv.gz",
+        }
+    )
+
+    output, report = process_s3_file_with_metrics(json_input)
+
+    assert output == f"s3://{bucket_name}/out/test.csv.gz"
+    assert copies == [1]
+    result = s3.get_object(Bucket=bucket_name, Key="out/test.csv.gz")["Body"].read()
+    assert result == body
+    assert set(report.stages) == {"probe", "upload"}
+    assert report.bytes_out == len(body)
+
+
+def test_stream_s3_file_without_pii_fields(mock_s3_bucket):
+    """Test that streams of files without PII fields are the original bytes."""
+    s3, bucket_name = mock_s3_bucket
+    buffer = io.BytesIO()
+    pd.DataFrame({"id": [1, 2], "city": ["Leeds", "York"]}).to_parquet(buffer)
+    s3.put_object(Bucket=bucket_name, Key="test.parquet", Body=buffer.getvalue())
+    json_input = json.dumps(
+        {
+            "file_to_obfuscate": f"s3://{bucket_name}/test.parquet",
+            "pii_fields": ["name"],
+            "mode": "stream",
+        }
+    )
+
+    assert b"".join(stream_s3_file(json_input)) == buffer.getvalue()
+
+
+@pytest.mark.parametrize(
+    "options, expected",
+    [
+        # The top-level key of a nested path is present
+        ({"pii_fields": ["customer.email"], "engine": "raw"}, b'"***"'),
+        ({"pii_fields": ["customer.phone"], "engine": "raw"}, b'"a@example.com"'),
+        ({"pii_fields": ["email"], "engine": "raw"}, b'"a@example.com"'),
+        # Without the probe, the file is parsed and written out again
+        (
+            {"pii_fields": ["phone"], "probe_fields": False, "mode": "stream"},
+            b'"customer":{"email":"a@example.com"}',
+        ),
+    ],
+)
+def test_process_s3_file_probe_json(mock_s3_bucket, options, expected):
+    """Test that JSON probes compare the top-level keys of every record."""
+    s3, bucket_name = mock_s3_bucket
+    body = b'{"id": 1}\n{"id": 2, "customer": {"email": "a@example.com"}}\n'
+    s3.put_object(Bucket=bucket_name, Key="test.json", Body=body)
+    json_input = json.dumps(
+        {"file_to_obfuscate": f"s3://{bucket_name}/test.json", **options}
+    )
+
+    output = process_s3_file(json_input).getvalue()
+
+    assert expected in output
+
+
+def test_process_s3_file_invalid_probe_fields():
+    """Test validation of the probe_fields option."""
+    json_input = json.dumps(
+        {"file_to_obfuscate": "s3://bucket/file.csv", "probe_fields": "yes"}
+    )
+    with pytest.raises(ValueError, match="probe_fields must be true or false"):
+        process_s3_file(json_input)
+
+
+@pytest.mark.parametrize(
+    "options",
+    [
+        {},
+        {"mode": "stream"},
+        {"engine": "raw"},
+        {"mode": "parallel", "processes": 1},
+    ],
+)
+@pytest.mark.parametrize("scheme", ["", "file://"])
+def test_process_local_csv(tmp_path, options, scheme):
+    """Test that local CSV files are obfuscated without S3."""
+    path = tmp_path / "test.csv"
+    path.write_bytes(b"id,name\n1,Alice\n2,Bob\n")
+
+    json_input = json.dumps(
+        {"file_to_obfuscate": f"{scheme}{path}", "pii_fields": ["name"], **options}
+    )
+
+    output, report = process_s3_file_with_metrics(json_input)
+
+    assert output.getvalue() == b"id,name\n1,***\n2,***\n"
+    assert report.s3_uri == f"{scheme}{path}"
+
+
+@pytest.mark.parametrize("mode", ["memory", "stream"])
+def test_process_local_parquet_and_gzip_json(tmp_path, mode):
+    """Test local Parquet and compressed JSON files in each mode."""
+    parquet_path = tmp_path / "test.parquet"
+    pd.DataFrame({"id": [1, 2], "name": ["Alice", "Bob"]}).to_parquet(
+        parquet_path, index=False
+    )
+    json_path = tmp_path / "test.json.gz"
+    json_path.write_bytes(gzip.compress(b'[{"id": 1, "name": "Alice"}]'))
+
+    parquet = process_s3_file(
+        json.dumps(
+            {
+                "file_to_obfuscate": str(parquet_path),
+                "pii_fields": ["name"],
+                "mode": mode,
+            }
+        )
+    )
+    json_output = process_s3_file(
+        json.dumps(
+            {"file_to_obfuscate": str(json_path), "pii_fields": ["name"], "mode": mode}
+        )
+    )
+
+    assert pd.read_parquet(parquet)["name"].tolist() == ["***", "***"]
+    output = gzip.decompress(json_output.getvalue())
+    assert json.loads(output) == {"id": 1, "name": "***"}
+
+
+@mock_aws
+@pytest.mark.parametrize("pii_fields", [["name"], ["email"]])
+def test_process_local_file_to_and_from_s3(mock_s3_bucket, tmp_path, pii_fields):
+    """Test local outputs, and copies between S3 and local files."""
+    s3, bucket_name = mock_s3_bucket
+    path = tmp_path / "test.csv"
+    path.write_bytes(b"id,name\n1,Alice\n")
+    s3.put_object(Bucket=bucket_name, Key="test.csv", Body=b"id,name\n1,Alice\n")
+    expected = b"id,name\n1,***\n" if pii_fields == ["name"] else path.read_bytes()
+
+    to_s3 = process_s3_file(
+        json.dumps(
+            {
+                "file_to_obfuscate": str(path),
+                "pii_fields": pii_fields,
+                "output_location": f"s3://{bucket_name}/masked/test.csv",
+            }
+        )
+    )
+    to_local = process_s3_file(
+        json.dumps(
+            {
+                "file_to_obfuscate": f"s3://{bucket_name}/test.csv",
+                "pii_fields": pii_fields,
+                "output_location": f"file://{tmp_path}/masked.csv",
+            }
+        )
+    )
+
+    body = s3.get_object(Bucket=bucket_name, Key="masked/test.csv")["Body"].read()
+    assert to_s3 == f"s3://{bucket_name}/masked/test.csv"
+    assert body == expected
+    assert to_local == f"file://{tmp_path}/masked.csv"
+    assert (tmp_path / "masked.csv").read_bytes() == expected
+
+
+@pytest.mark.parametrize("options", [{}, {"mode": "stream"}, {"engine": "raw"}])
+def test_process_local_file_missing(tmp_path, options):
+    """Test that a missing local file raises a RuntimeError."""
+    json_input = json.dumps(
+        {
+            "file_to_obfuscate": str(tmp_path / "missing.csv"),
+            "pii_fields": ["name"],
+            "probe_fields": False,
+            **options,
+        }
+    )
+
+    with pytest.raises(RuntimeError, match="No such file"):
+        process_s3_file(json_input)
+
+
+@mock_aws
+@pytest.mark.parametrize(
+    "options",
+    [{}, {"mode": "stream"}, {"engine": "raw"}, {"pii_fields": ["email"]}],
+)
+@pytest.mark.parametrize("key", ["test.csv", "test.csv.gz"])
+def test_process_s3_file_spills_large_outputs(mock_s3_bucket, tmp_path, options, key):
+    """Test that outputs above spill_threshold are spooled to spill_dir."""
+    s3, bucket_name = mock_s3_bucket
+    csv_data = b"id,name\n" + b"".join(b"%d,Person %d\n" % (i, i) for i in range(500))
+    body = gzip.compress(csv_data) if key.endswith(".gz") else csv_data
+    s3.put_object(Bucket=bucket_name, Key=key, Body=body)
+    json_input = json.dumps(
+        {
+            "file_to_obfuscate": f"s3://{bucket_name}/{key}",
+            "pii_fields": ["name"],
+            "spill_threshold": 1024,
+            "spill_dir": str(tmp_path),
+            **options,
+        }
+    )
+
+    output, report = process_s3_file_with_metrics(json_input)
+
+    data = output.getvalue()
+    if key.endswith(".gz"):
+        data = gzip.decompress(data)
+    if options.get("pii_fields") == ["email"]:
+        assert data == csv_data
+    else:
+        assert data == b"id,name\n" + b"".join(b"%d,***\n" % i for i in range(500))
+    assert output.spilled
+    assert report.bytes_out == output.getbuffer().nbytes
+    assert output.tell() == 0
+
+
+@mock_aws
+def test_process_s3_file_small_outputs_stay_in_memory(mock_s3_bucket):
+    """Test that outputs within spill_threshold are not spooled."""
+    s3, bucket_name = mock_s3_bucket
+    s3.put_object(Bucket=bucket_name, Key="test.csv", Body=b"id,name\n1,Alice\n")
+    json_input = json.dumps(
+        {
+            "file_to_obfuscate": f"s3://{bucket_name}/test.csv",
+            "pii_fields": ["name"],
+            "spill_threshold": 1024,
+        }
+    )
+
+    output = process_s3_file(json_input)
+
+    assert not output.spilled
+    assert output.getvalue() == b"id,name\n1,***\n"
+
+
+@pytest.mark.parametrize(
+    "options, message",
+    [
+        ({"spill_threshold": -1}, "spill_threshold must be a non-negative integer"),
+        ({"spill_threshold": "1MB"}, "spill_threshold must be a non-negative integer"),
+        ({"spill_dir": "/no/such/dir"}, "spill_dir must be an existing directory"),
+    ],
+)
+def test_process_s3_file_invalid_spill_options(options, message):
+    """Test validation of the spill options."""
+    json_input = json.dumps(
+        {"file_to_obfuscate": "s3://bucket/file.csv", "pii_fields": [], **options}
+    )
+    with pytest.raises(ValueError, match=message):
+        process_s3_file(json_input)
+
+
+def _auto_input(bucket_name: str, **options) -> str:
+    return json.dumps(
+        {
+            "file_to_obfuscate": f"s3://{bucket_name}/test.csv",
+            "pii_fields": ["name", "email"],
+            "mode": "auto",
+            **options,
+        }
+    )
+
+
+def test_process_s3_file_auto_mode_small_file(mock_s3_bucket):
+    """Test that small files are processed in memory in auto mode."""
+    s3, bucket_name = mock_s3_bucket
+    s3.put_object(Bucket=bucket_name, Key="test.csv", Body=CSV_BODY)
+
+    output, report = process_s3_file_with_metrics(_auto_input(bucket_name))
+
+    assert report.mode == "memory"
+    assert isinstance(output, io.BytesIO)
+    assert pd.read_csv(output)["name"].tolist() == ["***", "***"]
+
+
+def test_process_s3_file_auto_mode_large_file(mock_s3_bucket, tmp_path):
+    """Test that files too large for the budget are streamed and spilled."""
+    s3, bucket_name = mock_s3_bucket
+    s3.put_object(Bucket=bucket_name, Key="test.csv", Body=CSV_BODY)
+    expected = process_s3_file(
+        json.dumps(
+            {
+                "file_to_obfuscate": f"s3://{bucket_name}/test.csv",
+                "pii_fields": ["name", "email"],
+            }
+        )
+    ).getvalue()
+
+    output, report = process_s3_file_with_metrics(
+        _auto_input(
+            bucket_name, memory_budget=len(CSV_BODY), spill_dir=str(tmp_path)
+        )
+    )
+
+    assert report.mode == "stream"
+    assert output.spilled
+    assert output.getvalue() == expected
+
+
+def test_process_s3_file_auto_mode_uploads_without_spilling(mock_s3_bucket):
+    """Test that uploaded outputs are streamed without a spill file."""
+    s3, bucket_name = mock_s3_bucket
+    s3.put_object(Bucket=bucket_name, Key="test.csv", Body=CSV_BODY)
+
+    output, report = process_s3_file_with_metrics(
+        _auto_input(
+            bucket_name,
+            memory_budget=len(CSV_BODY),
+            output_location=f"s3://{bucket_name}/masked.csv",
+        )
+    )
+
+    body = s3.get_object(Bucket=bucket_name, Key="masked.csv")["Body"].read()
+    assert output == f"s3://{bucket_name}/masked.csv"
+    assert report.mode == "stream"
+    assert pd.read_csv(io.BytesIO(body))["email"].tolist() == ["***", "***"]
+
+
+@pytest.mark.parametrize("engine", ["pandas", "pyarrow"])
+@pytest.mark.parametrize("memory_budget", [None, 64])
+def test_process_s3_file_auto_mode_json_lines(mock_s3_bucket, engine, memory_budget):
+    """Test that JSON Lines files give the same output in memory and stream
+    mode, whichever their size selects."""
+    s3, bucket_name = mock_s3_bucket
+    body = b'{"id": 1, "name": "Ann"}\n{"id": 2, "name": "Bob"}\n'
+    s3.put_object(Bucket=bucket_name, Key="test.json", Body=body)
+    options = {"engine": engine}
+    if memory_budget is not None:
+        options["memory_budget"] = memory_budget
+
+    output, report = process_s3_file_with_metrics(
+        json.dumps(
+            {
+                "file_to_obfuscate": f"s3://{bucket_name}/test.json",
+                "pii_fields": ["name"],
+                "mode": "auto",
+                **options,
+            }
+        )
+    )
+
+    assert report.mode == ("memory" if memory_budget is None else "stream")
+    assert output.getvalue() == (
+        b'{"id":1,"name":"***"}\n{"id":2,"name":"***"}\n'
+    )
+
+
+def test_process_s3_file_invalid_json(mock_s3_bucket):
+    """Test that a file that cannot be parsed fails rather than coming back
+    empty."""
+    s3, bucket_name = mock_s3_bucket
+    s3.put_object(Bucket=bucket_name, Key="test.json", Body=b'[{"id": 1,')
+
+    with pytest.raises(RuntimeError, match="Error parsing json file"):
+        process_s3_file(
+            json.dumps(
+                {
+                    "file_to_obfuscate": f"s3://{bucket_name}/test.json",
+                    "pii_fields": ["name"],
+                }
+            )
+        )
+
+
+def test_process_s3_file_auto_mode_missing_key(mock_s3_bucket):
+    """Test that a missing object fails in the planner like in other modes."""
+    _, bucket_name = mock_s3_bucket
+
+    with pytest.raises(RuntimeError, match="S3 Client Error"):
+        process_s3_file(_auto_input(bucket_name))
+
+
+@pytest.mark.parametrize("memory_budget", [0, "1GB"])
+def test_process_s3_file_invalid_memory_budget(memory_budget):
+    """Test validation of the memory budget."""
+    json_input = json.dumps(
+        {
+            "file_to_obfuscate": "s3://bucket/test.csv",
+            "pii_fields": ["name"],
+            "mode": "auto",
+            "memory_budget": memory_budget,
+        }
+    )
+
+    with pytest.raises(ValueError, match="memory_budget must be a positive integer"):
+        process_s3_file(json_input)
+
+
+@pytest.mark.parametrize("options", [{}, {"mode": "stream"}, {"engine": "raw"}])
+def test_process_s3_file_bom_and_quoted_header(mock_s3_bucket, options):
+    """Test that an Excel-style header is probed and obfuscated, not passed
+    through."""
+    s3, bucket_name = mock_s3_bucket
+    body = b'\xef\xbb\xbf"name","email",id\r\nBob,bob@example.com,1\r\n'
+    s3.put_object(Bucket=bucket_name, Key="excel.csv", Body=body)
+
+    output = process_s3_file(
+        json.dumps(
+            {
+                "file_to_obfuscate": f"s3://{bucket_name}/excel.csv",
+                "pii_fields": ["name", "email"],
+                **options,
+            }
+        )
+    )
+
+    assert b"Bob" not in output.getvalue()
+    assert b"bob@example.com" not in output.getvalue()
@@ -133,3 +133,78 @@ def test_read_file_nonexistent_key(mock_s3_bucket):
 
     with pytest.raises(RuntimeError, match="S3 Client Error: An error occurred"):
         read_file(bucket_name, object_key, "csv")
+
+
+@mock_aws
+def test_read_file_parquet_skips_pii_columns(mock_s3_bucket):
+    """Test that Parquet PII columns are returned as '***' in place."""
+    s3, bucket_name = mock_s3_bucket
+    object_key = "test.parquet"
+
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    table = pa.table(
+        {
+            "name": ["Alice", "Bob"],
+            "age": [25, 30],
+            "email": ["alice@example.com", "bob@example.com"],
+        }
+    )
+    with io.BytesIO() as f:
+        pq.write_table(table, f)
+        s3.put_object(Bucket=bucket_name, Key=object_key, Body=f.getvalue())
+
+    df = read_file(bucket_name, object_key, "parquet", ["name", "email"])
+
+    assert list(df.columns) == ["name", "age", "email"]
+    assert list(df["name"]) == ["***", "***"]
+    assert list(df["email"]) == ["***", "***"]
+    assert list(df["age"]) == [25, 30]
+
+
+@pytest.mark.parametrize("valid", [True, False])
+def test_read_file_parquet_closes_source(mock_s3_bucket, monkeypatch, valid):
+    """Test that the file Parquet is read from is closed, even on errors."""
+    s3, bucket_name = mock_s3_bucket
+    object_key = "test.parquet"
+
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    import obfuscator.read_file as read_file_module
+
+    with io.BytesIO() as f:
+        pq.write_table(pa.table({"name": ["Alice"]}), f)
+        body = f.getvalue() if valid else b"not a parquet file"
+    s3.put_object(Bucket=bucket_name, Key=object_key, Body=body)
+    open_source = read_file_module.open_arrow_file
+    sources = []
+
+    def open_arrow_file(*args):
+        sources.append(open_source(*args))
+        return sources[-1]
+
+    monkeypatch.setattr(read_file_module, "open_arrow_file", open_arrow_file)
+
+    if valid:
+        read_file(bucket_name, object_key, "parquet")
+    else:
+        with pytest.raises(RuntimeError):
+            read_file(bucket_name, object_key, "parquet")
+
+    assert len(sources) == 1
+    assert sources[0].closed
+
+
+@mock_aws
+def test_read_file_csv_in_byte_ranges(mock_s3_bucket):
+    """Test reading a CSV file larger than one download part."""
+    s3, bucket_name = mock_s3_bucket
+    object_key = "test.csv"
+    rows = "\n".join(f"{i},Name {i},user{i}@example.com" for i in range(200))
+    s3.put_object(Bucket=bucket_name, Key=object_key, Body=f"id,name,email\n{rows}\n")
+
+    df = read_file(bucket_name, object_key, "csv", part_size=512, max_concurrency=3)
+
+    assert df.shape == (200, 3)
+    assert df.iloc[199]["email"] == "user199@example.com"
@@ -0,0 +1,71 @@
+import pytest
+import threading
+import boto3
+from moto import mock_aws
+from obfuscator.s3_client import (
+    get_s3_client,
+    configure_s3_client,
+    set_s3_client,
+)
+from obfuscator.read_file import read_file
+
+
+def test_get_s3_client_is_cached():
+    """Test that the same client is returned on every call."""
+    assert get_s3_client() is get_s3_client()
+
+
+def test_get_s3_client_is_shared_across_threads():
+    """Test that concurrent first calls create a single client."""
+    clients = []
+    threads = [
+        threading.Thread(target=lambda: clients.append(get_s3_client()))
+        for _ in range(8)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len({id(client) for client in clients}) == 1
+
+
+def test_configure_s3_client():
+    """Test that pool and retry options are applied to a new client."""
+    old_client = get_s3_client()
+    configure_s3_client(max_pool_connections=64, max_attempts=3, retry_mode="adaptive")
+    client = get_s3_client()
+
+    assert client is not old_client
+    assert client.meta.config.max_pool_connections == 64
+    assert client.meta.config.retries["total_max_attempts"] == 3
+    assert client.meta.config.retries["mode"] == "adaptive"
+
+
+def test_configure_s3_client_invalid_options():
+    """Test that invalid options are rejected."""
+    with pytest.raises(ValueError, match="max_pool_connections"):
+        configure_s3_client(max_pool_connections=0)
+    with pytest.raises(ValueError, match="Unsupported retry mode"):
+        configure_s3_client(retry_mode="sometimes")
+
+
+@mock_aws
+def test_set_s3_client_is_used_for_reads():
+    """Test that an injected client is used by read_file."""
+    s3 = boto3.client("s3", region_name="eu-west-2")
+    s3.create_bucket(
+        Bucket="mock-bucket",
+        CreateBucketConfiguration={"LocationConstraint": "eu-west-2"},
+    )
+    s3.put_object(Bucket="mock-bucket", Key="test.csv", Body="id,name\n1,Alice\n")
+
+    calls = []
+    s3.meta.events.register(
+        "before-call.s3.GetObject", lambda **kwargs: calls.append(kwargs)
+    )
+    set_s3_client(s3)
+    df = read_file("mock-bucket", "test.csv", "csv")
+
+    assert len(calls) == 1
+    assert df.iloc[0]["name"] == "Alice"
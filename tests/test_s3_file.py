@@ -0,0 +1,102 @@
+import pytest
+import io
+import boto3
+from moto import mock_aws
+from obfuscator.s3_file import S3File, MemoryFile, download_object
+
+
+@pytest.fixture(scope="function")
+def mock_s3_bucket():
+    """Fixture to create and return a mock S3 bucket."""
+    with mock_aws():
+        s3 = boto3.client("s3", region_name="eu-west-2")
+        bucket_name = "mock-bucket"
+        s3.create_bucket(
+            Bucket=bucket_name,
+            CreateBucketConfiguration={"LocationConstraint": "eu-west-2"},
+        )
+        yield s3, bucket_name
+
+
+@pytest.fixture
+def object_content():
+    """Fixture to provide object content that is not uniform."""
+    return bytes(range(256)) * 40 + b"tail"
+
+
+def _count_calls(s3_client, operation):
+    """Record every call of an S3 operation made through a client."""
+    calls = []
+    s3_client.meta.events.register(
+        f"before-parameter-build.s3.{operation}", lambda **kwargs: calls.append(kwargs)
+    )
+    return calls
+
+
+def test_s3_file_seek_and_read(mock_s3_bucket, object_content):
+    """Test that S3File serves reads from ranged GETs."""
+    s3, bucket_name = mock_s3_bucket
+    s3.put_object(Bucket=bucket_name, Key="data.bin", Body=object_content)
+
+    f = S3File(bucket_name, "data.bin", s3)
+    f.seek(-4, io.SEEK_END)
+
+    assert f.read() == b"tail"
+    f.seek(10)
+    assert f.read(5) == object_content[10:15]
+    assert f.tell() == 15
+    assert f.size == len(object_content)
+
+
+def test_download_object_parallel_ranges(mock_s3_bucket, object_content):
+    """Test that large objects are fetched in ranges and reassembled."""
+    s3, bucket_name = mock_s3_bucket
+    s3.put_object(Bucket=bucket_name, Key="data.bin", Body=object_content)
+    calls = _count_calls(s3, "GetObject")
+
+    data = download_object(
+        bucket_name, "data.bin", part_size=1000, max_concurrency=4, s3_client=s3
+    )
+
+    assert bytes(data) == object_content
+    assert len(calls) == 11
+    assert all("Range" in call["params"] for call in calls)
+
+
+def test_download_object_small_single_get(mock_s3_bucket):
+    """Test that objects within one part are fetched with a single GET."""
+    s3, bucket_name = mock_s3_bucket
+    s3.put_object(Bucket=bucket_name, Key="small.csv", Body=b"id\n1\n")
+    calls = _count_calls(s3, "GetObject")
+
+    data = download_object(bucket_name, "small.csv", part_size=1000, s3_client=s3)
+
+    assert data == b"id\n1\n"
+    assert len(calls) == 1
+    assert "Range" not in calls[0]["params"]
+
+
+def test_download_object_empty(mock_s3_bucket):
+    """Test downloading an empty object."""
+    s3, bucket_name = mock_s3_bucket
+    s3.put_object(Bucket=bucket_name, Key="empty.csv", Body=b"")
+
+    assert download_object(bucket_name, "empty.csv", s3_client=s3) == b""
+
+
+def test_download_object_invalid_options():
+    """Test that invalid download options are rejected."""
+    with pytest.raises(ValueError, match="part_size"):
+        download_object("bucket", "key", part_size=0)
+    with pytest.raises(ValueError, match="max_concurrency"):
+        download_object("bucket", "key", max_concurrency=0)
+
+
+def test_memory_file_reads_without_copying_buffer():
+    """Test that MemoryFile reads from a bytearray in place."""
+    buffer = bytearray(b"id,name\n1,Alice\n")
+    f = MemoryFile(buffer)
+
+    assert f.read(3) == b"id,"
+    buffer[3:7] = b"NAME"
+    assert f.read() == b"NAME\n1,Alice\n"
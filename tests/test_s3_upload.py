@@ -0,0 +1,105 @@
+import pytest
+import boto3
+from moto import mock_aws
+from obfuscator import s3_upload
+from obfuscator.s3_upload import S3MultipartWriter, MIN_PART_SIZE, copy_object
+
+
+@pytest.fixture(scope="function")
+def mock_s3_bucket():
+    """Fixture to create and return a mock S3 bucket."""
+    with mock_aws():
+        s3 = boto3.client("s3", region_name="eu-west-2")
+        bucket_name = "mock-bucket"
+        s3.create_bucket(
+            Bucket=bucket_name,
+            CreateBucketConfiguration={"LocationConstraint": "eu-west-2"},
+        )
+        yield s3, bucket_name
+
+
+def test_multipart_writer_uploads_parts(mock_s3_bucket):
+    """Test that writes larger than a part are uploaded as several parts."""
+    s3, bucket_name = mock_s3_bucket
+    chunk = b"x" * (1024 * 1024)
+
+    with S3MultipartWriter(bucket_name, "out.csv", part_size=MIN_PART_SIZE) as writer:
+        for i in range(11):
+            writer.write(chunk)
+
+    # Multipart ETags end with the number of parts
+    assert s3.head_object(Bucket=bucket_name, Key="out.csv")["ETag"].endswith('-3"')
+    body = s3.get_object(Bucket=bucket_name, Key="out.csv")["Body"].read()
+    assert body == chunk * 11
+
+
+def test_multipart_writer_buffers_one_part_of_a_large_write(
+    mock_s3_bucket, monkeypatch
+):
+    """Test that a whole output written at once is cut into parts without
+    being copied into the buffer whole."""
+    s3, bucket_name = mock_s3_bucket
+    data = bytes(range(256)) * (MIN_PART_SIZE * 2 // 256 + 100)
+    buffered = []
+    submit_part = S3MultipartWriter._submit_part
+
+    def record_part(self, part):
+        buffered.append(len(part))
+        submit_part(self, part)
+
+    monkeypatch.setattr(S3MultipartWriter, "_submit_part", record_part)
+    with S3MultipartWriter(bucket_name, "out.csv", part_size=MIN_PART_SIZE) as writer:
+        writer.write(memoryview(data))
+
+    assert buffered == [MIN_PART_SIZE, MIN_PART_SIZE, len(data) - 2 * MIN_PART_SIZE]
+    assert writer.bytes_written == len(data)
+    body = s3.get_object(Bucket=bucket_name, Key="out.csv")["Body"].read()
+    assert body == data
+
+
+def test_multipart_writer_small_output_uses_put_object(mock_s3_bucket):
+    """Test that output smaller than one part is uploaded in one request."""
+    s3, bucket_name = mock_s3_bucket
+
+    with S3MultipartWriter(bucket_name, "out.csv") as writer:
+        writer.write(b"id,name\n")
+        writer.write(b"1,***\n")
+
+    body = s3.get_object(Bucket=bucket_name, Key="out.csv")["Body"].read()
+    assert body == b"id,name\n1,***\n"
+    assert not s3.list_multipart_uploads(Bucket=bucket_name).get("Uploads")
+
+
+def test_multipart_writer_aborts_on_error(mock_s3_bucket):
+    """Test that the upload is aborted if the writer exits with an error."""
+    s3, bucket_name = mock_s3_bucket
+
+    with pytest.raises(KeyError):
+        with S3MultipartWriter(
+            bucket_name, "out.csv", part_size=MIN_PART_SIZE
+        ) as writer:
+            writer.write(b"x" * MIN_PART_SIZE)
+            raise KeyError("processing failed")
+
+    assert not s3.list_multipart_uploads(Bucket=bucket_name).get("Uploads")
+    assert "Contents" not in s3.list_objects_v2(Bucket=bucket_name)
+
+
+def test_multipart_writer_part_size_too_small():
+    """Test that parts smaller than the S3 minimum are rejected."""
+    with pytest.raises(ValueError, match="part_size must be at least"):
+        S3MultipartWriter("bucket", "key", part_size=1024)
+
+
+@pytest.mark.parametrize("max_copy_size", [s3_upload.MAX_COPY_SIZE, 0])
+def test_copy_object(mock_s3_bucket, monkeypatch, max_copy_size):
+    """Test that objects are copied within S3, part by part above the limit."""
+    s3, bucket_name = mock_s3_bucket
+    monkeypatch.setattr(s3_upload, "MAX_COPY_SIZE", max_copy_size)
+    s3.put_object(Bucket=bucket_name, Key="source.csv", Body=b"id\n1\n")
+
+    size = copy_object(bucket_name, "source.csv", bucket_name, "copy.csv")
+
+    assert size == 5
+    copy = s3.get_object(Bucket=bucket_name, Key="copy.csv")["Body"].read()
+    assert copy == b"id\n1\n"
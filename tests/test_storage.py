@@ -0,0 +1,133 @@
+import pytest
+import os
+from obfuscator.storage import (
+    LocalFile,
+    LocalFileWriter,
+    is_local,
+    local_path,
+    object_size,
+    open_arrow_file,
+    parse_location,
+    read_object,
+)
+
+
+@pytest.mark.parametrize(
+    "location, expected",
+    [
+        ("s3://bucket/file.csv", ("bucket", "file.csv")),
+        ("file:///data/file.csv", (None, "/data/file.csv")),
+        ("/data/file.csv", (None, "/data/file.csv")),
+        ("./file.csv", (None, "./file.csv")),
+        ("bucket/file.csv", ("bucket", "file.csv")),
+    ],
+)
+def test_parse_location(location, expected):
+    """Test that S3 URIs and local paths are told apart."""
+    assert parse_location(location) == expected
+
+
+def test_parse_location_existing_relative_path(tmp_path, monkeypatch):
+    """Test that bare relative paths are S3 URIs even if a file exists."""
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "bucket").mkdir()
+    (tmp_path / "bucket" / "file.csv").write_bytes(b"id\n1\n")
+
+    assert not is_local("bucket/file.csv")
+    assert parse_location("bucket/file.csv") == ("bucket", "file.csv")
+    assert is_local("./bucket/file.csv")
+    with pytest.raises(ValueError, match="Invalid S3 URI format"):
+        parse_location("invalid-uri")
+
+
+def test_local_path_expands_user(monkeypatch):
+    """Test that home directories are expanded."""
+    monkeypatch.setenv("HOME", "/home/user")
+
+    assert local_path("~/file.csv") == "/home/user/file.csv"
+    assert local_path("file://~/file.csv") == "/home/user/file.csv"
+
+
+def test_local_file(tmp_path):
+    """Test that local files are read through a memory map like S3 objects."""
+    path = tmp_path / "file.csv"
+    path.write_bytes(b"id,name\n1,Ann\n")
+
+    with LocalFile(str(path)) as file:
+        assert file.size == 14
+        assert file.read(3) == b"id,"
+        file.seek(-4, os.SEEK_END)
+        assert file.read() == b"Ann\n"
+        file.seek(0)
+        assert list(file.iter_chunks(8)) == [b"id,name\n", b"1,Ann\n"]
+
+
+def test_local_file_empty(tmp_path):
+    """Test that empty files, which cannot be mapped, read as empty."""
+    path = tmp_path / "empty.csv"
+    path.write_bytes(b"")
+
+    with LocalFile(str(path)) as file:
+        assert file.size == 0
+        assert file.read() == b""
+    assert read_object(None, str(path)) == b""
+
+
+def test_object_size_of_local_file(tmp_path):
+    """Test that local file sizes are read without opening the file."""
+    path = tmp_path / "file.csv"
+    path.write_bytes(b"id\n1\n")
+
+    assert object_size(None, str(path)) == 5
+    with pytest.raises(FileNotFoundError):
+        object_size(None, str(tmp_path / "missing.csv"))
+
+
+def test_read_object_maps_local_files(tmp_path):
+    """Test that local contents are returned without reading them into memory."""
+    path = tmp_path / "file.csv"
+    path.write_bytes(b"id\n1\n")
+
+    data = read_object(None, str(path))
+
+    assert not isinstance(data, bytes)
+    assert bytes(data) == b"id\n1\n"
+
+
+def test_open_arrow_file_is_memory_mapped(tmp_path):
+    """Test that pyarrow readers get a zero-copy memory map."""
+    import pyarrow as pa
+
+    path = tmp_path / "file.parquet"
+    path.write_bytes(b"PAR1")
+
+    with open_arrow_file(None, str(path)) as file:
+        assert isinstance(file, pa.MemoryMappedFile)
+
+
+def test_local_file_writer(tmp_path):
+    """Test that outputs appear only once complete."""
+    path = tmp_path / "out.csv"
+
+    with LocalFileWriter(str(path)) as writer:
+        writer.write(b"id,name\n")
+        writer.write(memoryview(b"1,***\n"))
+        assert not path.exists()
+
+    assert path.read_bytes() == b"id,name\n1,***\n"
+    assert writer.bytes_written == 14
+    assert os.listdir(tmp_path) == ["out.csv"]
+
+
+def test_local_file_writer_aborts_on_error(tmp_path):
+    """Test that a failed output leaves no file behind."""
+    path = tmp_path / "out.csv"
+    path.write_bytes(b"previous")
+
+    with pytest.raises(RuntimeError):
+        with LocalFileWriter(str(path)) as writer:
+            writer.write(b"partial")
+            raise RuntimeError("boom")
+
+    assert path.read_bytes() == b"previous"
+    assert os.listdir(tmp_path) == ["out.csv"]
@@ -0,0 +1,208 @@
+import pytest
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+from obfuscator.obfuscate_pii import obfuscate_pii, obfuscate_pii_arrow
+from obfuscator.strategies import (
+    KeepLast,
+    EmailDomain,
+    FixedWidth,
+    STRATEGIES,
+    TextMask,
+    build_strategy,
+    register_strategy,
+)
+from obfuscator.tokenise import HmacTokeniser
+
+VALUES = [
+    "0770-0900-1234",
+    "+44 7700 900123",
+    "jane.doe@example.com",
+    "odd@name@example.org",
+    "no-at-sign",
+    "Zoë Ångström",
+    "line\nbreak@example.com",
+    "123",
+    "",
+]
+
+
+@pytest.mark.parametrize(
+    "strategy, value, expected",
+    [
+        (KeepLast(), "0770-0900-1234", "****-****-1234"),
+        (KeepLast(), "+44 7700 900123", "+** **** **0123"),
+        (KeepLast(2), "Zoë", "*oë"),
+        (KeepLast(), "1234", "****"),
+        (KeepLast(0), "ab-12", "**-**"),
+        (EmailDomain(), "jane.doe@example.com", "***@example.com"),
+        (EmailDomain(), "odd@name@example.org", "***@example.org"),
+        (EmailDomain(), "no-at-sign", "***"),
+        (FixedWidth(), "Jane", "****"),
+        (FixedWidth(width=6), "Jane Doe", "******"),
+    ],
+)
+def test_mask_text(strategy, value, expected):
+    """Test the format of each mask."""
+    assert strategy.mask_text(value) == expected
+
+
+@pytest.mark.parametrize(
+    "strategy",
+    [KeepLast(), KeepLast(0), KeepLast(20), EmailDomain(), FixedWidth(), FixedWidth(3)],
+)
+def test_vectorised_masks_match_text_masks(strategy):
+    """Test that the Arrow kernels and the raw engine mask identically."""
+    result = strategy.obfuscate_arrow(pa.array(VALUES + [None]))
+
+    assert result.to_pylist() == [strategy.mask_text(v) for v in VALUES] + [None]
+
+
+@pytest.mark.parametrize("n", [0, 2, 4, 20])
+def test_keep_last_ascii_kernel_matches_text_masks(n):
+    """Test the byte-level kernel used for ASCII arrays, including slices."""
+    strategy = KeepLast(n)
+    values = ["skip", "0770-0900-1234", None, "", "ab", "a.b@c.io", "+44 (0) 1234"]
+
+    result = strategy.obfuscate_arrow(pa.array(values).slice(1))
+
+    assert result.to_pylist() == [
+        None if v is None else strategy.mask_text(v) for v in values[1:]
+    ]
+
+
+def test_obfuscate_arrow_dictionary_and_chunked_arrays():
+    """Test that dictionary arrays are masked through their dictionary."""
+    strategy = KeepLast()
+    values = ["0770-0900-1234", None, "0770-0900-1234"]
+
+    dictionary = strategy.obfuscate_arrow(pa.array(values).dictionary_encode())
+    chunked = strategy.obfuscate_arrow(pa.chunked_array([values[:1], values[1:]]))
+
+    expected = ["****-****-1234", None, "****-****-1234"]
+    assert dictionary.type == pa.string()
+    assert dictionary.to_pylist() == expected
+    assert chunked.to_pylist() == expected
+
+
+def test_obfuscate_series():
+    """Test that pandas columns of any type are masked as text."""
+    strategy = KeepLast(2)
+
+    strings = strategy.obfuscate_series(pd.Series(["abc", None], index=[3, 4]))
+    numbers = strategy.obfuscate_series(pd.Series([7700900123, 456]))
+    mixed = strategy.obfuscate_series(pd.Series([[1, 2], 12345, np.nan]))
+    categories = strategy.obfuscate_series(pd.Series(["abc", "abc"], dtype="category"))
+
+    assert strings.tolist() == ["*bc", None]
+    assert list(strings.index) == [3, 4]
+    assert numbers.tolist() == ["********23", "*56"]
+    assert mixed.tolist() == ["[*, 2]", "***45", None]
+    assert categories.tolist() == ["*bc", "*bc"]
+
+
+@pytest.mark.parametrize(
+    "strategy, field, expected",
+    [
+        (KeepLast(), b"0770-0900-1234", b"****-****-1234"),
+        (KeepLast(3), b'"Doe, Jane"', b'"***, *ane"'),
+        (EmailDomain(), b'"a,b"@example.com', b"***@example.com"),
+        (FixedWidth(), b"", b""),
+    ],
+)
+def test_obfuscate_field(strategy, field, expected):
+    """Test that raw fields are unquoted and quoted again when needed."""
+    assert strategy.obfuscate_field(field) == expected
+
+
+def test_obfuscate_pii_with_named_strategies():
+    """Test that obfuscate_pii accepts strategies as named in the input."""
+    df = pd.DataFrame(
+        {
+            "id": [1, 2],
+            "phone": ["0770-0900-1234", "0770-0900-5678"],
+            "email": ["a@example.com", "b@example.org"],
+            "name": ["Jane", "John"],
+        }
+    )
+
+    strategies = {"phone": {"strategy": "keep_last", "n": 4}, "email": "email_domain"}
+
+    result = obfuscate_pii(
+        df, ["phone", "email", "name"], copy=False, strategies=strategies
+    )
+
+    assert result["phone"].tolist() == ["****-****-1234", "****-****-5678"]
+    assert result["email"].tolist() == ["***@example.com", "***@example.org"]
+    assert result["name"].tolist() == ["***", "***"]
+    assert result["id"].tolist() == [1, 2]
+
+
+def test_obfuscate_pii_arrow_with_named_strategies():
+    """Test that Arrow data is masked with named strategies."""
+    batch = pa.record_batch({"id": [1], "phone": ["0770-0900-1234"]})
+
+    result = obfuscate_pii_arrow(batch, ["phone"], {"phone": "fixed_width"})
+
+    assert result.column(1).to_pylist() == ["**************"]
+
+
+def test_build_strategy():
+    """Test that strategies are created from their input."""
+    assert build_strategy("name", "mask") is None
+    assert isinstance(build_strategy("email", "email_domain"), EmailDomain)
+    assert build_strategy("phone", {"strategy": "keep_last", "n": 2}).n == 2
+    assert isinstance(
+        build_strategy("email", "hmac", hmac_key="secret"), HmacTokeniser
+    )
+
+
+@pytest.mark.parametrize(
+    "spec, message",
+    [
+        ("scramble", "Unsupported obfuscation strategy for field: scramble"),
+        ({"n": 4}, "Unsupported obfuscation strategy for field: None"),
+        ({"strategy": "keep_last", "m": 4}, "Invalid options for the keep_last"),
+        ({"strategy": "keep_last", "n": -1}, "n must be a non-negative integer"),
+        ({"strategy": "fixed_width", "width": 0}, "width must be a positive"),
+        ({"strategy": "mask", "n": 1}, "mask strategy of field takes no options"),
+    ],
+)
+def test_build_strategy_invalid(spec, message):
+    """Test validation of strategy names and options."""
+    with pytest.raises(ValueError, match=message):
+        build_strategy("field", spec)
+
+
+def test_register_strategy(monkeypatch):
+    """Test that new strategies are available by name once registered."""
+
+    class Upper(TextMask):
+        def mask_arrow(self, strings):
+            import pyarrow.compute as pc
+
+            return pc.utf8_upper(strings)
+
+        def mask_text(self, text):
+            return text.upper()
+
+    monkeypatch.setitem(STRATEGIES, "upper", None)
+    register_strategy("upper", Upper)
+
+    df = pd.DataFrame({"name": ["jane"]})
+    result = obfuscate_pii(df, ["name"], strategies={"name": "upper"})
+
+    assert result["name"].tolist() == ["JANE"]
+    with pytest.raises(ValueError, match="cannot be replaced"):
+        register_strategy("mask", Upper)
+
+
+def test_strategy_without_mask_text_cannot_be_created():
+    """Test that a strategy missing a method fails when it is created."""
+
+    class ArrowOnly(TextMask):
+        def mask_arrow(self, strings):
+            return strings
+
+    with pytest.raises(TypeError, match="abstract method '?mask_text"):
+        ArrowOnly()
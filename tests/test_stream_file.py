@@ -0,0 +1,308 @@
+import pytest
+import json
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+import io
+import boto3
+from moto import mock_aws
+from obfuscator.stream_file import stream_csv, stream_json, stream_parquet
+
+
+@pytest.fixture(scope="function")
+def mock_s3_bucket():
+    """Fixture to create and return a mock S3 bucket."""
+    with mock_aws():
+        s3 = boto3.client("s3", region_name="eu-west-2")
+        bucket_name = "mock-bucket"
+        s3.create_bucket(
+            Bucket=bucket_name,
+            CreateBucketConfiguration={"LocationConstraint": "eu-west-2"},
+        )
+        yield s3, bucket_name
+
+
+@mock_aws
+def test_stream_csv_chunks(mock_s3_bucket):
+    """Test that a CSV file is streamed in chunks with a single header."""
+    s3, bucket_name = mock_s3_bucket
+    object_key = "test.csv"
+    rows = "\n".join(f"{i},Name {i},user{i}@example.com" for i in range(10))
+    s3.put_object(Bucket=bucket_name, Key=object_key, Body=f"id,name,email\n{rows}\n")
+
+    chunks = list(stream_csv(bucket_name, object_key, ["name"], chunk_size=3))
+
+    assert len(chunks) == 4  # 10 rows in chunks of 3
+    df = pd.read_csv(io.BytesIO(b"".join(chunks)))
+    assert df.shape == (10, 3)
+    assert all(df["name"] == "***")
+    assert df.iloc[9]["email"] == "user9@example.com"
+
+
+@mock_aws
+def test_stream_csv_types_do_not_change_between_chunks(mock_s3_bucket):
+    """Test that a column with blanks in a later chunk is written as it
+    appears, not as integers in one chunk and floats in the next."""
+    s3, bucket_name = mock_s3_bucket
+    body = b"id,count,name\n0,0,a\n1,1,b\n2,2,c\n3,3,d\n4,,e\n5,05,f\n"
+    s3.put_object(Bucket=bucket_name, Key="test.csv", Body=body)
+
+    output = b"".join(stream_csv(bucket_name, "test.csv", ["name"], chunk_size=3))
+
+    assert output == (
+        b"id,count,name\n0,0,***\n1,1,***\n2,2,***\n3,3,***\n4,,***\n5,05,***\n"
+    )
+
+
+@mock_aws
+def test_stream_csv_quoted_newlines(mock_s3_bucket):
+    """Test that quoted fields spanning lines survive chunk boundaries."""
+    s3, bucket_name = mock_s3_bucket
+    object_key = "test.csv"
+    csv_content = 'id,name,notes\n1,Alice,"line one\nline two"\n2,Bob,plain\n'
+    s3.put_object(Bucket=bucket_name, Key=object_key, Body=csv_content)
+
+    output = b"".join(stream_csv(bucket_name, object_key, ["name"], chunk_size=1))
+    df = pd.read_csv(io.BytesIO(output))
+
+    assert df.iloc[0]["notes"] == "line one\nline two"
+    assert list(df["name"]) == ["***", "***"]
+
+
+@mock_aws
+def test_stream_csv_empty(mock_s3_bucket):
+    """Test streaming an empty CSV file."""
+    s3, bucket_name = mock_s3_bucket
+    s3.put_object(Bucket=bucket_name, Key="empty.csv", Body="")
+
+    chunks = list(stream_csv(bucket_name, "empty.csv", ["name"]))
+
+    assert b"".join(chunks)
+
+
+@mock_aws
+def test_stream_csv_nonexistent_key(mock_s3_bucket):
+    """Test handling of nonexistent S3 keys."""
+    _, bucket_name = mock_s3_bucket
+
+    with pytest.raises(RuntimeError, match="S3 Client Error: An error occurred"):
+        list(stream_csv(bucket_name, "nonexistent.csv", ["name"]))
+
+
+def _parquet_bytes(table, **kwargs):
+    """Serialise an Arrow table to Parquet bytes."""
+    with io.BytesIO() as f:
+        pq.write_table(table, f, **kwargs)
+        return f.getvalue()
+
+
+@mock_aws
+def test_stream_parquet_row_groups(mock_s3_bucket):
+    """Test that a Parquet file is rewritten batch by batch."""
+    s3, bucket_name = mock_s3_bucket
+    object_key = "test.parquet"
+    table = pa.table(
+        {
+            "id": list(range(10)),
+            "name": [f"Name {i}" for i in range(10)],
+            "score": [i / 2 for i in range(10)],
+        }
+    )
+    s3.put_object(
+        Bucket=bucket_name,
+        Key=object_key,
+        Body=_parquet_bytes(table, row_group_size=4),
+    )
+
+    chunks = list(stream_parquet(bucket_name, object_key, ["name"], chunk_size=4))
+
+    assert len(chunks) > 1
+    result = pq.read_table(io.BytesIO(b"".join(chunks)))
+    assert result.num_rows == 10
+    assert result.column("name").to_pylist() == ["***"] * 10
+    assert result.column("id").equals(table.column("id"))
+    assert result.column("score").equals(table.column("score"))
+
+
+@mock_aws
+def test_stream_parquet_non_string_pii_column(mock_s3_bucket):
+    """Test that non-string PII columns are replaced with string values."""
+    s3, bucket_name = mock_s3_bucket
+    object_key = "test.parquet"
+    table = pa.table({"id": [1, 2], "phone": [7700900123, 7700900456]})
+    s3.put_object(Bucket=bucket_name, Key=object_key, Body=_parquet_bytes(table))
+
+    output = b"".join(stream_parquet(bucket_name, object_key, ["phone"]))
+    result = pq.read_table(io.BytesIO(output))
+
+    assert result.schema.field("phone").type.value_type == pa.string()
+    assert result.column("phone").to_pylist() == ["***", "***"]
+
+
+@mock_aws
+def test_stream_parquet_empty(mock_s3_bucket):
+    """Test streaming an empty Parquet file."""
+    s3, bucket_name = mock_s3_bucket
+    s3.put_object(Bucket=bucket_name, Key="empty.parquet", Body="")
+
+    chunks = list(stream_parquet(bucket_name, "empty.parquet", ["name"]))
+
+    assert b"".join(chunks)
+
+
+@mock_aws
+def test_stream_parquet_nonexistent_key(mock_s3_bucket):
+    """Test handling of nonexistent S3 keys."""
+    _, bucket_name = mock_s3_bucket
+
+    with pytest.raises(RuntimeError, match="S3 Client Error: An error occurred"):
+        list(stream_parquet(bucket_name, "nonexistent.parquet", ["name"]))
+
+
+@mock_aws
+@pytest.mark.parametrize("layout", ["array", "lines"])
+def test_stream_json_batches(mock_s3_bucket, layout):
+    """Test that JSON arrays and JSON Lines are streamed in batches."""
+    s3, bucket_name = mock_s3_bucket
+    object_key = "test.json"
+    records = [{"id": i, "name": f"Name {i}", "nested": {"n": i}} for i in range(7)]
+    if layout == "array":
+        body = json.dumps(records)
+    else:
+        body = "\n".join(json.dumps(record) for record in records)
+    s3.put_object(Bucket=bucket_name, Key=object_key, Body=body)
+
+    chunks = list(
+        stream_json(bucket_name, object_key, ["name"], chunk_size=3, read_size=16)
+    )
+
+    assert len(chunks) == 3
+    lines = b"".join(chunks).decode("utf-8").splitlines()
+    output = [json.loads(line) for line in lines]
+    assert [record["name"] for record in output] == ["***"] * 7
+    assert [record["nested"] for record in output] == [{"n": i} for i in range(7)]
+
+
+@mock_aws
+def test_stream_json_empty(mock_s3_bucket):
+    """Test streaming an empty JSON file."""
+    s3, bucket_name = mock_s3_bucket
+    s3.put_object(Bucket=bucket_name, Key="empty.json", Body="")
+
+    assert b"".join(stream_json(bucket_name, "empty.json", ["name"]))
+
+
+@mock_aws
+def test_stream_json_invalid(mock_s3_bucket):
+    """Test that invalid JSON raises a RuntimeError."""
+    s3, bucket_name = mock_s3_bucket
+    s3.put_object(Bucket=bucket_name, Key="bad.json", Body='[{"id": 1}')
+
+    with pytest.raises(RuntimeError, match="Error streaming json file"):
+        list(stream_json(bucket_name, "bad.json", ["name"]))
+
+
+@mock_aws
+def test_stream_csv_to_parquet(mock_s3_bucket):
+    """Test that a CSV file is streamed out as one Parquet file."""
+    s3, bucket_name = mock_s3_bucket
+    object_key = "test.csv"
+    rows = "\n".join(f"{i},Name {i}" for i in range(10))
+    s3.put_object(Bucket=bucket_name, Key=object_key, Body=f"id,name\n{rows}\n")
+
+    chunks = stream_csv(
+        bucket_name, object_key, ["name"], chunk_size=4, output_format="parquet"
+    )
+    parquet_file = pq.ParquetFile(io.BytesIO(b"".join(chunks)))
+
+    assert parquet_file.metadata.num_row_groups == 3
+    table = parquet_file.read()
+    # Fields are read as text, so the ids are strings
+    assert table.column("id").to_pylist() == [str(i) for i in range(10)]
+    assert table.column("name").to_pylist() == ["***"] * 10
+
+
+@mock_aws
+def test_stream_csv_to_parquet_column_empty_in_first_chunk(mock_s3_bucket):
+    """Test that a sparse column takes its type from later chunks."""
+    s3, bucket_name = mock_s3_bucket
+    rows = "".join(f"{i},Name {i},{f'note{i}' if i >= 5 else ''}\n" for i in range(10))
+    s3.put_object(Bucket=bucket_name, Key="test.csv", Body=f"id,name,note\n{rows}")
+
+    chunks = stream_csv(
+        bucket_name, "test.csv", ["name"], chunk_size=4, output_format="parquet"
+    )
+    table = pq.read_table(io.BytesIO(b"".join(chunks)))
+
+    assert table.schema.field("note").type == pa.string()
+    assert table.column("note").to_pylist() == [None] * 5 + [
+        f"note{i}" for i in range(5, 10)
+    ]
+
+
+@pytest.mark.parametrize("output_format", ["csv", "parquet"])
+@mock_aws
+def test_stream_json_heterogeneous_records(mock_s3_bucket, output_format):
+    """Test that later records with fewer or reordered keys are written under
+    the columns of the first batch."""
+    s3, bucket_name = mock_s3_bucket
+    records = [
+        {"id": 1, "name": "Ann", "city": "Leeds"},
+        {"id": 2, "name": "Bob", "city": "York"},
+        {"city": "Hull", "id": 3},
+    ]
+    body = "\n".join(json.dumps(record) for record in records)
+    s3.put_object(Bucket=bucket_name, Key="test.json", Body=body)
+
+    chunks = stream_json(
+        bucket_name, "test.json", ["name"], chunk_size=2, output_format=output_format
+    )
+    output = io.BytesIO(b"".join(chunks))
+    if output_format == "csv":
+        df = pd.read_csv(output)
+    else:
+        df = pq.read_table(output).to_pandas()
+
+    assert list(df.columns) == ["id", "name", "city"]
+    assert df["city"].tolist() == ["Leeds", "York", "Hull"]
+    assert df["name"].tolist()[:2] == ["***", "***"]
+    assert pd.isna(df["name"].tolist()[2])
+
+
+@pytest.mark.parametrize("output_format", ["csv", "parquet"])
+@mock_aws
+def test_stream_json_new_keys_in_later_batch(mock_s3_bucket, output_format):
+    """Test that keys first seen after the header or schema is written are
+    rejected instead of corrupting the output."""
+    s3, bucket_name = mock_s3_bucket
+    records = [{"id": 1, "name": "Ann"}, {"id": 2, "name": "Bob", "email": "b@x"}]
+    body = "\n".join(json.dumps(record) for record in records)
+    s3.put_object(Bucket=bucket_name, Key="test.json", Body=body)
+
+    with pytest.raises(RuntimeError, match="fields that the first chunk does not"):
+        list(
+            stream_json(
+                bucket_name,
+                "test.json",
+                ["name"],
+                chunk_size=1,
+                output_format=output_format,
+            )
+        )
+
+
+@mock_aws
+def test_stream_parquet_to_json(mock_s3_bucket):
+    """Test that a Parquet file is streamed out as JSON Lines."""
+    s3, bucket_name = mock_s3_bucket
+    table = pa.table({"id": [1, 2, 3], "name": ["Ann", "Bob", "Cat"]})
+    s3.put_object(Bucket=bucket_name, Key="test.parquet", Body=_parquet_bytes(table))
+
+    chunks = stream_parquet(
+        bucket_name, "test.parquet", ["name"], chunk_size=2, output_format="json"
+    )
+    lines = b"".join(chunks).decode("utf-8").splitlines()
+
+    assert [json.loads(line) for line in lines] == [
+        {"id": i, "name": "***"} for i in (1, 2, 3)
+    ]
@@ -0,0 +1,147 @@
+import pytest
+import hashlib
+import hmac
+import pickle
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+from obfuscator.tokenise import HmacTokeniser, resolve_hmac_key, TOKEN_LENGTH
+
+
+def expected_token(value: str, key: bytes = b"secret") -> str:
+    """Return the HMAC-SHA256 token of a value, computed independently."""
+    return hmac.new(key, value.encode(), hashlib.sha256).hexdigest()[:TOKEN_LENGTH]
+
+
+def test_token_is_keyed_and_deterministic():
+    """Test that tokens are the truncated HMAC-SHA256 of the value."""
+    tokeniser = HmacTokeniser("secret")
+
+    assert tokeniser.token("Alice") == expected_token("Alice")
+    assert HmacTokeniser("secret").token("Alice") == tokeniser.token("Alice")
+    assert HmacTokeniser("other").token("Alice") != tokeniser.token("Alice")
+    assert len(tokeniser.token("Alice")) == TOKEN_LENGTH
+
+
+def test_token_cache_is_bounded_lru():
+    """Test that the memo keeps only the most recently used values."""
+    tokeniser = HmacTokeniser("secret", cache_size=2)
+
+    tokeniser.token("a")
+    tokeniser.token("b")
+    tokeniser.token("a")
+    tokeniser.token("c")
+
+    assert list(tokeniser._cache) == ["a", "c"]
+    assert tokeniser.token("b") == expected_token("b")
+
+
+def test_tokens_bypass_cache_for_high_cardinality_batches():
+    """Test that batches larger than the memo do not evict it."""
+    tokeniser = HmacTokeniser("secret", cache_size=2)
+    tokeniser.token("UK")
+
+    tokens = tokeniser._tokens(["a", "b", None])
+
+    assert tokens == [expected_token("a"), expected_token("b"), None]
+    assert list(tokeniser._cache) == ["UK"]
+
+
+def test_tokenise_series_hashes_distinct_values_once(monkeypatch):
+    """Test that a column is hashed once per distinct value."""
+    tokeniser = HmacTokeniser("secret")
+    hashed = []
+    tokens = tokeniser._tokens
+    monkeypatch.setattr(tokeniser, "_tokens", lambda v: hashed.extend(v) or tokens(v))
+    series = pd.Series(["UK", "FR", "UK", None, "UK"], index=[5, 6, 7, 8, 9])
+
+    result = tokeniser.obfuscate_series(series)
+
+    assert sorted(hashed) == ["FR", "UK"]
+    assert list(result.index) == [5, 6, 7, 8, 9]
+    assert result.tolist() == [
+        expected_token("UK"),
+        expected_token("FR"),
+        expected_token("UK"),
+        None,
+        expected_token("UK"),
+    ]
+
+
+def test_tokenise_series_numbers_and_unhashable_values():
+    """Test that values are hashed as their text."""
+    tokeniser = HmacTokeniser("secret")
+
+    numbers = tokeniser.obfuscate_series(pd.Series([7, 7, np.nan]))
+    lists = tokeniser.obfuscate_series(pd.Series([[1, 2], None]))
+
+    assert numbers.tolist() == [expected_token("7.0")] * 2 + [None]
+    assert lists.tolist() == [expected_token("[1, 2]"), None]
+
+
+@pytest.mark.parametrize(
+    "array",
+    [
+        pa.array(["UK", None, "FR", "UK"]),
+        pa.array(["UK", None, "FR", "UK"]).dictionary_encode(),
+        pa.chunked_array([["UK", None], ["FR", "UK"]]),
+    ],
+)
+def test_tokenise_arrow(array):
+    """Test that Arrow arrays are tokenised through their dictionary."""
+    tokeniser = HmacTokeniser("secret")
+
+    result = tokeniser.obfuscate_arrow(array)
+
+    assert result.type == pa.dictionary(pa.int32(), pa.string())
+    assert result.to_pylist() == [
+        expected_token("UK"),
+        None,
+        expected_token("FR"),
+        expected_token("UK"),
+    ]
+
+
+@pytest.mark.parametrize(
+    "field, value",
+    [(b"Alice", "Alice"), (b'"Smith, ""J"""', 'Smith, "J"'), (b"007", "007")],
+)
+def test_tokenise_field(field, value):
+    """Test that raw CSV fields are unquoted before hashing."""
+    assert HmacTokeniser("secret").obfuscate_field(field) == (
+        expected_token(value).encode()
+    )
+
+
+def test_tokenise_field_leaves_empty_fields():
+    """Test that missing CSV values stay missing."""
+    assert HmacTokeniser("secret").obfuscate_field(b"") == b""
+
+
+def test_tokeniser_pickles_without_its_cache():
+    """Test that tokenisers can be sent to worker processes."""
+    tokeniser = HmacTokeniser("secret", cache_size=10)
+    tokeniser.token("Alice")
+
+    copy = pickle.loads(pickle.dumps(tokeniser))
+
+    assert copy.cache_size == 10
+    assert not copy._cache
+    assert copy.token("Alice") == tokeniser.token("Alice")
+
+
+def test_tokeniser_rejects_empty_key():
+    """Test that an empty key is rejected."""
+    with pytest.raises(ValueError, match="must not be empty"):
+        HmacTokeniser("")
+
+
+def test_resolve_hmac_key(monkeypatch):
+    """Test that the key falls back to the environment."""
+    monkeypatch.delenv("OBFUSCATOR_HMAC_KEY", raising=False)
+    with pytest.raises(ValueError, match="requires a key"):
+        resolve_hmac_key()
+
+    monkeypatch.setenv("OBFUSCATOR_HMAC_KEY", "from-env")
+    assert resolve_hmac_key() == "from-env"
+    assert resolve_hmac_key("given") == "given"
@@ -2,7 +2,9 @@ import pytest
 import pandas as pd
 import pyarrow.parquet as pq
 import io
-from obfuscator.write_file import write_file
+from obfuscator.write_file import FrameWriter, write_file
+from obfuscator.formats import WriterOptions, parse_writer_options
+from obfuscator.output_buffer import SpooledBuffer
 from obfuscator.obfuscate_pii import obfuscate_pii
 
 
@@ -88,3 +90,87 @@ def test_write_dataframe_different_types():
                 pq.read_table(byte_stream)
             except Exception:
                 assert False, "Parquet file created is invalid"
+
+
+def test_write_file_to_spooled_buffer(obfuscated_dataframe, tmp_path):
+    """Test writing into a given buffer that spills to disk."""
+    buffer = SpooledBuffer(16, spill_dir=str(tmp_path))
+
+    byte_stream = write_file(obfuscated_dataframe, "csv", buffer)
+
+    assert byte_stream is buffer
+    assert buffer.spilled
+    assert byte_stream.tell() == 0
+    assert byte_stream.getvalue() == obfuscated_dataframe.to_csv(index=False).encode()
+
+
+def test_write_parquet_with_options(obfuscated_dataframe):
+    """Test that the Parquet codec, level and row groups are configurable."""
+    options = WriterOptions(
+        parquet_compression="zstd", parquet_compression_level=9, row_group_size=1
+    )
+
+    byte_stream = write_file(obfuscated_dataframe, "parquet", options=options)
+
+    metadata = pq.ParquetFile(byte_stream).metadata
+    assert metadata.num_row_groups == 2
+    assert metadata.row_group(0).column(0).compression == "ZSTD"
+
+
+def test_write_text_in_batches(obfuscated_dataframe):
+    """Test that CSV and JSON written in batches match a single write."""
+    options = WriterOptions(batch_size=1)
+
+    for fmt in ["csv", "json"]:
+        batched = write_file(obfuscated_dataframe, fmt, options=options)
+        assert batched.getvalue() == write_file(obfuscated_dataframe, fmt).getvalue()
+
+
+@pytest.mark.parametrize(
+    "input_data, message",
+    [
+        ({"parquet_compression": "lzo"}, "Unsupported Parquet compression"),
+        ({"parquet_compression_level": "9"}, "must be an integer"),
+        ({"row_group_size": 0}, "row_group_size must be a positive integer"),
+        ({"write_batch_size": -1}, "write_batch_size must be a positive integer"),
+        ({"use_dictionary": "yes"}, "use_dictionary must be true or false"),
+    ],
+)
+def test_parse_writer_options_invalid(input_data, message):
+    """Test validation of the writer options."""
+    with pytest.raises(ValueError, match=message):
+        parse_writer_options(input_data)
+
+
+@pytest.mark.parametrize("fmt", ["csv", "json", "parquet"])
+def test_frame_writer_joins_chunks(sample_dataframe, fmt):
+    """Test that chunks written one at a time form a single file."""
+    writer = FrameWriter(fmt)
+
+    data = b"".join(writer.write(sample_dataframe.iloc[[i]]) for i in range(2))
+    data += writer.close()
+
+    if fmt == "parquet":
+        assert pq.read_table(io.BytesIO(data)).to_pandas().equals(sample_dataframe)
+    else:
+        assert data == write_file(sample_dataframe, fmt).getvalue()
+
+
+def test_frame_writer_casts_parquet_chunks():
+    """Test that later Parquet chunks take the types of the first."""
+    writer = FrameWriter("parquet")
+
+    data = writer.write(pd.DataFrame({"id": [1.5], "name": ["a"]}))
+    data += writer.write(pd.DataFrame({"id": [2], "name": ["b"]}))
+    table = pq.read_table(io.BytesIO(data + writer.close()))
+
+    assert table.column("id").to_pylist() == [1.5, 2.0]
+
+
+def test_frame_writer_mismatched_parquet_chunks():
+    """Test that chunks that cannot take the first chunk's types fail clearly."""
+    writer = FrameWriter("parquet")
+    writer.write(pd.DataFrame({"id": [1]}))
+
+    with pytest.raises(ValueError, match="does not match the Parquet schema"):
+        writer.write(pd.DataFrame({"id": ["x"]}))